@@ -3,10 +3,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from FinMind.data import DataLoader
 import utils
 
-api = DataLoader()
+api = utils.CachedDataLoader()
+results = utils.ResultStore()
 watch_list = utils.query_data(
     "SELECT stock_code, buy_strategy, sell_strategy FROM watch_list;"
 )
@@ -14,6 +14,15 @@ strategy_map = {}
 for stock_code, buy_strategy, sell_strategy in watch_list:
     strategy_map[stock_code] = (buy_strategy, sell_strategy)
 
+# watch_list 中以運算式定義的自訂規則也列入選項
+buy_options = [""] + [strategy.value for strategy in utils.BuyStrategy]
+sell_options = [""] + [strategy.value for strategy in utils.SellStrategy]
+for buy_strategy, sell_strategy in strategy_map.values():
+    if buy_strategy and buy_strategy not in buy_options:
+        buy_options.append(buy_strategy)
+    if sell_strategy and sell_strategy not in sell_options:
+        sell_options.append(sell_strategy)
+
 note_dates = utils.query_data("SELECT note_name, note_date FROM note_date;")
 notedate_map = {}
 for note_name, note_date in note_dates:
@@ -28,6 +37,47 @@ def get_buy_sell_strategy():
     st.session_state["sell_select"] = sell_val
 
 
+def build_signal_frame(ticker, buy_strategy, sell_strategy, start_date, end_date):
+    # 1. 並行取得每日股價、外資投信買賣超、PER/PBR/殖利率
+    bundle = utils.load_stock_bundle(
+        api, ticker, start_date, end_date, datasets=("price", "investor", "per")
+    )
+    df = bundle.aligned
+
+    # 2. 一次計算顯示及買賣策略需要的指標，共用的移動平均只算一次
+    columns = ["k", "d", "rsi", "Middle", "Upper", "Lower"] + utils.strategy_columns(
+        buy_strategy, sell_strategy
+    )
+    df = df.join(utils.compute_indicators(df, columns))
+
+    buy_condition, sell_condition = utils.get_trade_condition(
+        df, buy_strategy, sell_strategy
+    )
+
+    # 新增訊號欄位
+    df["Signal"] = np.select(
+        [buy_condition, sell_condition], ["Buy", "Sell"], default=""
+    )
+
+    # 高檔爆量判斷
+    df["High_Close"] = utils.is_breakout(df["Close"], 60)
+    df["High_Volume"] = utils.is_breakout(df["Volume"], 60)
+
+    return df
+
+
+def run_backtest(ticker, df, buy_strategy, sell_strategy):
+    # 價格沒有變動時直接讀取 backtest_results 中的結果
+    prices = df.set_index(pd.to_datetime(df["date"]))
+    return results.get_or_run(
+        ticker,
+        f"{buy_strategy}/{sell_strategy}",
+        {},
+        prices,
+        lambda: utils.backtest_strategy(prices, buy_strategy, sell_strategy),
+    )
+
+
 st.set_page_config(
     page_title="First Trade",
     page_icon="📈",
@@ -48,13 +98,13 @@ with st.form(key="form"):
     with select_col1:
         buy_strategy = st.selectbox(
             "買點條件:",
-            options=[""]+[strategy.value for strategy in utils.BuyStrategy],
+            options=buy_options,
             key="buy_select",
         )
     with select_col2:
         sell_strategy = st.selectbox(
             "賣點條件:",
-            options=[""]+[strategy.value for strategy in utils.SellStrategy],
+            options=sell_options,
             key="sell_select",
         )
     check_col1, check_col2, check_col3, check_col4 = st.columns(4)
@@ -72,69 +122,12 @@ if submitted:
 
         st.write(f"正在取得 **{ticker}** 從 **{start_date}** 到 **{end_date}** 的資料")
 
-        # 1. 取得每日股價資料
-        df_stock = api.taiwan_stock_daily(
-            stock_id=ticker, start_date=start_date, end_date=end_date
-        )
-        df_stock.rename(
-            columns={
-                "max": "High",
-                "min": "Low",
-                "close": "Close",
-                "Trading_Volume": "Volume",
-            },
-            inplace=True,
-        )
-
-        # 取得外資、投信買賣超資料
-        df_investor = api.taiwan_stock_institutional_investors(
-            stock_id=ticker, start_date=start_date, end_date=end_date
-        )
-        df_investor["value"] = df_investor["buy"] - df_investor["sell"]
-        df_investor = df_investor.pivot_table(
-            index="date", columns="name", values="value"
-        )
-        df_investor = df_investor.reset_index()
-
-        # 取得PER、PBR、殖利率
-        df_per = api.taiwan_stock_per_pbr(
-            stock_id=ticker, start_date=start_date, end_date=end_date
-        )
-
-        # 2. 使用自訂函式計算 KDJ 和布林通道
-        df_kdj = utils.calculate_kdj(df_stock.copy())
-        df_bb = utils.calculate_bollinger_bands(df_stock.copy())
-        df_rsi = utils.calculate_rsi(df_stock.copy())
-
-        # 3. 將計算結果合併回股價資料
-        df = pd.merge(df_stock, df_kdj[["k", "d"]], left_index=True, right_index=True, how="left")
-        df = pd.merge(df, df_bb, left_index=True, right_index=True, how="left")
-        df = pd.merge(df, df_rsi, left_index=True, right_index=True, how="left")
-        df = pd.merge(
-            df,
-            df_investor[["date", "Foreign_Investor", "Investment_Trust"]],
-            on="date",
-            how="left",
-        )
-        if df_per.empty:
-            df_per = pd.DataFrame(columns=["date", "PER", "PBR"])
-        df = pd.merge(df, df_per[["date", "PER", "PBR"]], on="date", how="left")
-
-        buy_condition, sell_condition = utils.get_trade_condition(
-            df, buy_strategy, sell_strategy
-        )
-
-        # 新增訊號欄位
-        df["Signal"] = np.select(
-            [buy_condition, sell_condition], ["Buy", "Sell"], default=""
-        )
-
-        # 高檔爆量判斷
-        df["High_Close"] = (
-            df["Close"] == df["Close"].rolling(window=60, min_periods=1).max()
-        )
-        df["High_Volume"] = (
-            df["Volume"] == df["Volume"].rolling(window=60, min_periods=1).max()
+        df = utils.data_cache.get_or_compute(
+            (ticker, "signals", buy_strategy, sell_strategy, start_date, end_date),
+            lambda: build_signal_frame(
+                ticker, buy_strategy, sell_strategy, start_date, end_date
+            ),
+            expires_at=utils.range_expiry(end_date),
         )
 
         # 5. 排序並顯示資料
@@ -208,9 +201,19 @@ if submitted:
             )
             # styled_df = styled_df.map(style_rsi, subset=['rsi'])
 
+            if buy_strategy and sell_strategy:
+                stats = run_backtest(ticker, df.sort_index(), buy_strategy, sell_strategy)
+                metric_cols = st.columns(4)
+                metric_cols[0].metric("回測報酬率", f"{stats['Return [%]']:.2f}%")
+                metric_cols[1].metric("買入持有", f"{stats['Buy & Hold Return [%]']:.2f}%")
+                metric_cols[2].metric("最大回撤", f"{stats['Max. Drawdown [%]']:.2f}%")
+                metric_cols[3].metric("交易次數", stats["# Trades"])
+
             st.success("資料取得與計算成功！")
         else:
             st.warning("查無此股票代號的資料，請確認代號是否正確。")
 
     except Exception as e:
         st.error(f"發生錯誤: {e}")
+
+st.sidebar.caption(utils.data_cache.stats_text())
@@ -1,41 +1,36 @@
-import pandas as pd
+import os
+import sys
 from enum import Enum
 from backtesting import Strategy
 from backtesting.lib import crossover
-from backtesting.test import SMA
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import kernels  # noqa: E402
+
+
+# 指標一律交給 utils.kernels 計算 (與 Streamlit app 共用)，
+# optimize 掃描參數時相同資料、相同參數的指標只算一次
+
+
+def SMA(values, n):
+    return kernels.sma(values, n)
 
 
 def calculate_bollinger_bands(close, n=20):
-    close_series = pd.Series(close)
-    middle = close_series.rolling(window=n).mean()
-    std = close_series.rolling(window=n).std()
-    upper = middle + (std * 2)
-    lower = middle - (std * 2)
+    _, upper, lower = kernels.bollinger_bands(close, n)
     return upper, lower
 
 
 def calculate_kdj(high_data, low_data, close_data, n=9):
-    high_series = pd.Series(high_data)
-    low_series = pd.Series(low_data)
-    close_series = pd.Series(close_data)
-
-    ln = low_series.rolling(window=n).min()
-    hn = high_series.rolling(window=n).max()
-    rsv = ((close_series - ln) / (hn - ln)) * 100
-    k = rsv.ewm(com=2, adjust=False).mean()
-    d = k.ewm(com=2, adjust=False).mean()
-
-    return k, d
+    return kernels.kdj(high_data, low_data, close_data, n)
 
 
 def EMA(values, n):
-    close = pd.Series(values)
-    return close.ewm(span=n, adjust=False).mean()
+    return kernels.ema(values, n)
 
 
 def VWAP(high, low, close, volume):
-    typical_price = (high + low + close) / 3
-    return (typical_price * volume).cumsum() / volume.cumsum()
+    return kernels.vwap(high, low, close, volume)
 
 
 class BuyStrategy(Enum):
@@ -77,9 +72,7 @@ class BOLL_KD30(Strategy):
         )
 
         # Calculate 5-day average volume
-        self.avg_5_vol = self.I(
-            lambda data: pd.Series(data).rolling(5).mean(), self.data.Volume
-        )
+        self.avg_5_vol = self.I(SMA, self.data.Volume, 5)
 
     def next(self):
         if self.buy_strategy == BuyStrategy.BOLL_KD30:
@@ -181,3 +174,25 @@ class EMA_VWAP_KD(Strategy):
         elif (self.k[-1] > 75) and (self.d[-1] > 75):
             if self.position and self.position.pl > 0.0:
                 self.position.close()
+
+
+class SignalStrategy(Strategy):
+    """
+    依預先算好的買賣訊號交易，用來與 utils.backtest.vectorized_backtest 對照。
+    訊號以 buy_signal / sell_signal 參數傳入 (與 df 等長的布林陣列)。
+    """
+
+    buy_signal = None
+    sell_signal = None
+    profit_only = False
+
+    def init(self):
+        self.buy_flag = self.I(lambda: self.buy_signal.astype(float), name="buy")
+        self.sell_flag = self.I(lambda: self.sell_signal.astype(float), name="sell")
+
+    def next(self):
+        if self.buy_flag[-1] and not self.position:
+            self.buy()
+        elif self.sell_flag[-1] and not self.buy_flag[-1] and self.position:
+            if not self.profit_only or self.position.pl > 0.0:
+                self.position.close()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+watch_list 收盤通知 - 只處理新的 K 棒，評估每檔股票儲存的買賣策略
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="收盤後評估 watch_list 的 buy_strategy / sell_strategy，新訊號寫入 alert_outbox",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用範例:
+  python data/alerts.py
+  python data/alerts.py --tickers 2330 2609
+  python data/alerts.py --show 2025-01-01
+        """,
+    )
+    parser.add_argument(
+        "--db", type=str, default="mystock.db", help="資料庫檔案名稱（預設: mystock.db）"
+    )
+    parser.add_argument(
+        "--tickers", nargs="*", help="只處理指定股票，預設為整個 watch_list"
+    )
+    parser.add_argument(
+        "--colstore",
+        type=str,
+        default="data/colstore",
+        help="欄式價格檔目錄（預設: data/colstore）",
+    )
+    parser.add_argument(
+        "--show", type=str, default="", help="列出 alert_outbox 中此日期之後的事件"
+    )
+    args = parser.parse_args()
+
+    strategies = utils.watch_list_strategies(args.db)
+    if args.tickers:
+        strategies = {t: strategies[t] for t in args.tickers if t in strategies}
+    store = utils.ColumnStore(args.colstore) if os.path.isdir(args.colstore) else None
+    stored = store.tickers() if store is not None else []
+    loader = None if set(strategies) <= set(stored) else utils.CachedDataLoader(args.db)
+    engine = utils.AlertEngine(args.db, store=store, loader=loader)
+
+    started = time.perf_counter()
+    events = engine.run(strategies)
+    elapsed = time.perf_counter() - started
+
+    print("=" * 80)
+    print(
+        f"共 {len(strategies)} 檔股票: 更新 {events.attrs['updated']} 檔，"
+        f"沒有新資料 {events.attrs['skipped']} 檔，耗時 {elapsed:.2f} 秒"
+    )
+    print("=" * 80)
+    for ticker, error in events.attrs["errors"].items():
+        print(f"{ticker} 更新失敗: {error}")
+    if events.empty:
+        print("沒有新的訊號")
+    else:
+        print(events.to_string(index=False))
+
+    if args.show:
+        print(f"\nalert_outbox ({args.show} 之後):")
+        print(engine.outbox(args.show).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,30 @@
 """
 Google News FactSet 新聞爬蟲 + SQLite 資料庫整合
 """
+import os
+import sys
 import requests
 from bs4 import BeautifulSoup
 import time
 import argparse
 from datetime import datetime as dt
-import sqlite3
 import re
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
 class FactSetNewsDB:
     """FactSet 新聞資料庫管理類"""
     
     def __init__(self, db_name='mystock.db'):
         self.db_name = db_name
+        self.pool = utils.get_pool(db_name)
         self.conn = None
         self.cursor = None
         
     def connect(self):
-        """連接資料庫"""
-        self.conn = sqlite3.connect(self.db_name)
+        """從連線池取得資料庫連線"""
+        self.conn = self.pool.acquire()
         self.cursor = self.conn.cursor()
         print(f"✓ 已連接到資料庫: {self.db_name}")
         
@@ -144,9 +149,12 @@ class FactSetNewsDB:
         print(f"總計: {len(rows)} 筆資料\n")
         
     def close(self):
-        """關閉資料庫連線"""
+        """歸還資料庫連線"""
         if self.conn:
-            self.conn.close()
+            self.cursor.close()
+            self.pool.release(self.conn)
+            self.conn = None
+            self.cursor = None
 
 
 def scrape_factset_news(keyword='factset 最新調查', save_to_db=True, db_name='mystock.db'):
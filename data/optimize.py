@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+watch_list 策略參數最佳化 - 以多個子程序掃描所有股票、策略與參數組合
+"""
+import os
+import sys
+import signal
+import argparse
+import threading
+import pandas as pd
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+from preload import get_watch_list
+
+
+def load_price_frames(tickers, start_date, end_date, loader, store=None):
+    """優先讀欄式價格檔，沒有的股票再從本地快取 / FinMind 取得"""
+    frames = {}
+    for stock_id in tickers:
+        if store is not None and stock_id in store.tickers():
+            df = store.price_frame(stock_id)
+            df = df.loc[start_date:end_date]
+        else:
+            df = utils.load_stock_bundle(
+                loader, stock_id, start_date, end_date, datasets=("price",)
+            )["price"]
+            if df.empty:
+                print(f"  ✗ {stock_id}: 沒有股價資料")
+                continue
+            df = df.set_index(pd.to_datetime(df["date"]))
+        if df.empty:
+            print(f"  ✗ {stock_id}: 區間內沒有股價資料")
+            continue
+        frames[stock_id] = df[["Open", "High", "Low", "Close", "Volume"]]
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="以多核心掃描 watch_list 中所有股票的策略參數，輸出排名表",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用範例:
+  python data/optimize.py
+  python data/optimize.py --tickers 2330 2609 --strategies EMA_KD SMA_KD
+  python data/optimize.py --years 5 --workers 8 --output data/optimize.csv
+  python data/optimize.py --maximize SQN --top 5
+  python data/optimize.py --search halving --eta 3
+  python data/optimize.py --search halving --verify
+  python data/optimize.py --search walkforward --years 5 --train-bars 240 --test-bars 60
+        """,
+    )
+    parser.add_argument(
+        "--db", type=str, default="mystock.db", help="資料庫檔案名稱（預設: mystock.db）"
+    )
+    parser.add_argument(
+        "--years", type=int, default=2, help="回測的歷史年數（預設: 2）"
+    )
+    parser.add_argument(
+        "--tickers", nargs="*", help="只最佳化指定股票，預設為整個 watch_list"
+    )
+    parser.add_argument(
+        "--strategies",
+        nargs="*",
+        choices=list(utils.STRATEGY_FAMILIES),
+        help="要掃描的策略，預設為全部",
+    )
+    parser.add_argument(
+        "--maximize",
+        type=str,
+        default="Equity Final [$]",
+        help="排序依據的統計欄位（預設: Equity Final [$]）",
+    )
+    parser.add_argument(
+        "--search",
+        choices=["grid", "halving", "walkforward"],
+        default="grid",
+        help="grid 為全格點掃描，halving 先以短區間淘汰候選，"
+        "walkforward 為滾動訓練 / 測試區間（預設: grid）",
+    )
+    parser.add_argument(
+        "--eta", type=int, default=3, help="halving 每輪保留 1/eta 的候選（預設: 3）"
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="halving 另跑一次全格點，確認最佳參數相同（計算量與 grid 相同）",
+    )
+    parser.add_argument(
+        "--train-bars",
+        type=int,
+        default=240,
+        help="walkforward 訓練區間的 K 棒數（預設: 240）",
+    )
+    parser.add_argument(
+        "--test-bars",
+        type=int,
+        default=60,
+        help="walkforward 測試區間的 K 棒數（預設: 60）",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="子程序數（預設: CPU 核心數）"
+    )
+    parser.add_argument(
+        "--colstore",
+        type=str,
+        default="data/colstore",
+        help="欄式價格檔目錄（預設: data/colstore）",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="不讀寫 backtest_results 結果快取"
+    )
+    parser.add_argument(
+        "--top", type=int, default=3, help="每檔股票顯示前幾名（預設: 3）"
+    )
+    parser.add_argument(
+        "--output", type=str, default="", help="完整結果輸出的 CSV 檔案路徑"
+    )
+    args = parser.parse_args()
+
+    today = datetime.today()
+    start_date = (today - relativedelta(years=args.years)).strftime("%Y-%m-%d")
+    end_date = today.strftime("%Y-%m-%d")
+
+    tickers = args.tickers or get_watch_list(args.db)
+    store = utils.ColumnStore(args.colstore) if os.path.isdir(args.colstore) else None
+    # 全部股票都在欄式價格檔時不必連線 FinMind
+    stored = store.tickers() if store is not None else []
+    loader = None if set(tickers) <= set(stored) else utils.CachedDataLoader(args.db)
+    frames = load_price_frames(tickers, start_date, end_date, loader, store)
+
+    grids = {
+        name: utils.DEFAULT_GRIDS[name]
+        for name in (args.strategies or utils.STRATEGY_FAMILIES)
+    }
+
+    print("=" * 80)
+    print(f"策略參數最佳化: {start_date} ~ {end_date}，共 {len(frames)} 檔股票")
+    print("按 Ctrl-C 可中斷並輸出目前已完成的結果")
+    print("=" * 80)
+
+    # Ctrl-C 只設定取消旗標，讓已完成的結果仍可輸出
+    cancel = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: cancel.set())
+
+    def progress(done, total):
+        print(f"\r  進度: {done}/{total} ({done / total:.0%})", end="", flush=True)
+
+    options = dict(
+        maximize=args.maximize,
+        constraint=lambda p: p.get("n1", 0) < p.get("n2", 1),
+        workers=args.workers,
+        progress=progress,
+        cancel=cancel,
+    )
+    if args.search == "halving":
+        result = utils.optimize_halving(
+            frames, grids, eta=args.eta, verify=args.verify, **options
+        )
+    elif args.search == "walkforward":
+        result = utils.walk_forward(
+            frames,
+            grids,
+            train_bars=args.train_bars,
+            test_bars=args.test_bars,
+            **options,
+        )
+    else:
+        result = utils.optimize_grid(
+            frames, grids, results_db=None if args.no_cache else args.db, **options
+        )
+    print()
+
+    if args.search == "halving" and result.attrs["grid_evaluations"]:
+        attrs = result.attrs
+        print(
+            f"回測次數: {attrs['evaluations']}（全格點 {attrs['grid_evaluations']}），"
+            f"K 棒數: {attrs['bars']}（全格點 {attrs['grid_bars']}）"
+        )
+        if attrs["evaluations"] >= attrs["grid_evaluations"]:
+            # 每次回測的成本幾乎與 K 棒數無關，回測次數較多就不會比較快
+            print("halving 的回測次數不少於全格點，沒有節省計算，建議改用 --search grid")
+        if args.verify:
+            print(f"最佳參數與全格點相同: {attrs['same_best']}/{attrs['verified']}")
+
+    if result.attrs["cancelled"]:
+        print("\n已中斷，以下為中斷前完成的部分")
+    if result.empty:
+        print("沒有任何結果")
+        return
+
+    if args.search == "walkforward":
+        print(result.to_string(index=False))
+    else:
+        print(result[result["rank"] <= args.top].to_string(index=False))
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"\n完整結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+watch_list 組合回測 - 所有自選股依各自的買賣策略共用一個資金池回測
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+from optimize import load_price_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="以 watch_list 的 buy_strategy / sell_strategy 回測整個投資組合",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用範例:
+  python data/portfolio.py
+  python data/portfolio.py --years 10 --cash 2000000 --max-positions 5
+  python data/portfolio.py --tickers 2330 2609 --output data/portfolio_trades.csv
+        """,
+    )
+    parser.add_argument(
+        "--db", type=str, default="mystock.db", help="資料庫檔案名稱（預設: mystock.db）"
+    )
+    parser.add_argument(
+        "--years", type=int, default=2, help="回測的歷史年數（預設: 2）"
+    )
+    parser.add_argument(
+        "--tickers", nargs="*", help="只回測指定股票，預設為整個 watch_list"
+    )
+    parser.add_argument(
+        "--cash", type=float, default=1_000_000, help="初始資金（預設: 1000000）"
+    )
+    parser.add_argument(
+        "--max-positions", type=int, default=10, help="同時持有的股票數上限（預設: 10）"
+    )
+    parser.add_argument(
+        "--position-size",
+        type=float,
+        default=None,
+        help="每筆新部位占總權益的比例（預設: 1 / max-positions）",
+    )
+    parser.add_argument(
+        "--profit-only", action="store_true", help="只在獲利時賣出"
+    )
+    parser.add_argument(
+        "--colstore",
+        type=str,
+        default="data/colstore",
+        help="欄式價格檔目錄（預設: data/colstore）",
+    )
+    parser.add_argument(
+        "--output", type=str, default="", help="交易明細輸出的 CSV 檔案路徑"
+    )
+    args = parser.parse_args()
+
+    today = datetime.today()
+    start_date = (today - relativedelta(years=args.years)).strftime("%Y-%m-%d")
+    end_date = today.strftime("%Y-%m-%d")
+
+    strategies = utils.watch_list_strategies(args.db)
+    if args.tickers:
+        strategies = {t: strategies.get(t, ("", "")) for t in args.tickers}
+    tickers = list(strategies)
+    store = utils.ColumnStore(args.colstore) if os.path.isdir(args.colstore) else None
+    stored = store.tickers() if store is not None else []
+    loader = None if set(tickers) <= set(stored) else utils.CachedDataLoader(args.db)
+    frames = load_price_frames(tickers, start_date, end_date, loader, store)
+
+    print("=" * 80)
+    print(f"組合回測: {start_date} ~ {end_date}，共 {len(frames)} 檔股票")
+    print("=" * 80)
+
+    started = time.perf_counter()
+    stats = utils.portfolio_backtest(
+        frames,
+        strategies,
+        cash=args.cash,
+        max_positions=args.max_positions,
+        position_size=args.position_size,
+        profit_only=args.profit_only,
+    )
+    elapsed = time.perf_counter() - started
+
+    print(stats[[k for k in stats.index if not k.startswith("_")]].to_string())
+    print(f"\n耗時 {elapsed:.2f} 秒")
+    if args.output:
+        stats["_trades"].to_csv(args.output, index=False)
+        print(f"交易明細已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
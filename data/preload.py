@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+watch_list 資料預載 - 收盤後批次抓取自選股資料到本地快取
+"""
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from FinMind.data import DataLoader
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+# 每檔股票要預載的資料集
+PRELOAD_DATASETS = (
+    "taiwan_stock_daily",
+    "taiwan_stock_institutional_investors",
+    "taiwan_stock_per_pbr",
+    "taiwan_stock_margin_purchase_short_sale",
+)
+
+
+def get_watch_list(db_name):
+    rows = utils.get_pool(db_name).execute("SELECT stock_code FROM watch_list")
+    return [stock_code for (stock_code,) in rows]
+
+
+def preload(tickers, start_date, end_date, loader, workers=4):
+    """
+    並行抓取每檔股票的所有資料集，已在快取中的會直接略過，
+    因此中斷後重新執行即可從上次停下的地方繼續。
+
+    回傳:
+    list: 失敗的 (stock_id, dataset, 錯誤訊息)
+    """
+    tasks = []
+    skipped = 0
+    for stock_id in tickers:
+        for dataset in PRELOAD_DATASETS:
+            if loader.is_cached(dataset, stock_id, start_date, end_date):
+                skipped += 1
+            else:
+                tasks.append((stock_id, dataset))
+
+    print(f"共 {len(tickers)} 檔股票，{skipped} 項已在快取中，需抓取 {len(tasks)} 項\n")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(loader.load, dataset, stock_id, start_date, end_date): (
+                stock_id,
+                dataset,
+            )
+            for stock_id, dataset in tasks
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            stock_id, dataset = futures[future]
+            try:
+                df = future.result()
+                print(f"  ✓ [{i}/{len(tasks)}] {stock_id} {dataset}: {len(df)} 筆")
+            except Exception as e:
+                print(f"  ✗ [{i}/{len(tasks)}] {stock_id} {dataset}: {e}")
+                failed.append((stock_id, dataset, str(e)))
+
+    return failed
+
+
+def sync_colstore(tickers, start_date, end_date, loader, store):
+    """把快取中的日線資料附加到欄式價格檔"""
+    for stock_id in tickers:
+        df = loader.taiwan_stock_daily(stock_id, start_date, end_date)
+        if df.empty:
+            continue
+        last = store.last_day(stock_id)
+        if last is not None:
+            df = df[utils.dates_to_days(df["date"]) > last]
+        added = store.append(stock_id, df)
+        print(f"  ✓ {stock_id} 欄式價格檔新增 {added} 筆")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="預先抓取 watch_list 中所有股票的資料到本地快取",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用範例:
+  python data/preload.py
+  python data/preload.py --years 3 --workers 8
+  python data/preload.py --tickers 2330 2317
+  python data/preload.py --token <FinMind token> --max-calls 1600
+        """,
+    )
+    parser.add_argument(
+        "--db", type=str, default="mystock.db", help="資料庫檔案名稱（預設: mystock.db）"
+    )
+    parser.add_argument(
+        "--years", type=int, default=5, help="抓取的歷史年數（預設: 5）"
+    )
+    parser.add_argument(
+        "--tickers", nargs="*", help="只預載指定股票，預設為整個 watch_list"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="同時抓取的執行緒數（預設: 4）"
+    )
+    parser.add_argument(
+        "--max-calls",
+        type=int,
+        default=600,
+        help="每小時最多呼叫 FinMind API 次數（預設: 600）",
+    )
+    parser.add_argument(
+        "--colstore",
+        type=str,
+        default="data/colstore",
+        help="欄式價格檔目錄，留空則不同步（預設: data/colstore）",
+    )
+    parser.add_argument("--token", type=str, default="", help="FinMind API token")
+    args = parser.parse_args()
+
+    today = datetime.today()
+    start_date = (today - relativedelta(years=args.years)).strftime("%Y-%m-%d")
+    end_date = today.strftime("%Y-%m-%d")
+
+    api = DataLoader()
+    if args.token:
+        api.login_by_token(api_token=args.token)
+    loader = utils.CachedDataLoader(
+        args.db, api=api, rate_limiter=utils.RateLimiter(max_calls=args.max_calls)
+    )
+
+    tickers = args.tickers or get_watch_list(args.db)
+
+    print("=" * 80)
+    print(f"watch_list 資料預載: {start_date} ~ {end_date}")
+    print("=" * 80)
+
+    failed = preload(tickers, start_date, end_date, loader, workers=args.workers)
+
+    if args.colstore:
+        print()
+        sync_colstore(
+            tickers, start_date, end_date, loader, utils.ColumnStore(args.colstore)
+        )
+
+    print(f"\n總結: 失敗 {len(failed)} 項")
+    if failed:
+        print("可直接重新執行，已完成的部分會自動略過")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全市場選股 - 以欄式價格檔評估所有買賣策略，列出最新交易日觸發訊號的股票
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from FinMind.data import DataLoader
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utils
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="在全市場評估每個 BuyStrategy / SellStrategy，輸出最新交易日的訊號表",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用範例:
+  python data/screener.py --sync --token <FinMind token>
+  python data/screener.py --side Buy
+  python data/screener.py --strategy "KD<20" --output data/screener.csv
+        """,
+    )
+    parser.add_argument(
+        "--colstore",
+        type=str,
+        default="data/colstore",
+        help="欄式價格檔目錄（預設: data/colstore）",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="先以全市場日資料 (每日一次請求) 更新欄式價格檔",
+    )
+    parser.add_argument(
+        "--years", type=int, default=1, help="欄式價格檔為空時抓取的年數（預設: 1）"
+    )
+    parser.add_argument(
+        "--bars", type=int, default=250, help="計算指標使用的交易日數（預設: 250）"
+    )
+    parser.add_argument(
+        "--side", choices=["Buy", "Sell"], help="只顯示買進或賣出訊號"
+    )
+    parser.add_argument("--strategy", type=str, help="只顯示指定策略")
+    parser.add_argument(
+        "--max-calls",
+        type=int,
+        default=600,
+        help="每小時最多呼叫 FinMind API 次數（預設: 600）",
+    )
+    parser.add_argument("--token", type=str, default="", help="FinMind API token")
+    parser.add_argument(
+        "--output", type=str, default="", help="結果輸出的 CSV 檔案路徑"
+    )
+    args = parser.parse_args()
+
+    store = utils.ColumnStore(args.colstore)
+    if args.sync:
+        today = datetime.today()
+        start_date = (today - relativedelta(years=args.years)).strftime("%Y-%m-%d")
+        api = DataLoader()
+        if args.token:
+            api.login_by_token(api_token=args.token)
+        added = utils.sync_market(
+            api,
+            store,
+            start_date,
+            today.strftime("%Y-%m-%d"),
+            rate_limiter=utils.RateLimiter(max_calls=args.max_calls),
+        )
+        print(f"欄式價格檔新增 {added} 筆")
+
+    tickers = store.tickers()
+    if not tickers:
+        print(f"{args.colstore} 中沒有股價資料，請先加上 --sync 執行")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    panels = utils.store_panels(store, tickers, bars=args.bars)
+    result = utils.screen(panels)
+    elapsed = time.perf_counter() - started
+
+    if args.side:
+        result = result[result["side"] == args.side]
+    if args.strategy:
+        result = result[result["strategy"] == args.strategy]
+
+    print("=" * 80)
+    print(
+        f"{result.attrs['date']:%Y-%m-%d} 共 {len(tickers)} 檔股票，"
+        f"{len(result)} 個訊號，耗時 {elapsed:.2f} 秒"
+    )
+    print("=" * 80)
+    print(result.to_string(index=False))
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"\n結果已寫入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
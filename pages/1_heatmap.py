@@ -1,60 +1,132 @@
 import streamlit as st
 import numpy as np
-import pandas as pd
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import matplotlib.pyplot as plt
 import seaborn as sns
-from FinMind.data import DataLoader
+import utils
 
-api = DataLoader()
+api = utils.CachedDataLoader()
+store = utils.ColumnStore("data/colstore")
 
-with st.form(key="form"):
-    ticker = st.text_input("請輸入股票代號:", value="")
-    submitted = st.form_submit_button("執行")
+single_tab, cross_tab = st.tabs(["單一股票", "跨股票滾動相關"])
 
-if submitted:
-    try:
-        today = datetime.today()
-        start_date = (today - relativedelta(months=36)).strftime("%Y-%m-%d")
-        end_date = today.strftime("%Y-%m-%d")
+with single_tab:
+    with st.form(key="form"):
+        ticker = st.text_input("請輸入股票代號:", value="")
+        submitted = st.form_submit_button("執行")
 
-        st.write(f"正在取得 **{ticker}** 從 **{start_date}** 到 **{end_date}** 的資料")
+    if submitted:
+        try:
+            today = datetime.today()
+            start_date = (today - relativedelta(months=36)).strftime("%Y-%m-%d")
+            end_date = today.strftime("%Y-%m-%d")
 
-        df = api.taiwan_stock_daily(
-            stock_id=ticker, start_date=start_date, end_date=end_date
-        )
-        df_margin = api.taiwan_stock_margin_purchase_short_sale(
-            stock_id=ticker,
-            start_date=start_date,
-            end_date=end_date,
-        )
-        df_investor = api.taiwan_stock_institutional_investors(
-            stock_id=ticker, start_date=start_date, end_date=end_date
-        )
-        df_investor["value"] = df_investor["buy"] - df_investor["sell"]
-        df_investor = df_investor.pivot_table(
-            index="date", columns="name", values="value"
+            st.write(f"正在取得 **{ticker}** 從 **{start_date}** 到 **{end_date}** 的資料")
+
+            bundle = utils.load_stock_bundle(
+                api, ticker, start_date, end_date, datasets=("price", "margin", "investor")
+            )
+            df = bundle.aligned
+            df = df.sort_index(ascending=False)
+
+            matrix = df[
+                [
+                    "Close",
+                    "MarginPurchaseTodayBalance",
+                    "ShortSaleTodayBalance",
+                    "Foreign_Investor",
+                    "Investment_Trust",
+                ]
+            ].corr()
+            plt.figure(figsize=(6, 4))
+            sns.heatmap(matrix, annot=True, cmap="coolwarm", fmt=".2f", linewidths=0.5)
+            plt.title(f"Correlation Heatmap : {ticker}.TW")
+            st.pyplot(plt)
+
+        except Exception as e:
+            st.error(f"發生錯誤: {e}")
+
+with cross_tab:
+    # 建立索引需向 FinMind 抓每檔股票三種資料，按下執行後才建立；
+    # 參數存在 session_state，之後調整視窗與日期只查詢已建好的索引
+    with st.form(key="correlation_form"):
+        universe = st.radio(
+            "股票範圍:", options=["watch_list", "全市場成交值前 N 檔"], horizontal=True
         )
-        df_investor = df_investor.reset_index()
-
-        df = pd.merge(df, df_margin, on="date", how="left")
-        df = pd.merge(df, df_investor, on="date", how="left")
-        df = df.sort_index(ascending=False)
-
-        matrix = df[
-            [
-                "close",
-                "MarginPurchaseTodayBalance",
-                "ShortSaleTodayBalance",
-                "Foreign_Investor",
-                "Investment_Trust",
-            ]
-        ].corr()
-        plt.figure(figsize=(6, 4))
-        sns.heatmap(matrix, annot=True, cmap="coolwarm", fmt=".2f", linewidths=0.5)
-        plt.title(f"Correlation Heatmap : {ticker}.TW")
-        st.pyplot(plt)
+        top_n = st.number_input("N:", min_value=5, max_value=200, value=30)
+        months = st.number_input("歷史月數:", min_value=3, max_value=60, value=24)
+        correlation_submitted = st.form_submit_button("執行")
 
+    try:
+        if correlation_submitted:
+            if universe == "watch_list":
+                tickers = sorted(utils.watch_list_strategies())
+            else:
+                tickers = utils.data_cache.get_or_compute(
+                    ("top_traded", top_n, len(store.tickers())),
+                    lambda: utils.top_traded(store, n=top_n),
+                    expires_at=utils.next_close_expiry(),
+                )
+            if len(tickers) < 2:
+                raise ValueError("至少需要兩檔股票")
+
+            end_date = utils.settled_date().strftime("%Y-%m-%d")
+            start_date = (utils.settled_date() - relativedelta(months=months)).strftime(
+                "%Y-%m-%d"
+            )
+            st.session_state["correlation"] = (tuple(tickers), start_date, end_date)
     except Exception as e:
         st.error(f"發生錯誤: {e}")
+
+    if "correlation" in st.session_state:
+        try:
+            tickers, start_date, end_date = st.session_state["correlation"]
+
+            # 累加和只在收盤資料更新後重建，之後切換視窗與日期只做查詢
+            def build():
+                panels = utils.correlation_panels(api, list(tickers), start_date, end_date)
+                return utils.correlation_index(panels)
+
+            with st.spinner("建立相關係數索引..."):
+                index = utils.data_cache.get_or_compute(
+                    ("correlation", tickers, start_date, end_date),
+                    build,
+                    expires_at=utils.next_close_expiry(),
+                )
+
+            series = st.selectbox(
+                "資料:", options=list(utils.SERIES), format_func=utils.SERIES.get
+            )
+            engine = index[series]
+            window = st.slider("視窗 (交易日):", min_value=5, max_value=250, value=60)
+            dates = engine.index
+            date = st.select_slider(
+                "日期:",
+                options=list(dates),
+                value=dates[-1],
+                format_func=lambda d: f"{d:%Y-%m-%d}",
+            )
+
+            matrix = engine.matrix(date, window)
+            size = max(6, len(matrix) * 0.35)
+            fig, ax = plt.subplots(figsize=(size, size * 0.8))
+            sns.heatmap(
+                matrix,
+                annot=len(matrix) <= 20,
+                cmap="coolwarm",
+                vmin=-1,
+                vmax=1,
+                fmt=".2f",
+                linewidths=0.5,
+                ax=ax,
+            )
+            ax.set_title(
+                f"{utils.SERIES[series]} {window} 日相關係數 : {matrix.attrs['date']:%Y-%m-%d}"
+            )
+            st.pyplot(fig)
+            plt.close(fig)
+        except Exception as e:
+            st.error(f"發生錯誤: {e}")
+
+st.sidebar.caption(utils.data_cache.stats_text())
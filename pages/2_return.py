@@ -2,9 +2,9 @@ import streamlit as st
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import matplotlib.pyplot as plt
-from FinMind.data import DataLoader
+import utils
 
-api = DataLoader()
+api = utils.CachedDataLoader()
 plt.rcParams["font.sans-serif"] = [
     "Arial Unicode MS",
     "Microsoft YaHei",
@@ -64,3 +64,5 @@ if submitted:
         st.pyplot(plt)
     except Exception as e:
         st.error(f"發生錯誤: {e}")
+
+st.sidebar.caption(utils.data_cache.stats_text())
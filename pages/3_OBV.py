@@ -1,12 +1,12 @@
 import streamlit as st
-import numpy as np
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from FinMind.data import DataLoader
+import utils
 
-api = DataLoader()
+api = utils.CachedDataLoader()
+store = utils.ColumnStore("data/colstore")
 plt.rcParams["font.sans-serif"] = [
     "Arial Unicode MS",
     "Microsoft YaHei",
@@ -15,6 +15,32 @@ plt.rcParams["font.sans-serif"] = [
 ]
 plt.rcParams["axes.unicode_minus"] = False
 
+# 全市場 OBV 背離: 每檔股票的 OBV 只補算新的交易日，價格檔沒有變動時結果只算一次；
+# 掃描會讀取所有價格檔，按下掃描後才執行
+tickers = store.tickers()
+if tickers:
+    with st.form(key="divergence_form"):
+        lookback = st.number_input("背離回看天數:", min_value=5, value=20)
+        divergence_submitted = st.form_submit_button("掃描全市場 OBV 背離")
+    if divergence_submitted:
+        try:
+            divergence = utils.data_cache.get_or_compute(
+                ("obv_divergence", lookback, store.fingerprint(tickers)),
+                lambda: utils.scan_obv_divergence(store, tickers, n=lookback),
+                expires_at=utils.next_close_expiry(),
+            )
+            with st.expander(
+                f"OBV 背離 ({divergence.attrs['date']:%Y-%m-%d}, {len(divergence)} 檔)",
+                expanded=True,
+            ):
+                bearish, bullish = st.columns(2)
+                bearish.write("價格創新高、OBV 未創新高")
+                bearish.dataframe(divergence[divergence["bearish"]][["Close", "OBV"]])
+                bullish.write("價格創新低、OBV 未創新低")
+                bullish.dataframe(divergence[divergence["bullish"]][["Close", "OBV"]])
+        except Exception as e:
+            st.error(f"OBV 背離掃描失敗: {e}")
+
 with st.form(key="form"):
     ticker = st.text_input("請輸入股票代號:", value="")
     submitted = st.form_submit_button("執行")
@@ -30,13 +56,7 @@ if submitted:
             stock_id=ticker, start_date=start_date, end_date=end_date
         )
 
-        diff_close = df["close"].diff()
-        df["OBV_Direction"] = np.where(
-            diff_close > 0,
-            df["Trading_Volume"],
-            np.where(diff_close < 0, -df["Trading_Volume"], 0),
-        )
-        df["OBV"] = df["OBV_Direction"].cumsum().fillna(0)
+        df["OBV"] = utils.on_balance_volume(df["close"], df["Trading_Volume"])
 
         # --- 繪製股價與OBV走勢圖 ---
         plt.rcParams["font.sans-serif"] = ["Microsoft YaHei", "SimHei"]
@@ -72,3 +92,5 @@ if submitted:
         st.pyplot(plt)
     except Exception as e:
         st.error(f"發生錯誤: {e}")
+
+st.sidebar.caption(utils.data_cache.stats_text())
@@ -3,11 +3,10 @@ import pandas as pd
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from neuralprophet import NeuralProphet
-from FinMind.data import DataLoader
 import matplotlib.pyplot as plt
 import utils
 
-api = DataLoader()
+api = utils.CachedDataLoader()
 
 ticker = st.text_input("輸入股票代碼", "")
 
@@ -49,3 +48,5 @@ if st.button("分析季節性"):
             st.error(f"❌ 發生未預期的錯誤: {str(e)}")
             import traceback
             st.error(traceback.format_exc())
+
+st.sidebar.caption(utils.data_cache.stats_text())
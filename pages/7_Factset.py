@@ -4,9 +4,9 @@
 FactSet 新聞查詢系統 - Streamlit 應用程式
 """
 import streamlit as st
-import sqlite3
 import pandas as pd
 from datetime import datetime
+import utils
 
 # 設定頁面配置
 st.set_page_config(
@@ -45,42 +45,35 @@ class FactSetDB:
     
     def __init__(self, db_name='mystock.db'):
         self.db_name = db_name
+        self.pool = utils.get_pool(db_name)
     
-    def get_connection(self):
-        """獲取資料庫連線"""
-        return sqlite3.connect(self.db_name)
+    def read_query(self, query, params=()):
+        """以連線池執行查詢並回傳 DataFrame"""
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(query, conn, params=params)
     
     def get_all_stock_codes(self):
         """獲取所有股票代碼"""
-        conn = self.get_connection()
         query = "SELECT DISTINCT stock_code, stock_name FROM factset_news ORDER BY stock_code"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        return self.read_query(query)
     
     def get_all_news(self):
         """獲取所有新聞"""
-        conn = self.get_connection()
         query = """
             SELECT stock_code, stock_name, eps, est_price, date, updated_at
             FROM factset_news
             ORDER BY date DESC
         """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        return df
+        return self.read_query(query)
     
     def get_news_by_stock_code(self, stock_code):
         """根據股票代碼查詢"""
-        conn = self.get_connection()
         query = """
             SELECT stock_code, stock_name, eps, est_price, date, updated_at
             FROM factset_news
             WHERE stock_code = ?
         """
-        df = pd.read_sql_query(query, conn, params=(stock_code,))
-        conn.close()
-        return df
+        return self.read_query(query, params=(stock_code,))
   
 
 
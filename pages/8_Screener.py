@@ -0,0 +1,43 @@
+import streamlit as st
+import utils
+
+store = utils.ColumnStore("data/colstore")
+
+with st.form(key="form"):
+    side = st.selectbox("訊號類型:", options=["全部", "Buy", "Sell"])
+    strategies = st.multiselect(
+        "策略:",
+        options=[s.value for s in utils.BuyStrategy] + [s.value for s in utils.SellStrategy],
+    )
+    submitted = st.form_submit_button("執行")
+
+if submitted:
+    try:
+        tickers = store.tickers()
+        if not tickers:
+            raise ValueError("沒有欄式價格檔，請先執行 python data/screener.py --sync")
+
+        # 價格檔沒有變動時結果只算一次 (任何一檔補資料後 key 即改變)
+        result = utils.data_cache.get_or_compute(
+            ("screener", store.fingerprint(tickers)),
+            lambda: utils.screen(utils.store_panels(store, tickers)),
+            expires_at=utils.next_close_expiry(),
+        )
+
+        if side != "全部":
+            result = result[result["side"] == side]
+        if strategies:
+            result = result[result["strategy"].isin(strategies)]
+
+        st.write(
+            f"**{result.attrs['date']:%Y-%m-%d}** 共 {len(tickers)} 檔股票，"
+            f"{len(result)} 個訊號"
+        )
+        st.dataframe(
+            result.style.format({"Close": "{:.2f}", "k": "{:.1f}", "d": "{:.1f}", "rsi": "{:.1f}"}),
+            hide_index=True,
+        )
+    except Exception as e:
+        st.error(f"發生錯誤: {e}")
+
+st.sidebar.caption(utils.data_cache.stats_text())
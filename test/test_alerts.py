@@ -0,0 +1,73 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from utils.alerts import AlertEngine, StrategyStream
+
+
+def _bars(t=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=t))
+    index = pd.bdate_range("2025-01-01", periods=t)
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close + rng.random(t),
+            "Low": close - rng.random(t),
+            "Close": close,
+            "Volume": rng.integers(1000, 5000, t).astype(float),
+        },
+        index=index,
+    )
+
+
+class _Loader:
+    def taiwan_stock_daily(self, stock_id, start_date, end_date):
+        if stock_id == "FAIL":
+            raise RuntimeError("fetch failed")
+        df = _bars().loc[start_date:end_date]
+        return pd.DataFrame(
+            {
+                "date": df.index.strftime("%Y-%m-%d"),
+                "open": df["Open"],
+                "max": df["High"],
+                "min": df["Low"],
+                "close": df["Close"],
+                "Trading_Volume": df["Volume"],
+            }
+        )
+
+
+def _feed(stream, bars):
+    for date_, row in bars.iterrows():
+        stream.update(date_, *row[["Open", "High", "Low", "Close", "Volume"]])
+
+
+def test_json_state_round_trip_matches_uninterrupted_stream():
+    bars = _bars()
+    for buy, sell in [("SMA_5_20", "KD>80"), ("BOLL_KD30", "BOLL_UP"), ("EMA_5_20", "KD>75")]:
+        whole = StrategyStream(buy, sell)
+        _feed(whole, bars)
+        resumed = StrategyStream(buy, sell)
+        _feed(resumed, bars.iloc[:150])
+        resumed = StrategyStream.from_json(resumed.to_json())
+        _feed(resumed, bars.iloc[150:])
+        assert resumed.to_json() == whole.to_json()
+        assert resumed.signals() == whole.signals()
+
+
+def test_failing_ticker_and_bad_state_do_not_stop_the_run(tmp_path):
+    engine = AlertEngine(db_name=str(tmp_path / "alerts.db"), loader=_Loader())
+    strategies = {
+        "GOOD": ("SMA_5_20", "KD>80"),
+        "FAIL": ("SMA_5_20", "KD>80"),
+        "BAD": ("NOPE(", "KD>80"),
+    }
+    result = engine.run(strategies, end_date=date(2025, 9, 1))
+    assert result.attrs["updated"] == 1
+    assert set(result.attrs["errors"]) == {"FAIL", "BAD"}
+
+    engine.pool.execute("UPDATE alert_state SET state = 'garbage' WHERE ticker = 'GOOD'")
+    result = engine.run(strategies, end_date=date(2025, 10, 1))
+    assert result.attrs["updated"] == 1
+    (last_date,) = engine.pool.execute("SELECT last_date FROM alert_state WHERE ticker = 'GOOD'")[0]
+    assert last_date == "2025-10-01"
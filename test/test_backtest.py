@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+from backtesting import Backtest
+from backtesting.test import GOOG
+from utils.backtest import indicator_warmup, vectorized_backtest
+from utils.strategy import get_trade_condition, strategy_columns
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backtesting"))
+from helper import SignalStrategy  # noqa: E402
+
+STRATEGIES = [
+    ("SMA_5_20", "KD>75", True),
+    ("SMA_10_50", "SMA_20_10", False),
+    ("EMA_5_20", "KD>80", True),
+    ("BOLL_KD30", "BOLL_UP", False),
+]
+
+
+def _synthetic(t=1500, seed=2):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, t)))
+    open_ = close * np.exp(rng.normal(0, 0.005, t))
+    return pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) * 1.01,
+            "Low": np.minimum(open_, close) * 0.99,
+            "Close": close,
+            "Volume": rng.integers(1_000, 10_000, t).astype(float),
+        },
+        index=pd.bdate_range("2015-01-01", periods=t),
+    )
+
+
+@pytest.mark.filterwarnings("ignore:Some trades remain open")
+@pytest.mark.parametrize("data", [GOOG, _synthetic()], ids=["GOOG", "synthetic"])
+@pytest.mark.parametrize("buy_strategy, sell_strategy, profit_only", STRATEGIES)
+def test_matches_backtesting_py(data, buy_strategy, sell_strategy, profit_only):
+    df = data.copy()
+    buy, sell = get_trade_condition(df, buy_strategy, sell_strategy)
+    buy = pd.Series(buy).fillna(False).to_numpy(dtype=bool)
+    sell = pd.Series(sell).fillna(False).to_numpy(dtype=bool)
+    warmup = indicator_warmup(df, strategy_columns(buy_strategy, sell_strategy))
+
+    ours = vectorized_backtest(df, buy, sell, profit_only=profit_only, warmup=warmup)
+
+    # backtesting.py 的暖身期來自指標的 NaN，這裡訊號沒有 NaN，改為遮掉暖身期的訊號
+    buy[: warmup + 1] = False
+    sell[: warmup + 1] = False
+    bt = Backtest(df, SignalStrategy, cash=100_000, commission=0.001425)
+    theirs = bt.run(buy_signal=buy, sell_signal=sell, profit_only=profit_only)
+
+    columns = ["Size", "EntryBar", "ExitBar", "EntryPrice", "ExitPrice", "PnL"]
+    expected = theirs["_trades"][columns].reset_index(drop=True)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(
+        ours["_trades"][columns].reset_index(drop=True), expected, check_dtype=False
+    )
+    np.testing.assert_allclose(
+        ours["_equity_curve"]["Equity"].to_numpy(),
+        theirs["_equity_curve"]["Equity"].to_numpy(),
+        rtol=1e-9,
+    )
+    for key in ("Equity Final [$]", "Return [%]", "# Trades", "Win Rate [%]", "SQN"):
+        assert ours[key] == pytest.approx(theirs[key], rel=1e-9, nan_ok=True)
@@ -0,0 +1,26 @@
+from datetime import date, datetime
+from utils.cache import settled_date
+from utils.datasource import CachedDataLoader
+
+
+def test_late_datasets_settle_after_their_ready_time():
+    now = datetime(2026, 10, 16, 16, 0)
+    assert settled_date(now) == date(2026, 10, 16)
+    assert settled_date(now, "taiwan_stock_institutional_investors") == date(2026, 10, 15)
+    assert settled_date(now, "taiwan_stock_margin_purchase_short_sale") == date(2026, 10, 15)
+
+
+def test_coverage_is_not_advanced_before_publication(tmp_path):
+    # 16:00 抓到的法人資料還沒有當天，不能把當天記成已快取
+    loader = CachedDataLoader(db_name=str(tmp_path / "cache.db"), api=object())
+    dataset = "taiwan_stock_institutional_investors"
+    start, end = date(2026, 10, 1), date(2026, 10, 16)
+    fetched_at = datetime(2026, 10, 16, 16, 0)
+    with loader.pool.connection() as conn:
+        loader._update_coverage(conn, dataset, "2330", None, start, end, fetched_at)
+        coverage = loader._get_coverage(conn, dataset, "2330")
+    assert coverage[1] == date(2026, 10, 15)
+
+    later = datetime(2026, 10, 16, 21, 30)
+    ranges = loader._missing_ranges(dataset, coverage, start, end, later)
+    assert ranges == [(date(2026, 10, 16), date(2026, 10, 16))]
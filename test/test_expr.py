@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.expr import RulePlan
+from utils.strategy import (
+    BOLL_KD30,
+    BOLL_UP,
+    EMA_CROSSOVER,
+    KD_ABOVE,
+    KD20,
+    SMA_CROSSOVER,
+    buy_strategy_group,
+    lookup_strategy,
+)
+
+
+def _prices(t=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, t)))
+    return pd.DataFrame(
+        {
+            "Open": close,
+            "High": close * (1 + rng.random(t) * 0.02),
+            "Low": close * (1 - rng.random(t) * 0.02),
+            "Close": close,
+            "Volume": rng.integers(1_000, 10_000, t).astype(float),
+        },
+        index=pd.bdate_range("2018-01-01", periods=t),
+    )
+
+
+# 運算式與手寫策略的對照
+EQUIVALENTS = [
+    ("close <= boll_lower(20, 2) & kd_k(9) < 30 & kd_d(9) < 30", BOLL_KD30()),
+    ("close >= boll_upper(20)", BOLL_UP()),
+    ("kd_k(9) < 20 and kd_d(9) < 20", KD20()),
+    ("kd_k() > 75 & kd_d() > 75", KD_ABOVE(75)),
+    ("cross_above(sma(5), sma(20))", SMA_CROSSOVER(5, 20)),
+    ("cross_above(sma(20), sma(10))", SMA_CROSSOVER(20, 10)),
+    ("cross_above(ema(10), ema(120))", EMA_CROSSOVER(10, 120)),
+    (
+        "sma(5) > sma(20) & shift(sma(5), 1) <= shift(sma(20), 1)",
+        SMA_CROSSOVER(5, 20),
+    ),
+]
+
+
+@pytest.mark.parametrize("rule, strategy", EQUIVALENTS, ids=[rule for rule, _ in EQUIVALENTS])
+def test_rules_match_hand_written_strategies(rule, strategy):
+    df = _prices()
+    result = RulePlan({"rule": rule}).evaluate(df)["rule"]
+    expected = strategy.get_condition(df)
+    assert expected.any()
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+
+def test_plan_shares_subexpressions_across_rules():
+    df = _prices()
+    rules = {rule: rule for rule, _ in EQUIVALENTS}
+    results = RulePlan(rules).evaluate(df)
+    for rule, strategy in EQUIVALENTS:
+        pd.testing.assert_series_equal(results[rule], strategy.get_condition(df), check_names=False)
+
+
+@pytest.mark.parametrize("rule", ["shift(5) > close", "shift(1 + 2, 1) < sma(5)", "cross_above(1, 2)"])
+def test_shift_of_a_constant_is_rejected(rule):
+    with pytest.raises(ValueError, match="shift"):
+        RulePlan({"rule": rule})
+
+
+def test_unknown_strategy_name_raises_key_error():
+    with pytest.raises(KeyError, match="NOT_A_STRATEGY"):
+        lookup_strategy(buy_strategy_group, "NOT_A_STRATEGY")
+    assert lookup_strategy(buy_strategy_group, "close > sma(5)") is lookup_strategy(
+        buy_strategy_group, "close > sma(5)"
+    )
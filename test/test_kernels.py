@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+from utils import kernels
+
+
+def test_memoize_hashes_array_keyword_arguments():
+    kernels.clear_memo()
+    values = np.random.default_rng(0).normal(size=200)
+    first = kernels.sma(values=values, n=5)
+    again = kernels.sma(values=values.copy(), n=5)
+    assert again is first
+    assert kernels.memo_stats == {"hits": 1, "misses": 1}
+    np.testing.assert_array_equal(first, pd.Series(values).rolling(5).mean().to_numpy())
+
+    changed = values.copy()
+    changed[-1] += 1
+    assert kernels.sma(values=changed, n=5)[-1] != first[-1]
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from utils import kernels
+from utils.panel import (
+    panel_bollinger_bands,
+    panel_ewm,
+    panel_kdj,
+    panel_rolling_mean,
+    panel_rolling_std,
+    panel_rsi,
+)
+
+
+def _prices(t=5000, tickers=8, seed=0):
+    # 以 0.05 為跳動單位的價格，夾雜完全持平的區段與停牌 (NaN)
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([-0.05, 0.0, 0.05], size=(t, tickers), p=[0.2, 0.6, 0.2])
+    steps[rng.random((t, tickers)) < 0.3] = 0.0
+    prices = np.round(100 + np.cumsum(steps, axis=0), 2)
+    for start in rng.integers(0, t - 40, size=200):
+        prices[start : start + 30, rng.integers(tickers)] = prices[start, 0]
+    prices[rng.random((t, tickers)) < 0.01] = np.nan
+    index = pd.bdate_range("2005-01-03", periods=t)
+    return pd.DataFrame(prices, index=index, columns=[f"T{i}" for i in range(tickers)])
+
+
+def test_rolling_mean_std_match_pandas():
+    close = _prices()
+    for n in (5, 20, 60):
+        pd.testing.assert_frame_equal(
+            panel_rolling_mean(close, n), close.rolling(n).mean(), check_exact=True
+        )
+        pd.testing.assert_frame_equal(
+            panel_rolling_std(close, n), close.rolling(n).std(), check_exact=True
+        )
+
+
+def test_flat_windows_have_zero_std():
+    close = _prices()
+    std = panel_rolling_std(close, 20)
+    flat = close.rolling(20).max() == close.rolling(20).min()
+    assert flat.to_numpy().sum() > 0
+    assert (std[flat] == 0).to_numpy()[flat.to_numpy()].all()
+
+
+def test_bollinger_comparisons_match_single_ticker():
+    close = _prices()
+    middle, upper, lower = panel_bollinger_bands(close, 20)
+    for ticker in close.columns:
+        c = close[ticker]
+        sma = c.rolling(20).mean()
+        std = c.rolling(20).std()
+        np.testing.assert_array_equal(
+            (c >= upper[ticker]).to_numpy(), (c >= sma + std * 2).to_numpy()
+        )
+        np.testing.assert_array_equal(
+            (c <= lower[ticker]).to_numpy(), (c <= sma - std * 2).to_numpy()
+        )
+
+
+def test_ewm_kdj_rsi_match_single_ticker_kernels():
+    close = _prices(t=2000)
+    high, low = close + 0.1, close - 0.1
+    k, d = panel_kdj(high, low, close)
+    rsi = panel_rsi(close)
+    for ticker in close.columns:
+        c = close[ticker].to_numpy()
+        np.testing.assert_array_equal(
+            panel_ewm(close, span=12)[ticker].to_numpy(), kernels.ema(c, 12)
+        )
+        expected_k, expected_d = kernels.kdj(high[ticker].to_numpy(), low[ticker].to_numpy(), c)
+        np.testing.assert_array_equal(k[ticker].to_numpy(), expected_k)
+        np.testing.assert_array_equal(d[ticker].to_numpy(), expected_d)
+        np.testing.assert_array_equal(rsi[ticker].to_numpy(), kernels.rsi(c))
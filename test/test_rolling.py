@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.rolling import (
+    RollingExtremum,
+    days_since_extremum,
+    rolling_max,
+    rolling_max_value,
+    rolling_min,
+    rolling_min_value,
+)
+
+
+def _panel(t=400, tickers=5, seed=0):
+    # 整數價格讓視窗內常有相同的極值，另加缺值
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, 8, size=(t, tickers)).astype(float)
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return pd.DataFrame(values)
+
+
+def _reference_index(values, n, min_periods, is_max):
+    """逐一視窗計算的極值位置，相同極值取最近的一列"""
+    index = np.full(len(values), -1)
+    for r in range(len(values)):
+        window = values[max(0, r - n + 1) : r + 1]
+        valid = ~np.isnan(window)
+        if valid.sum() < max(min_periods, 1):
+            continue
+        target = np.nanmax(window) if is_max else np.nanmin(window)
+        index[r] = max(0, r - n + 1) + np.flatnonzero(window == target)[-1]
+    return index
+
+
+@pytest.mark.parametrize("n, min_periods", [(1, None), (5, None), (20, None), (20, 3), (500, 1)])
+def test_values_and_indices_match_pandas(n, min_periods):
+    df = _panel()
+    rolling = df.rolling(n, min_periods=min_periods)
+    for function, value_only, pandas_result, is_max in [
+        (rolling_max, rolling_max_value, rolling.max(), True),
+        (rolling_min, rolling_min_value, rolling.min(), False),
+    ]:
+        value, index = function(df, n, min_periods)
+        pd.testing.assert_frame_equal(value, pandas_result)
+        pd.testing.assert_frame_equal(value_only(df, n, min_periods), pandas_result)
+        for column in df.columns:
+            expected = _reference_index(df[column].to_numpy(), n, min_periods or n, is_max)
+            np.testing.assert_array_equal(index[column].to_numpy(), expected)
+
+        # 1D 輸入與逐筆版本結果相同
+        series = df[0]
+        value_1d, index_1d = function(series, n, min_periods)
+        pd.testing.assert_series_equal(value_1d, pandas_result[0])
+        state = RollingExtremum(n, "max" if is_max else "min", min_periods)
+        streamed = [(state.update(v), state.index) for v in series]
+        np.testing.assert_array_equal([v for v, _ in streamed], value_1d.to_numpy())
+        np.testing.assert_array_equal([i for _, i in streamed], index_1d.to_numpy())
+
+
+def test_empty_input_returns_empty_arrays():
+    value, index = rolling_max(np.empty(0), 5)
+    assert value.shape == (0,) and index.shape == (0,)
+    assert rolling_min_value(np.empty((0, 3)), 5).shape == (0, 3)
+
+
+def test_days_since_extremum():
+    x = pd.Series([1.0, 3.0, 2.0, 2.0, 5.0, 4.0])
+    np.testing.assert_array_equal(days_since_extremum(x, 3).to_numpy(), [0, 0, 1, 2, 0, 1])
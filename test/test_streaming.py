@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from utils import formula, kernels
+from utils.streaming import (
+    IndicatorState,
+    RollingMean,
+    RollingStd,
+    StreamingEWM,
+    StreamingVWAP,
+)
+
+
+def _bars(t=3000, seed=0):
+    # 以 0.05 為跳動單位的價格，夾雜完全持平的區段與缺值
+    rng = np.random.default_rng(seed)
+    steps = rng.choice([-0.05, 0.0, 0.05], size=t, p=[0.2, 0.6, 0.2])
+    close = np.round(100 + np.cumsum(steps), 2)
+    for start in rng.integers(0, t - 40, size=20):
+        close[start : start + 30] = close[start]
+    high = np.round(close + rng.choice([0.0, 0.05, 0.1], size=t), 2)
+    low = np.round(close - rng.choice([0.0, 0.05, 0.1], size=t), 2)
+    return pd.DataFrame(
+        {
+            "date": pd.bdate_range("2010-01-04", periods=t),
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": rng.integers(1, 10_000, size=t).astype(float),
+        }
+    )
+
+
+def _stream(state, values):
+    return np.array([state.update(v) for v in values])
+
+
+def test_indicator_state_matches_batch_formulas():
+    df = _bars()
+    state = IndicatorState()
+    rows = pd.DataFrame(
+        [
+            state.update(date, high, low, close)
+            for date, high, low, close in zip(df["date"], df["High"], df["Low"], df["Close"])
+        ]
+    )
+    batch = pd.concat(
+        [formula.calculate_kdj(df), formula.calculate_bollinger_bands(df), formula.calculate_rsi(df)],
+        axis=1,
+    )
+    for column in ["k", "d", "Middle", "Upper", "Lower", "rsi"]:
+        np.testing.assert_array_equal(rows[column].to_numpy(), batch[column].to_numpy())
+
+
+def test_rolling_and_ewm_states_match_pandas_with_gaps():
+    close = _bars()["Close"].to_numpy().copy()
+    close[np.random.default_rng(1).random(len(close)) < 0.02] = np.nan
+    series = pd.Series(close)
+    for n in (5, 20, 60):
+        np.testing.assert_array_equal(
+            _stream(RollingMean(n), close), series.rolling(n).mean().to_numpy()
+        )
+        np.testing.assert_array_equal(
+            _stream(RollingStd(n), close), series.rolling(n).std().to_numpy()
+        )
+        np.testing.assert_array_equal(
+            _stream(StreamingEWM(span=n), close), series.ewm(span=n, adjust=False).mean().to_numpy()
+        )
+        np.testing.assert_array_equal(
+            _stream(StreamingEWM(com=n, adjust=True), close),
+            series.ewm(com=n, adjust=True).mean().to_numpy(),
+        )
+
+
+def test_streaming_vwap_matches_kernel():
+    df = _bars()
+    state = StreamingVWAP()
+    streamed = [
+        state.update(h, l, c, v) for h, l, c, v in zip(df["High"], df["Low"], df["Close"], df["Volume"])
+    ]
+    expected = kernels.vwap(df["High"], df["Low"], df["Close"], df["Volume"])
+    np.testing.assert_array_equal(np.array(streamed), expected)
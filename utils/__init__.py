@@ -1,3 +1,23 @@
 from .formula import *
 from .strategy import *
 from .helper import *
+from .db import *
+from .datasource import *
+from .colstore import *
+from .cache import *
+from .streaming import *
+from .panel import *
+from .pipeline import *
+from .rolling import *
+from .backtest import *
+from .results import *
+from .optimize import *
+from .portfolio import *
+from .montecarlo import *
+from .screener import *
+from .expr import *
+from .alerts import *
+from .candles import *
+from .obv import *
+from .correlation import *
+from . import kernels
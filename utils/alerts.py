@@ -0,0 +1,354 @@
+import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from .cache import settled_date
+from .db import get_pool
+from .pipeline import ALIASES, compute_indicator, resolve_order
+from .rolling import RollingExtremum
+from .strategy import get_trade_condition, strategy_columns
+from .streaming import (
+    RollingMean,
+    RollingStd,
+    StreamingEWM,
+    StreamingRSI,
+    StreamingVWAP,
+    _divide,
+)
+
+
+# 收盤後的 watch_list 訊號通知。每檔股票保存逐筆指標的狀態，
+# 新的 K 棒只更新狀態一次，再以最後幾根 K 棒評估已儲存的買賣策略。
+
+# 評估條件時保留的最後 K 棒數，需大於策略中 shift / 交叉比較的回看根數
+TAIL_BARS = 10
+
+# StrategyStream 的結構改變時遞增，舊版本的狀態會捨棄並以歷史資料重新暖身
+STATE_VERSION = 3
+
+logger = logging.getLogger(__name__)
+
+
+# 可存入 alert_state 的逐筆狀態類別，屬性只含數值、bool、deque 與巢狀的這些類別
+_STATE_CLASSES = {
+    cls.__name__: cls
+    for cls in (RollingMean, RollingStd, StreamingEWM, StreamingRSI, StreamingVWAP, RollingExtremum)
+}
+
+
+def _dump_state(value):
+    """把逐筆狀態轉成可 JSON 化的結構 (浮點數、list、dict)"""
+    if type(value).__name__ in _STATE_CLASSES:
+        attrs = {name: _dump_state(v) for name, v in vars(value).items()}
+        return {"type": type(value).__name__, "attrs": attrs}
+    if isinstance(value, deque):
+        return {"deque": [_dump_state(v) for v in value]}
+    if isinstance(value, tuple):
+        return [_dump_state(v) for v in value]
+    return value
+
+
+def _load_state(value):
+    """_dump_state 的反向操作，未知的類別會拋出 KeyError"""
+    if isinstance(value, dict) and "type" in value:
+        obj = _STATE_CLASSES[value["type"]].__new__(_STATE_CLASSES[value["type"]])
+        for name, v in value["attrs"].items():
+            setattr(obj, name, _load_state(v))
+        return obj
+    if isinstance(value, dict) and "deque" in value:
+        # deque 中的 list 原本是 tuple (例如 RollingExtremum 的 (序號, 值))
+        return deque(tuple(v) if isinstance(v, list) else v for v in value["deque"])
+    return value
+
+
+class _StreamOps:
+    """compute_indicator 的逐筆版本: 每個指標欄位一個 utils.streaming 狀態，O(1) 更新"""
+
+    def __init__(self):
+        self.states = {}
+
+    def _update(self, name, factory, *values):
+        state = self.states.get(name)
+        if state is None:
+            state = self.states[name] = factory()
+        return state.update(*values)
+
+    def mean(self, name, x, n):
+        return self._update(name, lambda: RollingMean(n), x)
+
+    def std(self, name, x, n):
+        return self._update(name, lambda: RollingStd(n), x)
+
+    def ema(self, name, x, n):
+        return self._update(name, lambda: StreamingEWM(span=n), x)
+
+    def ewm(self, name, x, com):
+        return self._update(name, lambda: StreamingEWM(com=com), x)
+
+    def lowest(self, name, x, n):
+        return self._update(name, lambda: RollingExtremum(n, "min"), x)
+
+    def highest(self, name, x, n):
+        return self._update(name, lambda: RollingExtremum(n, "max"), x)
+
+    def rsi(self, name, x, n):
+        return self._update(name, lambda: StreamingRSI(n), x)
+
+    def vwap(self, name, high, low, close, volume):
+        return self._update(name, StreamingVWAP, high, low, close, volume)
+
+    def divide(self, a, b):
+        return _divide(a, b)
+
+
+class StrategyStream:
+    """
+    一組買賣策略的逐筆狀態: 策略需要的每個指標各一個 utils.streaming 的狀態，
+    每根新 K 棒 O(1) 更新，並保留最後 TAIL_BARS 根的價格與指標供評估條件。
+    """
+
+    def __init__(self, buy_strategy, sell_strategy):
+        self.buy_strategy = buy_strategy
+        self.sell_strategy = sell_strategy
+        columns = strategy_columns(buy_strategy, sell_strategy)
+        self.order = resolve_order(columns)
+        self.aliases = [name for name in dict.fromkeys(columns) if name in ALIASES]
+        self.ops = _StreamOps()
+        self.dates = deque(maxlen=TAIL_BARS)
+        self.rows = deque(maxlen=TAIL_BARS)
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if self.dates else None
+
+    def to_json(self):
+        """以 JSON 保存狀態: 指標狀態的數值、最後幾根 K 棒 (日期為 ISO 字串)"""
+        return json.dumps(
+            {
+                "version": STATE_VERSION,
+                "buy_strategy": self.buy_strategy,
+                "sell_strategy": self.sell_strategy,
+                "dates": [date.isoformat() for date in self.dates],
+                "rows": list(self.rows),
+                "states": {name: _dump_state(state) for name, state in self.ops.states.items()},
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        """
+        還原 to_json 保存的狀態。
+
+        版本不同或格式錯誤時拋出 ValueError / KeyError，呼叫端應改以歷史資料重建。
+        """
+        data = json.loads(text)
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Unsupported alert state version: {data.get('version')}")
+        stream = cls(data["buy_strategy"], data["sell_strategy"])
+        stream.dates.extend(pd.Timestamp(date) for date in data["dates"])
+        stream.rows.extend(data["rows"])
+        stream.ops.states = {name: _load_state(state) for name, state in data["states"].items()}
+        return stream
+
+    def update(self, date, open_, high, low, close, volume):
+        row = {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}
+        for name in self.order:
+            row[name] = compute_indicator(name, row, row.__getitem__, self.ops)
+        for name in self.aliases:
+            row[name] = row[ALIASES[name]]
+        self.dates.append(date)
+        self.rows.append(row)
+        return row
+
+    def signals(self):
+        """最後一根 K 棒的 (買進, 賣出) 訊號"""
+        df = pd.DataFrame(list(self.rows), index=pd.DatetimeIndex(self.dates))
+        buy, sell = get_trade_condition(df, self.buy_strategy, self.sell_strategy)
+        buy = pd.Series(buy).fillna(False)
+        sell = pd.Series(sell).fillna(False)
+        return bool(buy.iloc[-1]), bool(sell.iloc[-1])
+
+
+class AlertEngine:
+    """
+    收盤後依 watch_list 的 buy_strategy / sell_strategy 產生買賣通知。
+
+    每檔股票的 StrategyStream 以 JSON 存在 alert_state 資料表，下次只處理之後的新 K 棒；
+    沒有新 K 棒的股票直接略過。新的 Buy / Sell 事件寫入 alert_outbox 資料表。
+    策略被修改時以歷史資料重新暖身。
+    """
+
+    def __init__(self, db_name="mystock.db", store=None, loader=None, history_years=2):
+        self.db_name = db_name
+        self.store = store
+        self.loader = loader
+        self.history_years = history_years
+        self.pool = get_pool(db_name)
+        self._stored = set()
+        self._create_table()
+
+    def _create_table(self):
+        with self.pool.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alert_state (
+                    ticker TEXT PRIMARY KEY,
+                    buy_strategy TEXT,
+                    sell_strategy TEXT,
+                    last_date TEXT,
+                    state TEXT
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS alert_outbox (
+                    ticker TEXT,
+                    date TEXT,
+                    side TEXT,
+                    strategy TEXT,
+                    close REAL,
+                    created_at TEXT,
+                    PRIMARY KEY (ticker, date, side)
+                )
+                """
+            )
+
+    def _bars(self, ticker, after, end):
+        """(after, end] 之間的 K 棒，after 為 None 時取 history_years 年的歷史"""
+        if after is not None:
+            start = after + timedelta(days=1)
+        else:
+            start = end - timedelta(days=365 * self.history_years)
+        if ticker in self._stored:
+            df = self.store.price_frame(ticker)
+        elif self.loader is not None:
+            df = self.loader.taiwan_stock_daily(
+                ticker, start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+            )
+            if df.empty:
+                return df
+            df = df.rename(
+                columns={"open": "Open", "max": "High", "min": "Low", "close": "Close",
+                         "Trading_Volume": "Volume"}
+            ).set_index(pd.to_datetime(df["date"]))
+        else:
+            raise ValueError("AlertEngine needs a ColumnStore or a data loader")
+        return df.loc[pd.Timestamp(start) : pd.Timestamp(end)]
+
+    def _load_states(self):
+        """讀取已保存的狀態，無法還原或版本不同的略過 (之後以歷史資料重建)"""
+        states = {}
+        for ticker, state in self.pool.execute("SELECT ticker, state FROM alert_state"):
+            try:
+                states[ticker] = StrategyStream.from_json(state)
+            except Exception as e:
+                logger.warning("Dropping alert state for %s: %s", ticker, e)
+        return states
+
+    def run(self, strategies, end_date=None):
+        """
+        處理所有股票的新 K 棒。
+
+        參數:
+        strategies (dict): {ticker: (buy_strategy, sell_strategy)}，例如 watch_list_strategies()。
+        end_date (date): 只處理到這一天，預設為資料已定案的最後一天。
+
+        回傳:
+        DataFrame: 新產生的事件 (ticker, date, side, strategy, close)。
+        attrs: updated / skipped 為有新 K 棒與沒有變動的股票數，
+        errors 為 {ticker: 錯誤訊息} (該股票的狀態不更新，下次重試)。
+        """
+        end = end_date or settled_date()
+        self._stored = set(self.store.tickers()) if self.store is not None else set()
+        states = self._load_states()
+        events = []
+        saved = []
+        skipped = 0
+        errors = {}
+
+        for ticker, (buy_strategy, sell_strategy) in strategies.items():
+            # 單一股票失敗 (策略無法解析、抓取失敗) 不影響其他股票
+            try:
+                result = self._process(ticker, buy_strategy, sell_strategy, states.get(ticker), end)
+            except Exception as e:
+                logger.warning("Alert update failed for %s: %s", ticker, e)
+                errors[ticker] = str(e)
+                continue
+            if result is None:
+                skipped += 1
+                continue
+            stream, ticker_events = result
+            events += ticker_events
+            last_date = stream.last_date.strftime("%Y-%m-%d")
+            saved.append(
+                (ticker, buy_strategy, sell_strategy, last_date, stream.to_json())
+            )
+
+        now = datetime.now().isoformat()
+        with self.pool.connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO alert_state "
+                "(ticker, buy_strategy, sell_strategy, last_date, state) VALUES (?, ?, ?, ?, ?)",
+                saved,
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO alert_outbox "
+                "(ticker, date, side, strategy, close, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [event + (now,) for event in events],
+            )
+
+        result = pd.DataFrame(events, columns=["ticker", "date", "side", "strategy", "close"])
+        result.attrs.update(updated=len(saved), skipped=skipped, errors=errors)
+        return result
+
+    def _process(self, ticker, buy_strategy, sell_strategy, stream, end):
+        """
+        以新 K 棒更新一檔股票的狀態。
+
+        回傳:
+        tuple: (stream, 事件 list)，沒有新 K 棒時回傳 None。
+        """
+        if stream is None or (stream.buy_strategy, stream.sell_strategy) != (
+            buy_strategy,
+            sell_strategy,
+        ):
+            stream = StrategyStream(buy_strategy, sell_strategy)
+        last = stream.last_date.date() if stream.last_date is not None else None
+
+        bars = self._bars(ticker, last, end)
+        if bars.empty:
+            return None
+
+        # 暖身時只通知最後一根 K 棒的訊號，避免把歷史訊號全部寫入
+        notify_from = bars.index[-1] if last is None else bars.index[0]
+        columns = [
+            bars[c].to_numpy(dtype=np.float64)
+            for c in ("Open", "High", "Low", "Close", "Volume")
+        ]
+        events = []
+        for i, date in enumerate(bars.index):
+            stream.update(date, *(float(values[i]) for values in columns))
+            if date < notify_from:
+                continue
+            buy, sell = stream.signals()
+            close = float(columns[3][i])
+            if buy:
+                events.append((ticker, date.strftime("%Y-%m-%d"), "Buy", buy_strategy, close))
+            elif sell:
+                events.append((ticker, date.strftime("%Y-%m-%d"), "Sell", sell_strategy, close))
+        return stream, events
+
+    def outbox(self, since=None):
+        """讀取 alert_outbox 中的事件，since 為 "YYYY-MM-DD" 時只取該日之後"""
+        query = "SELECT ticker, date, side, strategy, close, created_at FROM alert_outbox"
+        params = ()
+        if since is not None:
+            query += " WHERE date >= ?"
+            params = (since,)
+        rows = self.pool.execute(query + " ORDER BY date, ticker", params)
+        return pd.DataFrame(
+            rows, columns=["ticker", "date", "side", "strategy", "close", "created_at"]
+        )
@@ -0,0 +1,189 @@
+import sys
+import numpy as np
+import pandas as pd
+from .pipeline import with_indicators
+from .strategy import get_trade_condition, strategy_columns
+
+
+# 以陣列運算執行的回測，撮合規則與 backtesting.py 的 Backtest 相同:
+# 訊號出現在第 i 根 K 棒收盤，於第 i+1 根開盤價成交；買進時以全部現金買整數股；
+# 手續費於進場與出場各收一次。同一時間只持有一筆部位。
+
+# backtesting.py 的 self.buy() 預設下單比例
+_ORDER_SIZE = 1 - sys.float_info.epsilon
+
+
+def _first_at_or_after(indices, position):
+    i = np.searchsorted(indices, position)
+    return indices[i] if i < len(indices) else None
+
+
+def _trade_bars(buy, sell, close, open_, cash, commission, start, profit_only):
+    """
+    找出每筆交易的進出場位置與股數。
+    迴圈次數為交易筆數，每次以 searchsorted 直接跳到下一個訊號。
+    """
+    n = len(close)
+    buy_idx = np.flatnonzero(buy[: n - 1])
+    # 同一根 K 棒同時有買進訊號時不賣出 (與 if buy ... elif sell 的順序相同)
+    exit_idx = np.flatnonzero((sell & ~buy)[: n - 1])
+
+    trades = []
+    position = start
+    while True:
+        signal = _first_at_or_after(buy_idx, position)
+        if signal is None:
+            break
+        entry = signal + 1
+        price = open_[entry]
+        price_plus_commission = price + (_ORDER_SIZE * price * commission) / _ORDER_SIZE
+        size = int((cash * 1 * _ORDER_SIZE) // price_plus_commission)
+        if not size:
+            position = signal + 1
+            continue
+
+        candidates = exit_idx[np.searchsorted(exit_idx, entry):]
+        if profit_only:
+            candidates = candidates[close[candidates] > price]
+        exit_ = candidates[0] + 1 if len(candidates) else None
+        trades.append((size, entry, exit_, price))
+        if exit_ is None:
+            break
+
+        exit_price = open_[exit_]
+        pl = size * (exit_price - price)
+        cash = cash - size * price * commission
+        cash += pl - size * exit_price * commission
+        position = exit_
+    return trades
+
+
+def _geometric_mean(returns):
+    returns = returns.fillna(0) + 1
+    if np.any(returns <= 0):
+        return 0
+    return np.exp(np.log(returns).sum() / (len(returns) or np.nan)) - 1
+
+
+def vectorized_backtest(
+    df,
+    buy,
+    sell,
+    cash=100_000,
+    commission=0.001425,
+    profit_only=False,
+    warmup=0,
+    name=None,
+):
+    """
+    依買賣訊號回測單一股票。
+
+    參數:
+    df (DataFrame): 含 Open、Close 欄位的股價資料 (索引為日期)。
+    buy, sell (Series): 與 df 對齊的布林訊號。
+    cash (float): 初始資金。
+    commission (float): 單邊手續費率，預設 0.1425%。
+    profit_only (bool): 只在未實現損益為正時才賣出 (backtesting/helper.py 策略的出場規則)。
+    warmup (int): 指標暖身所需的 K 棒數，之前的訊號不交易，對應 backtesting.py 的暖身期。
+    name (str): 顯示在 '_strategy' 的策略名稱。
+
+    回傳:
+    Series: 與 Backtest.run() 相同名稱的統計數字，另含 '_equity_curve' 與 '_trades'。
+    """
+    index = df.index
+    close = df["Close"].to_numpy(dtype=np.float64)
+    open_ = df["Open"].to_numpy(dtype=np.float64)
+    buy = np.asarray(pd.Series(buy).fillna(False), dtype=bool)
+    sell = np.asarray(pd.Series(sell).fillna(False), dtype=bool)
+    n = len(close)
+
+    trades = _trade_bars(buy, sell, close, open_, cash, commission, warmup + 1, profit_only)
+
+    # 現金只在進出場當根變動，逐筆累加即得每根 K 棒的現金
+    cash_delta = np.zeros(n)
+    cash_delta[0] = cash
+    holding = np.zeros(n)
+    entry_price = np.zeros(n)
+    records = []
+    for size, entry, exit_, price in trades:
+        cash_delta[entry] -= size * price * commission
+        end = exit_ if exit_ is not None else n
+        holding[entry:end] = size
+        entry_price[entry:end] = price
+        if exit_ is None:
+            continue
+        exit_price = open_[exit_]
+        exit_commission = size * exit_price * commission
+        cash_delta[exit_] += size * (exit_price - price) - exit_commission
+        commissions = exit_commission + size * price * commission
+        records.append(
+            {
+                "Size": size,
+                "EntryBar": entry,
+                "ExitBar": exit_,
+                "EntryPrice": price,
+                "ExitPrice": exit_price,
+                "PnL": size * (exit_price - price) - commissions,
+                "Commission": commissions,
+                "ReturnPct": (exit_price / price - 1) - commissions / (size * price),
+                "EntryTime": index[entry],
+                "ExitTime": index[exit_],
+            }
+        )
+
+    equity = np.cumsum(cash_delta) + (close * holding - holding * entry_price)
+    dd = 1 - equity / np.maximum.accumulate(equity)
+
+    columns = ["Size", "EntryBar", "ExitBar", "EntryPrice", "ExitPrice", "PnL",
+               "Commission", "ReturnPct", "EntryTime", "ExitTime"]
+    trades_df = pd.DataFrame(records, columns=columns)
+    trades_df["Duration"] = trades_df["ExitTime"] - trades_df["EntryTime"]
+    pl = trades_df["PnL"]
+    returns = trades_df["ReturnPct"]
+
+    in_market = np.zeros(n + 1)
+    np.add.at(in_market, trades_df["EntryBar"].to_numpy(dtype=int), 1)
+    np.add.at(in_market, trades_df["ExitBar"].to_numpy(dtype=int) + 1, -1)
+    n_trades = len(trades_df)
+    win_rate = np.nan if not n_trades else (pl > 0).mean()
+
+    s = {}
+    s["Start"] = index[0]
+    s["End"] = index[-1]
+    s["Duration"] = s["End"] - s["Start"]
+    s["Exposure Time [%]"] = (np.cumsum(in_market)[:n] > 0).mean() * 100
+    s["Equity Final [$]"] = equity[-1]
+    s["Equity Peak [$]"] = equity.max()
+    if n_trades:
+        s["Commissions [$]"] = trades_df["Commission"].sum()
+    s["Return [%]"] = (equity[-1] - equity[0]) / equity[0] * 100
+    s["Buy & Hold Return [%]"] = (close[-1] - close[warmup]) / close[warmup] * 100
+    s["Max. Drawdown [%]"] = -np.nan_to_num(dd.max()) * 100
+    s["# Trades"] = n_trades
+    s["Win Rate [%]"] = win_rate * 100
+    s["Best Trade [%]"] = returns.max() * 100
+    s["Worst Trade [%]"] = returns.min() * 100
+    s["Avg. Trade [%]"] = _geometric_mean(returns) * 100
+    s["Profit Factor"] = returns[returns > 0].sum() / (abs(returns[returns < 0].sum()) or np.nan)
+    s["Expectancy [%]"] = returns.mean() * 100
+    s["SQN"] = np.sqrt(n_trades) * pl.mean() / (pl.std() or np.nan)
+    s["_strategy"] = name
+    s["_equity_curve"] = pd.DataFrame({"Equity": equity, "DrawdownPct": dd}, index=index)
+    s["_trades"] = trades_df
+    return pd.Series(s, dtype=object)
+
+
+def indicator_warmup(df, columns):
+    """指標欄位開頭 NaN 的最大筆數，與 backtesting.py 計算暖身期的方式相同"""
+    if not columns:
+        return 0
+    values = with_indicators(df, columns)[list(dict.fromkeys(columns))].to_numpy(dtype=np.float64)
+    return int(np.isnan(values).argmin(axis=0).max())
+
+
+def backtest_strategy(df, buy_strategy, sell_strategy, **kwargs):
+    """以 utils.strategy 的買賣策略名稱回測，參數同 vectorized_backtest"""
+    buy, sell = get_trade_condition(df, buy_strategy, sell_strategy)
+    kwargs.setdefault("warmup", indicator_warmup(df, strategy_columns(buy_strategy, sell_strategy)))
+    kwargs.setdefault("name", f"{buy_strategy}/{sell_strategy}")
+    return vectorized_backtest(df, buy, sell, **kwargs)
@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+import pandas as pd
+
+
+# 收盤後資料約於此時間更新完成，之前抓到的當日資料視為未定案
+DATA_READY_TIME = time(15, 0)
+# 盤後較晚才公布的資料集 (DataLoader 方法名稱)，其餘以 DATA_READY_TIME 為準
+DATASET_READY_TIMES = {
+    "taiwan_stock_per_pbr": time(18, 0),
+    "taiwan_stock_institutional_investors": time(21, 0),
+    "taiwan_stock_margin_purchase_short_sale": time(22, 0),
+}
+# 未定案的尾段資料多久內不重抓
+TAIL_TTL = timedelta(minutes=10)
+
+
+def ready_time(dataset=None):
+    """資料集當日資料更新完成的時間"""
+    return DATASET_READY_TIMES.get(dataset, DATA_READY_TIME)
+
+
+def settled_date(now=None, dataset=None):
+    """回傳資料已定案的最後日期"""
+    now = now or datetime.now()
+    if now.time() >= ready_time(dataset):
+        return now.date()
+    return now.date() - timedelta(days=1)
+
+
+def next_close_expiry(now=None, dataset=None):
+    """下一次收盤資料更新的時間，快取在此之後失效"""
+    now = now or datetime.now()
+    expiry = datetime.combine(now.date(), ready_time(dataset))
+    if now >= expiry:
+        expiry += timedelta(days=1)
+    return expiry
+
+
+def range_expiry(end_date, now=None, dataset=None):
+    """
+    依資料區間決定失效時間: 含未定案日期的資料只保留 TAIL_TTL，
+    其餘保留到下一次收盤更新。
+    """
+    now = now or datetime.now()
+    if datetime.strptime(end_date, "%Y-%m-%d").date() > settled_date(now, dataset):
+        return now + TAIL_TTL
+    return next_close_expiry(now, dataset)
+
+
+def _sizeof(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(sys.getsizeof(k) + _sizeof(v) for k, v in value.items())
+    # ndarray 與自行回報大小的物件 (例如 RollingCorrelation)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    # 呼叫端常會直接修改 DataFrame，一律交出副本
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, tuple):
+        return tuple(_copy(v) for v in value)
+    return value
+
+
+class DataCache:
+    """
+    程序內共用的 LRU 快取，所有 Streamlit session 共享。
+
+    以 (ticker, 資料集, 日期區間...) 為 key，超過記憶體預算時淘汰最久未使用的項目，
+    每個項目另有失效時間 (預設為下一次收盤更新)。
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= datetime.now():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return _copy(entry[0])
+
+    def put(self, key, value, expires_at=None):
+        """存入快取，呼叫端之後不應再修改 value"""
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = expires_at or next_close_expiry()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute, expires_at=None):
+        """命中時回傳快取副本，否則呼叫 compute() 並存入"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        self.put(key, value, expires_at)
+        return _copy(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def stats_text(self):
+        s = self.stats()
+        total = s["hits"] + s["misses"]
+        hit_rate = s["hits"] / total * 100 if total else 0.0
+        return (
+            f"快取: 命中 {s['hits']} / 未命中 {s['misses']} ({hit_rate:.0f}%)，"
+            f"{s['entries']} 項，{s['bytes'] / 1024 / 1024:.1f} MB"
+        )
+
+
+# 整個程序共用的快取，預算可由環境變數 DATA_CACHE_MB 設定
+data_cache = DataCache(max_bytes=int(os.environ.get("DATA_CACHE_MB", 512)) * 1024 * 1024)
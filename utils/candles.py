@@ -0,0 +1,332 @@
+import time as _time
+from collections import deque
+import numpy as np
+import pandas as pd
+
+
+# K 棒型態。單根型態依列出的順序取第一個符合的分類，
+# 批次版本以 np.select 一次求出 (可用於單一股票或日期 × 股票面板)，
+# 逐筆版本的多根型態以最近三根 K 棒判斷，每根 K 棒的計算量固定。
+
+CANDLE_TYPES = [
+    "Spinning_Top",
+    "Long_Body",
+    "Hammer",
+    "Hanging_Man",
+    "Shooting_Star",
+    "Doji",
+]
+
+STRENGTHS = ["Strong_Bull", "Mild_Bull", "Strong_Bear", "Mild_Bear"]
+
+PATTERNS = [
+    "Bullish_Engulfing",
+    "Bearish_Engulfing",
+    "Morning_Star",
+    "Evening_Star",
+    "Three_White_Soldiers",
+    "Three_Black_Crows",
+]
+
+# 多根型態中「長實體」與「小實體」的實體比例門檻
+LONG_BODY = 0.5
+SMALL_BODY = 0.3
+
+_RENAME = {
+    "open": "Open",
+    "max": "High",
+    "high": "High",
+    "min": "Low",
+    "low": "Low",
+    "close": "Close",
+    "volume": "Volume",
+    "Trading_Volume": "Volume",
+}
+
+
+# 代碼: 0 為 Normal / Neutral，之後依序為 CANDLE_TYPES / STRENGTHS，缺值為 -1
+CANDLE_LABELS = ["Normal"] + CANDLE_TYPES
+STRENGTH_LABELS = ["Neutral"] + STRENGTHS
+
+
+def _arrays(open_, high, low, close):
+    return tuple(
+        x.to_numpy(dtype=np.float64) if isinstance(x, (pd.Series, pd.DataFrame))
+        else np.asarray(x, dtype=np.float64)
+        for x in (open_, high, low, close)
+    )
+
+
+def candle_parts(open_, high, low, close):
+    """
+    實體、上影線、下影線占整根 K 棒範圍的比例 (不修改輸入)。
+    High 等於 Low 時範圍以 0.0001 計算。
+
+    回傳:
+    tuple: (body_ratio, upper_wick_ratio, lower_wick_ratio) 陣列。
+    """
+    o, h, l, c = _arrays(open_, high, low, close)
+    total_range = h - l
+    total_range = np.where(total_range == 0, 0.0001, total_range)
+    top = np.maximum(o, c)
+    bottom = np.minimum(o, c)
+    return np.abs(c - o) / total_range, (h - top) / total_range, (bottom - l) / total_range
+
+
+def classify_candles(open_, high, low, close):
+    """
+    單根 K 棒型態代碼 (CANDLE_LABELS 的索引)，一次 np.select 完成。
+    輸入可為 1D (單一股票) 或 2D (日期 × 股票)，回傳相同形狀的 int8 陣列。
+    """
+    o, h, l, c = _arrays(open_, high, low, close)
+    body, upper, lower = candle_parts(o, h, l, c)
+    with np.errstate(invalid="ignore"):
+        bullish = c > o
+        bearish = c < o
+        small = body < 0.4
+        long_lower = lower > 0.6
+        conditions = [
+            body < 0.3,
+            body > 0.7,
+            long_lower & small & bullish,
+            long_lower & small & bearish,
+            (upper > 0.6) & small,
+            body < 0.1,
+        ]
+    codes = np.select(conditions, np.arange(1, len(conditions) + 1, dtype=np.int8), 0)
+    codes = codes.astype(np.int8)
+    codes[np.isnan(o) | np.isnan(h) | np.isnan(l) | np.isnan(c)] = -1
+    return codes
+
+
+def strength_codes(open_, high, low, close):
+    """多空強度代碼 (STRENGTH_LABELS 的索引)，規則同 Candle.strength"""
+    o, h, l, c = _arrays(open_, high, low, close)
+    body, _, _ = candle_parts(o, h, l, c)
+    signed = np.where(c >= o, body, -body)
+    with np.errstate(invalid="ignore"):
+        conditions = [signed > 0.3, signed > 0.1, signed < -0.3, signed < -0.1]
+    codes = np.select(conditions, np.arange(1, 5, dtype=np.int8), 0).astype(np.int8)
+    codes[np.isnan(signed)] = -1
+    return codes
+
+
+def to_labels(codes, labels, index=None):
+    """代碼轉成 Categorical Series，-1 為 NaN"""
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=index)
+
+
+def classify_frame(df):
+    """
+    整份 OHLC DataFrame 分類。
+
+    回傳:
+    DataFrame: Candle_Type 與 Strength 兩個 Categorical 欄位，索引同 df。
+    """
+    args = (df["Open"], df["High"], df["Low"], df["Close"])
+    return pd.DataFrame(
+        {
+            "Candle_Type": to_labels(classify_candles(*args), CANDLE_LABELS, df.index),
+            "Strength": to_labels(strength_codes(*args), STRENGTH_LABELS, df.index),
+        }
+    )
+
+
+def count_candles(panels, types=("Hammer", "Shooting_Star")):
+    """
+    全市場每天各型態的股票數。
+
+    參數:
+    panels (dict): {"Open", "High", "Low", "Close"} 的 (日期 × 股票) DataFrame，
+    例如 utils.store_panels 的結果。
+    types (tuple): 要計數的型態名稱。
+
+    回傳:
+    DataFrame: 日期 × 型態的股票數。
+    """
+    codes = classify_candles(panels["Open"], panels["High"], panels["Low"], panels["Close"])
+    return pd.DataFrame(
+        {name: (codes == CANDLE_LABELS.index(name)).sum(axis=1) for name in types},
+        index=panels["Close"].index,
+    )
+
+
+class Candle:
+    """一根 K 棒及其實體、影線比例"""
+
+    __slots__ = ("time", "open", "high", "low", "close", "volume", "body", "upper", "lower")
+
+    def __init__(self, time, open_, high, low, close, volume=0.0):
+        self.time = time
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        total_range = (high - low) or 0.0001
+        self.body = abs(close - open_) / total_range
+        self.upper = (high - max(open_, close)) / total_range
+        self.lower = (min(open_, close) - low) / total_range
+
+    @property
+    def bullish(self):
+        return self.close > self.open
+
+    @property
+    def bearish(self):
+        return self.close < self.open
+
+    def candle_type(self):
+        if self.body < 0.3:
+            return "Spinning_Top"
+        if self.body > 0.7:
+            return "Long_Body"
+        if self.lower > 0.6 and self.body < 0.4 and self.bullish:
+            return "Hammer"
+        if self.lower > 0.6 and self.body < 0.4 and self.bearish:
+            return "Hanging_Man"
+        if self.upper > 0.6 and self.body < 0.4:
+            return "Shooting_Star"
+        if self.body < 0.1:
+            return "Doji"
+        return "Normal"
+
+    def strength(self):
+        signed = self.body if self.close >= self.open else -self.body
+        if signed > 0.3:
+            return "Strong_Bull"
+        if signed > 0.1:
+            return "Mild_Bull"
+        if signed < -0.3:
+            return "Strong_Bear"
+        if signed < -0.1:
+            return "Mild_Bear"
+        return "Neutral"
+
+
+def _pattern(bars):
+    """最近三根 K 棒 (由舊到新) 形成的多根型態，沒有時回傳空字串"""
+    c = bars[-1]
+    if len(bars) >= 2:
+        p = bars[-2]
+        if p.bearish and c.bullish and c.open <= p.close and c.close >= p.open:
+            return "Bullish_Engulfing"
+        if p.bullish and c.bearish and c.open >= p.close and c.close <= p.open:
+            return "Bearish_Engulfing"
+    if len(bars) >= 3:
+        a, b = bars[-3], bars[-2]
+        if (
+            a.bearish
+            and a.body > LONG_BODY
+            and b.body < SMALL_BODY
+            and c.bullish
+            and c.close > (a.open + a.close) / 2
+        ):
+            return "Morning_Star"
+        if (
+            a.bullish
+            and a.body > LONG_BODY
+            and b.body < SMALL_BODY
+            and c.bearish
+            and c.close < (a.open + a.close) / 2
+        ):
+            return "Evening_Star"
+        if (
+            all(x.bullish and x.body > LONG_BODY for x in (a, b, c))
+            and a.close < b.close < c.close
+            and a.open <= b.open <= a.close
+            and b.open <= c.open <= b.close
+        ):
+            return "Three_White_Soldiers"
+        if (
+            all(x.bearish and x.body > LONG_BODY for x in (a, b, c))
+            and a.close > b.close > c.close
+            and a.close <= b.open <= a.open
+            and b.close <= c.open <= b.open
+        ):
+            return "Three_Black_Crows"
+    return ""
+
+
+class CandleStream:
+    """
+    逐根分類 K 棒。update 傳入一根已收盤的 K 棒，回傳其單根型態、
+    多空強度與由最近三根形成的多根型態；只保留最近三根，計算量與已處理的根數無關。
+    """
+
+    def __init__(self):
+        self.bars = deque(maxlen=3)
+
+    def update(self, time, open_, high, low, close, volume=0.0):
+        candle = Candle(time, open_, high, low, close, volume)
+        self.bars.append(candle)
+        return {
+            "time": time,
+            "Open": open_,
+            "High": high,
+            "Low": low,
+            "Close": close,
+            "Volume": volume,
+            "Candle_Type": candle.candle_type(),
+            "Strength": candle.strength(),
+            "Pattern": _pattern(self.bars),
+        }
+
+
+class BarAggregator:
+    """
+    將 1 分 K 合併成 minutes 分鐘的 K 棒。update 在上一根合併 K 棒收盤時回傳它，
+    否則回傳 None；flush 回傳目前尚未收盤的最後一根。
+    """
+
+    def __init__(self, minutes=5):
+        self.minutes = minutes
+        self.current = None
+
+    def _bucket(self, time):
+        return time.floor(f"{self.minutes}min")
+
+    def update(self, time, open_, high, low, close, volume=0.0):
+        bucket = self._bucket(time)
+        closed = None
+        if self.current is not None and self.current[0] != bucket:
+            closed = self.flush()
+        if self.current is None:
+            self.current = [bucket, open_, high, low, close, volume]
+        else:
+            bar = self.current
+            bar[2] = max(bar[2], high)
+            bar[3] = min(bar[3], low)
+            bar[4] = close
+            bar[5] += volume
+        return closed
+
+    def flush(self):
+        bar, self.current = self.current, None
+        return tuple(bar) if bar is not None else None
+
+
+def prepare_minute_bars(df):
+    """
+    整理分 K 資料: FinMind taiwan_stock_kbar 的 date + minute 欄位或單一 time 欄位
+    合併成 time，價格欄位改為 Open / High / Low / Close / Volume，依時間排序。
+    """
+    df = df.rename(columns=_RENAME)
+    if "minute" in df:
+        time = pd.to_datetime(df["date"].astype(str) + " " + df["minute"].astype(str))
+    else:
+        time = pd.to_datetime(df["time"] if "time" in df else df["date"])
+    df = df.assign(time=time).sort_values("time", kind="stable")
+    return df[["time", "Open", "High", "Low", "Close", "Volume"]].reset_index(drop=True)
+
+
+def replay_minute_bars(path, speed=0.0):
+    """
+    從 CSV 檔 (路徑或檔案物件) 重播分 K，逐根產生 (time, open, high, low, close, volume)。
+    speed 為每根之間等待的秒數，0 表示不等待 (測試用)。
+    """
+    df = prepare_minute_bars(pd.read_csv(path))
+    for row in df.itertuples(index=False):
+        yield row.time, row.Open, row.High, row.Low, row.Close, row.Volume
+        if speed:
+            _time.sleep(speed)
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+# 價格欄位，每個欄位一個連續的 float64 檔案
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# FinMind 原始欄位名稱對應
+_RENAME = {
+    "open": "Open",
+    "max": "High",
+    "min": "Low",
+    "close": "Close",
+    "Trading_Volume": "Volume",
+}
+
+
+def dates_to_days(dates):
+    """日期字串或 datetime 轉成自 1970-01-01 起的天數 (int64)"""
+    return (
+        pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]").astype(np.int64)
+    )
+
+
+def days_to_dates(days):
+    """天數轉回 datetime64"""
+    return np.asarray(days).astype("datetime64[D]")
+
+
+class ColumnStore:
+    """
+    以 numpy.memmap 開啟的每檔股票欄式價格檔。
+
+    每檔股票一個資料夾，內含 date.i8 (int64 天數) 及各 OHLCV 欄位的 .f8 檔，
+    meta.json 記錄有效筆數及是否已排序。讀取時直接映射檔案，不複製資料。
+    """
+
+    def __init__(self, root="data/colstore"):
+        self.root = root
+
+    def _path(self, ticker, name):
+        return os.path.join(self.root, ticker, name)
+
+    def path(self, ticker, name):
+        """股票資料夾中的檔案路徑，與價格檔並存的衍生資料 (例如 OBV) 也放在這裡"""
+        return self._path(ticker, name)
+
+    def file_id(self, ticker):
+        """
+        價格檔目前的識別碼 (Close 欄位檔的 inode)。
+
+        append 只在檔尾寫入，識別碼不變；compact / write 以新檔取代舊檔，識別碼改變，
+        由價格檔算出的衍生資料需整份重算。沒有資料時回傳 None。
+        """
+        path = self._path(ticker, "Close.f8")
+        if not self.rows(ticker) or not os.path.exists(path):
+            return None
+        return os.stat(path).st_ino
+
+    def _read_meta(self, ticker):
+        path = self._path(ticker, "meta.json")
+        if not os.path.exists(path):
+            return {"rows": 0, "sorted": True}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, ticker, meta):
+        path = self._path(ticker, "meta.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _files(self):
+        return [("date", "i8", np.int64)] + [(c, "f8", np.float64) for c in PRICE_COLUMNS]
+
+    def tickers(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.root)
+            if os.path.exists(self._path(name, "meta.json"))
+        )
+
+    def rows(self, ticker):
+        return self._read_meta(ticker)["rows"]
+
+    def fingerprint(self, tickers=None):
+        """
+        一組股票目前資料的識別碼，任何一檔附加、修正或重寫後都會改變，
+        可作為由這些價格檔算出的結果的快取 key。
+        """
+        tickers = self.tickers() if tickers is None else tickers
+        digest = hashlib.sha1()
+        for ticker in tickers:
+            path = self._path(ticker, "meta.json")
+            # meta.json 在 append / compact / write 時都以新檔取代
+            stamp = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+            digest.update(f"{ticker}:{self.rows(ticker)}:{stamp};".encode())
+        return digest.hexdigest()
+
+    def last_day(self, ticker):
+        """最後一筆的天數，沒有資料時回傳 None"""
+        meta = self._read_meta(ticker)
+        if meta["rows"] == 0:
+            return None
+        if not meta["sorted"]:
+            self.compact(ticker)
+            meta = self._read_meta(ticker)
+        days = np.memmap(self._path(ticker, "date.i8"), dtype=np.int64, mode="r")
+        return int(days[meta["rows"] - 1])
+
+    def arrays(self, ticker):
+        """
+        以唯讀 memmap 開啟所有欄位。
+
+        回傳:
+        dict: {"date": int64 天數, "Open": float64, ...}，長度皆為有效筆數。
+        """
+        meta = self._read_meta(ticker)
+        if not meta["sorted"]:
+            self.compact(ticker)
+            meta = self._read_meta(ticker)
+
+        n = meta["rows"]
+        result = {}
+        for name, ext, dtype in self._files():
+            if n == 0:
+                result[name] = np.empty(0, dtype=dtype)
+            else:
+                # 只映射 meta 記錄的筆數，忽略寫到一半的尾巴
+                result[name] = np.memmap(
+                    self._path(ticker, f"{name}.{ext}"), dtype=dtype, mode="r", shape=(n,)
+                )
+        return result
+
+    def load(self, ticker):
+        """回傳以 memmap 為底層、不複製資料的 DataFrame"""
+        return pd.DataFrame(self.arrays(ticker), copy=False)
+
+    def price_frame(self, ticker):
+        """
+        以日期為索引的 OHLCV，欄位仍指向 memmap，
+        可直接給 backtesting.Backtest 或 utils.formula 的函式使用。
+        """
+        arrays = self.arrays(ticker)
+        index = pd.DatetimeIndex(days_to_dates(arrays.pop("date")), name="date")
+        return pd.DataFrame(arrays, index=index, copy=False)
+
+    def _to_columns(self, df):
+        df = df.rename(columns=_RENAME)
+        columns = {"date": dates_to_days(df["date"])}
+        for c in PRICE_COLUMNS:
+            columns[c] = df[c].to_numpy(dtype=np.float64)
+        return columns
+
+    def append(self, ticker, df):
+        """
+        將新的交易日附加到檔案尾端。
+
+        比最後一筆還新的資料直接附加；修正舊日期的資料也會附加，但會將
+        資料標記為未排序，下次讀取前由 compact() 去重排序。
+
+        回傳:
+        int: 附加的筆數。
+        """
+        if df.empty:
+            return 0
+        os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+        meta = self._read_meta(ticker)
+        columns = self._to_columns(df)
+
+        order = np.argsort(columns["date"], kind="stable")
+        columns = {name: values[order] for name, values in columns.items()}
+
+        n = meta["rows"]
+        is_sorted = meta["sorted"] and bool(np.all(np.diff(columns["date"]) > 0))
+        if is_sorted and n:
+            days = np.memmap(self._path(ticker, "date.i8"), dtype=np.int64, mode="r")
+            is_sorted = bool(columns["date"][0] > days[n - 1])
+
+        for name, ext, _ in self._files():
+            path = self._path(ticker, f"{name}.{ext}")
+            with open(path, "ab") as f:
+                # 先截掉上次寫到一半的尾巴
+                f.truncate(n * 8)
+                f.write(columns[name].tobytes())
+
+        self._write_meta(
+            ticker, {"rows": n + len(columns["date"]), "sorted": is_sorted}
+        )
+        return len(columns["date"])
+
+    def compact(self, ticker):
+        """依日期排序、相同日期保留最後寫入的一筆，並重寫檔案"""
+        meta = self._read_meta(ticker)
+        n = meta["rows"]
+        if n == 0:
+            return 0
+
+        columns = {}
+        for name, ext, dtype in self._files():
+            columns[name] = np.fromfile(
+                self._path(ticker, f"{name}.{ext}"), dtype=dtype, count=n
+            )
+
+        # 反轉後取第一次出現，即為最後寫入的那筆
+        days = columns["date"][::-1]
+        _, first = np.unique(days, return_index=True)
+        keep = n - 1 - first
+        for name, ext, _ in self._files():
+            path = self._path(ticker, f"{name}.{ext}")
+            tmp = path + ".tmp"
+            columns[name][keep].tofile(tmp)
+            os.replace(tmp, path)
+
+        self._write_meta(ticker, {"rows": len(keep), "sorted": True})
+        return len(keep)
+
+    def write(self, ticker, df):
+        """以整份資料覆寫"""
+        os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+        self._write_meta(ticker, {"rows": 0, "sorted": True})
+        self.append(ticker, df)
+        return self.compact(ticker)
@@ -0,0 +1,207 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from .datasource import load_stock_bundle
+
+
+# 跨股票的滾動相關係數。每個交易日把當天的向量 x 累加進
+# Σm、Σx·m、Σx²·m、Σx·x (m 為有值的遮罩)，任意視窗 [t-w, t] 的共變異數
+# 都可由兩個累加和相減得到，不需重新計算整個視窗；新的交易日只需一次更新。
+# 累加和每 stride 天存一份，查詢時再補上最多 stride - 1 天，記憶體為 O(T / stride · N²)。
+
+# 相關分析的資料: 名稱 -> 說明
+SERIES = {
+    "return": "日報酬率",
+    "foreign": "外資買賣超",
+    "margin": "融資餘額增減",
+}
+
+
+def correlation_panels(api, tickers, start_date, end_date, workers=8):
+    """
+    取得每檔股票的股價、外資買賣超、融資餘額，整理成 (日期 × 股票) 面板。
+
+    融資餘額是累積量，直接相關會被趨勢主導，因此以每日增減計算。
+
+    回傳:
+    dict: {"return", "foreign", "margin"} 的 (日期 × 股票) DataFrame，
+    沒有資料的為 NaN。
+    """
+
+    def load(ticker):
+        df = load_stock_bundle(
+            api, ticker, start_date, end_date, datasets=("price", "margin", "investor")
+        ).aligned
+        if df.empty:
+            return None
+        df = df.set_index(pd.to_datetime(df["date"])).sort_index()
+        columns = {}
+        columns["return"] = df["Close"].astype(float).pct_change()
+        columns["foreign"] = (
+            df["Foreign_Investor"].astype(float) if "Foreign_Investor" in df else np.nan
+        )
+        columns["margin"] = df["MarginPurchaseTodayBalance"].astype(float).diff()
+        return pd.DataFrame(columns, index=df.index)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        frames = dict(zip(tickers, executor.map(load, tickers)))
+    frames = {ticker: df for ticker, df in frames.items() if df is not None}
+    if not frames:
+        raise ValueError("No ticker has price data in the given range")
+
+    return {
+        name: pd.DataFrame({ticker: df[name] for ticker, df in frames.items()}).sort_index()
+        for name in SERIES
+    }
+
+
+class RollingCorrelation:
+    """
+    一組 (日期 × 股票) 資料的滾動相關係數索引。
+
+    建立時只做一次累加，之後 matrix(date, window) 可查詢任意日期、任意視窗的
+    相關係數矩陣；缺值以成對完整觀測 (pairwise complete) 處理，與 DataFrame.corr 相同。
+    append 加入新的交易日而不重算既有的累加和。
+    """
+
+    def __init__(self, panel, stride=20):
+        panel = panel.sort_index()
+        self.columns = panel.columns
+        self.stride = stride
+        values = panel.to_numpy(dtype=np.float64)
+        # 相關係數不受各欄平移、縮放影響，先標準化以減少累加和相減時的誤差
+        with np.errstate(invalid="ignore"):
+            self.center = np.nan_to_num(np.nanmean(values, axis=0))
+            self.scale = np.nan_to_num(np.nanstd(values, axis=0), nan=1.0)
+        self.scale[self.scale == 0] = 1.0
+
+        n = len(self.columns)
+        self.index = pd.DatetimeIndex([], name=panel.index.name)
+        self.rows = np.empty((0, n))
+        self.masks = np.empty((0, n), dtype=bool)
+        # 目前的累加和，以及每 stride 天的快照 (第 0 份為全 0，代表第一天之前)
+        self.total = self._zeros(n)
+        self.checkpoints = [self._copy(self.total)]
+        self.append(panel)
+
+    @staticmethod
+    def _zeros(n):
+        return {name: np.zeros((n, n)) for name in ("count", "sx", "sxx", "sxy")}
+
+    @staticmethod
+    def _copy(sums):
+        return {name: values.copy() for name, values in sums.items()}
+
+    @staticmethod
+    def _accumulate(sums, x, mask):
+        """把多天的 x (天數 × 股票) 加進累加和"""
+        m = mask.astype(np.float64)
+        sums["count"] += m.T @ m
+        sums["sx"] += x.T @ m
+        sums["sxx"] += (x * x).T @ m
+        sums["sxy"] += x.T @ x
+
+    @property
+    def nbytes(self):
+        """資料與累加和快照占用的記憶體，供 data_cache 計算預算"""
+        sums = [self.total] + self.checkpoints
+        return (
+            self.rows.nbytes
+            + self.masks.nbytes
+            + sum(values.nbytes for s in sums for values in s.values())
+        )
+
+    def append(self, panel):
+        """
+        加入比最後一天還新的交易日，欄位需與建立時相同 (缺的股票補 NaN)。
+
+        回傳:
+        int: 加入的天數。
+        """
+        panel = panel.reindex(columns=self.columns).sort_index()
+        if len(self.index):
+            panel = panel.loc[panel.index > self.index[-1]]
+        values = (panel.to_numpy(dtype=np.float64) - self.center) / self.scale
+        mask = ~np.isnan(values)
+        values = np.where(mask, values, 0.0)
+
+        # 以快照邊界分段，每段一次矩陣乘法
+        done = len(self.rows)
+        i = 0
+        while i < len(values):
+            j = min(len(values), i + self.stride - (done + i) % self.stride)
+            self._accumulate(self.total, values[i:j], mask[i:j])
+            if (done + j) % self.stride == 0:
+                self.checkpoints.append(self._copy(self.total))
+            i = j
+
+        self.rows = np.concatenate([self.rows, values])
+        self.masks = np.concatenate([self.masks, mask])
+        self.index = self.index.append(panel.index)
+        return len(values)
+
+    def _prefix(self, t):
+        """前 t 天 (第 0 到 t - 1 天) 的累加和"""
+        k = t // self.stride
+        sums = self._copy(self.checkpoints[k])
+        start = k * self.stride
+        if start < t:
+            self._accumulate(sums, self.rows[start:t], self.masks[start:t])
+        return sums
+
+    def matrix(self, date=None, window=60, min_periods=None):
+        """
+        截至 date (含) 最近 window 個交易日的相關係數矩陣。
+
+        參數:
+        date: 預設為最後一個交易日；非交易日取之前最近的交易日。
+        min_periods (int): 成對有值的天數少於此數時為 NaN，預設為 window 的一半。
+
+        回傳:
+        DataFrame: 股票 × 股票的相關係數。
+        """
+        if not len(self.index):
+            raise ValueError("No data in correlation index")
+        end = len(self.index)
+        if date is not None:
+            end = self.index.searchsorted(pd.Timestamp(date), side="right")
+        if end == 0:
+            raise ValueError(f"No data on or before {date}")
+        start = max(end - window, 0)
+        min_periods = max(min_periods or window // 2, 2)
+
+        upper, lower = self._prefix(end), self._prefix(start)
+        n = upper["count"] - lower["count"]
+        sx = upper["sx"] - lower["sx"]
+        sxx = upper["sxx"] - lower["sxx"]
+        sxy = upper["sxy"] - lower["sxy"]
+
+        # sx[i, j] 為 j 有值那幾天 i 的總和，轉置即為 i 有值那幾天 j 的總和
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = sxy - sx * sx.T / n
+            var_x = sxx - sx * sx / n
+            var_y = sxx.T - sx.T * sx.T / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[(n < min_periods) | (var_x <= 0) | (var_y <= 0)] = np.nan
+
+        result = pd.DataFrame(corr, index=self.columns, columns=self.columns)
+        result.attrs.update(date=self.index[end - 1], window=end - start)
+        return result
+
+
+def correlation_index(panels, stride=20):
+    """對 correlation_panels 的每個面板建立 RollingCorrelation"""
+    return {name: RollingCorrelation(panel, stride) for name, panel in panels.items()}
+
+
+def top_traded(store, n=50, bars=20):
+    """欄式價格檔中最近 bars 天平均成交值最大的 n 檔股票"""
+    values = {}
+    for ticker in store.tickers():
+        columns = store.arrays(ticker)
+        if len(columns["date"]):
+            values[ticker] = float(
+                np.nanmean(columns["Close"][-bars:] * columns["Volume"][-bars:])
+            )
+    return sorted(values, key=values.get, reverse=True)[:n]
@@ -0,0 +1,345 @@
+import threading
+import time as _time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+from FinMind.data import DataLoader
+from .db import get_pool
+from .cache import TAIL_TTL, settled_date, data_cache, range_expiry
+
+
+# 會被快取到本地資料庫的 FinMind 資料集
+CACHED_DATASETS = (
+    "taiwan_stock_daily",
+    "us_stock_price",
+    "taiwan_stock_institutional_investors",
+    "taiwan_stock_per_pbr",
+    "taiwan_stock_margin_purchase_short_sale",
+)
+
+
+def _to_date(date_str):
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+
+def _to_str(d):
+    return d.strftime("%Y-%m-%d")
+
+
+class RateLimiter:
+    """限制一段時間內的 API 呼叫次數，超過時會等待 (可跨執行緒共用)"""
+
+    def __init__(self, max_calls=600, period=3600):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = _time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self.period - (now - self._calls[0])
+            _time.sleep(wait)
+
+
+class CachedDataLoader:
+    """
+    包裝 FinMind DataLoader 的本地快取。
+
+    每個資料集存成 mystock.db 中的 cache_<dataset> 資料表，並在
+    cache_coverage 記錄每檔股票已抓取的日期區間，之後只補抓缺少的部分。
+    """
+
+    def __init__(self, db_name="mystock.db", api=None, rate_limiter=None):
+        self.db_name = db_name
+        self.api = api or DataLoader()
+        self.rate_limiter = rate_limiter
+        self.pool = get_pool(db_name)
+        self._create_table()
+
+    def _create_table(self):
+        self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_coverage (
+                dataset TEXT,
+                stock_id TEXT,
+                start_date TEXT,
+                end_date TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (dataset, stock_id)
+            )
+            """
+        )
+
+    def _table_exists(self, conn, table):
+        return conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        ).fetchone() is not None
+
+    def _get_coverage(self, conn, dataset, stock_id):
+        row = conn.execute(
+            "SELECT start_date, end_date, updated_at FROM cache_coverage "
+            "WHERE dataset = ? AND stock_id = ?",
+            (dataset, stock_id),
+        ).fetchone()
+        if row is None:
+            return None
+        return _to_date(row[0]), _to_date(row[1]), datetime.fromisoformat(row[2])
+
+    def _missing_ranges(self, dataset, coverage, start, end, now):
+        """計算 [start, end] 中尚未快取的日期區間"""
+        if coverage is None:
+            return [(start, end)]
+
+        cov_start, cov_end, updated_at = coverage
+        ranges = []
+        if start < cov_start:
+            ranges.append((start, cov_start - timedelta(days=1)))
+        if end > cov_end:
+            # 已定案的資料都抓過了，只差盤中未定案的尾段，短時間內不重抓
+            tail_only = cov_end >= settled_date(now, dataset)
+            if not (tail_only and now - updated_at < TAIL_TTL):
+                ranges.append((cov_end + timedelta(days=1), end))
+        return ranges
+
+    def _store(self, conn, dataset, stock_id, df, start, end):
+        table = f"cache_{dataset}"
+        if self._table_exists(conn, table):
+            conn.execute(
+                f"DELETE FROM {table} WHERE stock_id = ? AND date BETWEEN ? AND ?",
+                (stock_id, _to_str(start), _to_str(end)),
+            )
+        if not df.empty:
+            # 不用 DataFrame.to_sql: 它會自行 commit，資料與 cache_coverage 就不在同一個交易中
+            if not self._table_exists(conn, table):
+                conn.execute(pd.io.sql.get_schema(df, table, con=conn))
+            columns = ", ".join(f'"{c}"' for c in df.columns)
+            rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+            conn.executemany(
+                f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * len(df.columns))})",
+                rows,
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table} ON {table} (stock_id, date)"
+            )
+
+    def _update_coverage(self, conn, dataset, stock_id, coverage, start, end, now):
+        # 未定案的日期不算進已快取區間，下次會再補抓；
+        # 各資料集公布時間不同，過早抓到的空資料不可當成已定案
+        end = min(end, settled_date(now, dataset))
+        if coverage is not None:
+            start = min(start, coverage[0])
+            end = max(end, coverage[1])
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_coverage "
+            "(dataset, stock_id, start_date, end_date, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (dataset, stock_id, _to_str(start), _to_str(end), now.isoformat()),
+        )
+
+    def _read(self, conn, dataset, stock_id, start, end):
+        table = f"cache_{dataset}"
+        if not self._table_exists(conn, table):
+            return pd.DataFrame()
+        df = pd.read_sql_query(
+            f"SELECT * FROM {table} WHERE stock_id = ? AND date BETWEEN ? AND ? "
+            "ORDER BY date, rowid",
+            conn,
+            params=(stock_id, _to_str(start), _to_str(end)),
+        )
+        if df.empty:
+            return pd.DataFrame()
+        return df
+
+    def _fetch(self, dataset, stock_id, start, end):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return getattr(self.api, dataset)(
+            stock_id=stock_id, start_date=_to_str(start), end_date=_to_str(end)
+        )
+
+    def is_cached(self, dataset, stock_id, start_date, end_date):
+        """檢查日期區間是否已全部在快取中"""
+        with self.pool.connection() as conn:
+            coverage = self._get_coverage(conn, dataset, stock_id)
+        ranges = self._missing_ranges(
+            dataset, coverage, _to_date(start_date), _to_date(end_date), datetime.now()
+        )
+        return not ranges
+
+    def load(self, dataset, stock_id, start_date, end_date):
+        """
+        取得指定資料集的資料，依序查程序內快取 (data_cache)、本地資料庫，
+        只向 FinMind 抓缺少的日期。
+
+        參數:
+        dataset (str): DataLoader 的方法名稱，例如 "taiwan_stock_daily"。
+        stock_id (str): 股票代號。
+        start_date, end_date (str): "YYYY-MM-DD" 格式的日期區間。
+
+        回傳:
+        DataFrame: 與 DataLoader 相同欄位的資料。
+        """
+        if dataset not in CACHED_DATASETS:
+            raise ValueError(f"Dataset {dataset} is not cached.")
+
+        return data_cache.get_or_compute(
+            (stock_id, dataset, start_date, end_date, self.db_name),
+            lambda: self._load_from_db(dataset, stock_id, start_date, end_date),
+            expires_at=range_expiry(end_date, dataset=dataset),
+        )
+
+    def _load_from_db(self, dataset, stock_id, start_date, end_date):
+        start = _to_date(start_date)
+        end = _to_date(end_date)
+        now = datetime.now()
+
+        with self.pool.connection() as conn:
+            coverage = self._get_coverage(conn, dataset, stock_id)
+        ranges = self._missing_ranges(dataset, coverage, start, end, now)
+
+        # 抓取期間不占用連線，寫入時在同一個交易中完成
+        if ranges:
+            fetched = [(s, e, self._fetch(dataset, stock_id, s, e)) for s, e in ranges]
+            with self.pool.connection() as conn:
+                for s, e, df in fetched:
+                    self._store(conn, dataset, stock_id, df, s, e)
+                self._update_coverage(conn, dataset, stock_id, coverage, start, end, now)
+
+        with self.pool.connection() as conn:
+            return self._read(conn, dataset, stock_id, start, end)
+
+    def taiwan_stock_daily(self, stock_id, start_date, end_date):
+        return self.load("taiwan_stock_daily", stock_id, start_date, end_date)
+
+    def us_stock_price(self, stock_id, start_date, end_date):
+        return self.load("us_stock_price", stock_id, start_date, end_date)
+
+    def taiwan_stock_institutional_investors(self, stock_id, start_date, end_date):
+        return self.load(
+            "taiwan_stock_institutional_investors", stock_id, start_date, end_date
+        )
+
+    def taiwan_stock_per_pbr(self, stock_id, start_date, end_date):
+        return self.load("taiwan_stock_per_pbr", stock_id, start_date, end_date)
+
+    def taiwan_stock_margin_purchase_short_sale(self, stock_id, start_date, end_date):
+        return self.load(
+            "taiwan_stock_margin_purchase_short_sale", stock_id, start_date, end_date
+        )
+
+
+# 股票資料包可用的資料集: 名稱 -> (DataLoader 方法, 空資料時的欄位)
+BUNDLE_DATASETS = {
+    "price": ("taiwan_stock_daily", None),
+    "investor": (
+        "taiwan_stock_institutional_investors",
+        ["date", "Foreign_Investor", "Investment_Trust"],
+    ),
+    "per": ("taiwan_stock_per_pbr", ["date", "PER", "PBR"]),
+    "margin": (
+        "taiwan_stock_margin_purchase_short_sale",
+        ["date", "MarginPurchaseTodayBalance", "ShortSaleTodayBalance"],
+    ),
+}
+
+
+def _prepare_price(df):
+    return df.rename(
+        columns={
+            "open": "Open",
+            "max": "High",
+            "min": "Low",
+            "close": "Close",
+            "Trading_Volume": "Volume",
+        }
+    )
+
+
+def _prepare_investor(df):
+    # 外資、投信買賣超
+    df = df.assign(value=df["buy"] - df["sell"])
+    df = df.pivot_table(index="date", columns="name", values="value")
+    df.columns.name = None
+    return df.reset_index()
+
+
+_PREPARE = {
+    "price": _prepare_price,
+    "investor": _prepare_investor,
+}
+
+
+class StockBundle:
+    """同一檔股票、同一區間的多個資料集"""
+
+    def __init__(self, frames, errors):
+        self.frames = frames
+        self.errors = errors
+
+    def __getitem__(self, name):
+        return self.frames[name]
+
+    @property
+    def aligned(self):
+        """以股價日期為準，左合併其他資料集"""
+        df = self.frames["price"]
+        for name, frame in self.frames.items():
+            if name == "price" or df.empty:
+                continue
+            frame = frame.drop(columns=["stock_id"], errors="ignore")
+            df = pd.merge(df, frame, on="date", how="left")
+        return df
+
+
+def load_stock_bundle(api, stock_id, start_date, end_date, datasets=("price", "investor", "per")):
+    """
+    並行取得多個資料集，總耗時約等於最慢的一個請求。
+
+    股價資料失敗時直接拋出例外；其他資料集失敗或為空 (例如 ETF 沒有 PER)
+    則以只有欄位的空表代替，錯誤記錄在 bundle.errors。
+
+    參數:
+    api: CachedDataLoader 或 DataLoader。
+    datasets (tuple): BUNDLE_DATASETS 中的名稱，需包含 "price"。
+
+    回傳:
+    StockBundle
+    """
+    with ThreadPoolExecutor(max_workers=len(datasets)) as executor:
+        futures = {
+            name: executor.submit(
+                getattr(api, BUNDLE_DATASETS[name][0]),
+                stock_id=stock_id,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            for name in datasets
+        }
+
+    frames = {}
+    errors = {}
+    for name, future in futures.items():
+        empty_columns = BUNDLE_DATASETS[name][1]
+        try:
+            df = future.result()
+        except Exception as e:
+            if name == "price":
+                raise
+            errors[name] = e
+            df = pd.DataFrame()
+        if df.empty and empty_columns is not None:
+            df = pd.DataFrame(columns=empty_columns)
+        elif name in _PREPARE:
+            df = _PREPARE[name](df)
+        frames[name] = df
+
+    return StockBundle(frames, errors)
@@ -0,0 +1,118 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class ConnectionPool:
+    """
+    SQLite 連線池 (執行緒安全)。
+
+    連線開啟 WAL 模式，讓 Streamlit 讀取時不會被爬蟲寫入擋住；
+    每條連線保留 prepared statement 快取，搭配參數化查詢重複使用。
+    """
+
+    def __init__(self, db_name="mystock.db", size=8, timeout=30, cached_statements=256):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def acquire(self):
+        """
+        取出一條連線，池中沒有閒置連線且已達上限時會等待。
+        等待超過 timeout 秒時拋出 sqlite3.OperationalError，與 SQLite 的鎖定逾時相同。
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"Timed out after {self.timeout}s waiting for a connection to {self.db_name}"
+            ) from None
+
+    def release(self, conn):
+        """歸還連線"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """with 區塊結束時自動 commit (發生例外時 rollback) 並歸還連線"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def execute(self, query, params=()):
+        with self.connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def executemany(self, query, seq_of_params):
+        with self.connection() as conn:
+            conn.executemany(query, seq_of_params)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _reset_lock_after_fork():
+    # fork 當下若有其他執行緒持有鎖，子程序中的鎖永遠不會被釋放
+    global _pools_lock
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_lock_after_fork)
+
+
+def get_pool(db_name="mystock.db"):
+    """
+    同一個資料庫檔案在整個程序中共用一個連線池。
+
+    key 含程序編號: fork 出的子程序 (ProcessPoolExecutor) 不可使用父程序開啟的
+    SQLite 連線，子程序第一次取用時會建立自己的連線池。
+    """
+    key = (os.getpid(), os.path.abspath(db_name))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(db_name)
+        return _pools[key]
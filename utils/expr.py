@@ -0,0 +1,317 @@
+import re
+from .pipeline import with_indicators
+
+
+# 策略條件運算式，例如:
+#   close <= boll_lower(20, 2) & kd_k(9) < 30 & kd_d(9) < 30
+#   cross_above(ema(10), ema(120))
+# 運算式先解析成以 tuple 表示的節點樹，相同的子運算式 (例如多條規則都用到
+# kd_k(9) < 30) 得到相同的節點，評估時以節點為 key 只計算一次。
+# 指標欄位交給 utils.pipeline 一次計算，運算子直接作用在整個 Series / 面板上。
+#
+# 優先順序 (低到高): | or、& and、~ not、比較、+ -、* /、負號
+
+_TOKEN = re.compile(
+    r"\s*(?:(\d+\.\d*|\.\d+|\d+)|([A-Za-z_][A-Za-z_0-9]*)|(<=|>=|==|!=|[<>&|~+\-*/(),]))"
+)
+
+_PRICES = {
+    "open": "Open",
+    "high": "High",
+    "low": "Low",
+    "close": "Close",
+    "volume": "Volume",
+}
+
+_COMPARISONS = ("<", "<=", ">", ">=", "==", "!=")
+
+
+def _period(value, name):
+    if value != int(value) or value < 1:
+        raise ValueError(f"{name}() period must be a positive integer, got {value}")
+    return int(value)
+
+
+def _column(kind):
+    def build(n):
+        return ("col", f"{kind}_{_period(n, kind)}")
+
+    return build
+
+
+def _band(sign):
+    def build(n=20, width=2):
+        n = _period(n, "boll")
+        if width == 2:
+            return ("col", f"{'upper' if sign > 0 else 'lower'}_{n}")
+        offset = ("op", "*", ("num", float(width)), ("col", f"std_{n}"))
+        return ("op", "+" if sign > 0 else "-", ("col", f"sma_{n}"), offset)
+
+    return build
+
+
+# 函式名稱 -> (建立節點的函式, 參數是否為運算式)
+_FUNCTIONS = {
+    "sma": (_column("sma"), False),
+    "ema": (_column("ema"), False),
+    "std": (_column("std"), False),
+    "highest": (_column("hn"), False),
+    "lowest": (_column("ln"), False),
+    "kd_k": (lambda n=9: _column("k")(n), False),
+    "kd_d": (lambda n=9: _column("d")(n), False),
+    "rsi": (lambda n=14: _column("rsi")(n), False),
+    "boll_mid": (lambda n=20: _column("sma")(n), False),
+    "boll_upper": (_band(1), False),
+    "boll_lower": (_band(-1), False),
+    "shift": (lambda x, k=("num", 1): ("shift", x, _period(k[1], "shift")), True),
+    "cross_above": (lambda a, b: _cross(a, b), True),
+    "cross_below": (lambda a, b: _cross(b, a), True),
+}
+
+
+def _cross(a, b):
+    # 與 SMA_CROSSOVER 相同: 本根 a > b 且前一根 a <= b
+    return (
+        "and",
+        ("cmp", ">", a, b),
+        ("cmp", "<=", ("shift", a, 1), ("shift", b, 1)),
+    )
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match:
+                raise ValueError(f"Unexpected character at {position}: {text[position:]!r}")
+            number, name, symbol = match.groups()
+            if number is not None:
+                self.tokens.append(("num", float(number)))
+            elif name is not None:
+                self.tokens.append(("name", name.lower()))
+            else:
+                self.tokens.append(("sym", symbol))
+            position = match.end()
+        self.i = 0
+
+    def _peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def _accept(self, *values):
+        kind, value = self._peek()
+        if kind in ("sym", "name") and value in values:
+            self.i += 1
+            return value
+        return None
+
+    def _expect(self, value):
+        if self._accept(value) is None:
+            raise ValueError(f"Expected {value!r} in expression: {self.text}")
+
+    def parse(self):
+        node = self._or()
+        if self.i != len(self.tokens):
+            raise ValueError(f"Unexpected {self._peek()[1]!r} in expression: {self.text}")
+        return node
+
+    def _or(self):
+        node = self._and()
+        while self._accept("|", "or"):
+            node = ("or", node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._accept("&", "and"):
+            node = ("and", node, self._not())
+        return node
+
+    def _not(self):
+        if self._accept("~", "not"):
+            return ("not", self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        left = self._additive()
+        node = None
+        op = self._accept(*_COMPARISONS)
+        while op is not None:
+            right = self._additive()
+            # a < b < c 視為 a < b & b < c
+            comparison = ("cmp", op, left, right)
+            node = comparison if node is None else ("and", node, comparison)
+            left = right
+            op = self._accept(*_COMPARISONS)
+        return left if node is None else node
+
+    def _additive(self):
+        node = self._multiplicative()
+        while True:
+            op = self._accept("+", "-")
+            if op is None:
+                return node
+            node = ("op", op, node, self._multiplicative())
+
+    def _multiplicative(self):
+        node = self._unary()
+        while True:
+            op = self._accept("*", "/")
+            if op is None:
+                return node
+            node = ("op", op, node, self._unary())
+
+    def _unary(self):
+        if self._accept("-"):
+            operand = self._unary()
+            return ("num", -operand[1]) if operand[0] == "num" else ("neg", operand)
+        return self._atom()
+
+    def _atom(self):
+        kind, value = self._peek()
+        if kind == "num":
+            self.i += 1
+            return ("num", value)
+        if kind == "name":
+            self.i += 1
+            if self._accept("("):
+                return self._call(value)
+            if value in _PRICES:
+                return ("col", _PRICES[value])
+            raise ValueError(f"Unknown name {value!r} in expression: {self.text}")
+        if self._accept("("):
+            node = self._or()
+            self._expect(")")
+            return node
+        raise ValueError(f"Unexpected end of expression: {self.text}")
+
+    def _call(self, name):
+        if name not in _FUNCTIONS:
+            raise ValueError(f"Unknown function {name}() in expression: {self.text}")
+        build, takes_expressions = _FUNCTIONS[name]
+        args = []
+        if not self._accept(")"):
+            args.append(self._or())
+            while self._accept(","):
+                args.append(self._or())
+            self._expect(")")
+        if not takes_expressions:
+            if any(arg[0] != "num" for arg in args):
+                raise ValueError(f"{name}() takes numeric arguments: {self.text}")
+            args = [arg[1] for arg in args]
+        elif name == "shift" and len(args) > 1 and args[1][0] != "num":
+            raise ValueError(f"shift() period must be a number: {self.text}")
+        try:
+            return build(*args)
+        except TypeError:
+            raise ValueError(f"Wrong number of arguments to {name}(): {self.text}")
+
+
+_BOOLEAN = ("cmp", "and", "or", "not")
+
+
+def _check(node, boolean):
+    """檢查邏輯運算的運算元是條件、比較與算術的運算元是數值"""
+    kind = node[0]
+    if (kind in _BOOLEAN) != boolean:
+        expected = "a condition" if boolean else "a number"
+        raise ValueError(f"Expected {expected}, got {kind} node {node!r}")
+    if kind in ("and", "or"):
+        _check(node[1], True)
+        _check(node[2], True)
+    elif kind == "not":
+        _check(node[1], True)
+    elif kind in ("cmp", "op"):
+        _check(node[2], False)
+        _check(node[3], False)
+    elif kind == "neg":
+        _check(node[1], False)
+    elif kind == "shift":
+        _check(node[1], False)
+        # 常數沒有前一根 K 棒可取，cross_above(1, 2) 等也會產生這種 shift
+        if not rule_columns(node[1]):
+            raise ValueError(f"shift() needs a price or indicator series, got {node[1]!r}")
+
+
+def parse_rule(text):
+    """將運算式解析成節點樹，運算式不是條件 (例如只有 sma(5)) 時拋出 ValueError"""
+    node = _Parser(text).parse()
+    _check(node, True)
+    return node
+
+
+def rule_columns(node):
+    """節點樹用到的價格與指標欄位"""
+    if node[0] == "col":
+        return [node[1]]
+    columns = []
+    for child in node[1:]:
+        if isinstance(child, tuple):
+            columns += rule_columns(child)
+    return list(dict.fromkeys(columns))
+
+
+_BINARY = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": lambda a, b: a / b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+
+def _evaluate(node, df, memo):
+    if node in memo:
+        return memo[node]
+    kind = node[0]
+    if kind == "num":
+        result = node[1]
+    elif kind == "col":
+        result = df[node[1]]
+    elif kind in ("op", "cmp"):
+        result = _BINARY[node[1]](_evaluate(node[2], df, memo), _evaluate(node[3], df, memo))
+    elif kind == "neg":
+        result = -_evaluate(node[1], df, memo)
+    elif kind == "shift":
+        result = _evaluate(node[1], df, memo).shift(node[2])
+    elif kind == "and":
+        result = _evaluate(node[1], df, memo) & _evaluate(node[2], df, memo)
+    elif kind == "or":
+        result = _evaluate(node[1], df, memo) | _evaluate(node[2], df, memo)
+    elif kind == "not":
+        result = ~_evaluate(node[1], df, memo)
+    else:
+        raise NotImplementedError(f"Unknown node: {kind}")
+    memo[node] = result
+    return result
+
+
+class RulePlan:
+    """
+    多條規則的評估計畫。
+
+    所有規則需要的指標合併後交給 utils.pipeline 一次計算，
+    規則之間相同的子運算式在一次 evaluate 中只計算一次。
+    """
+
+    def __init__(self, rules):
+        self.rules = {name: parse_rule(text) for name, text in dict(rules).items()}
+        columns = [c for node in self.rules.values() for c in rule_columns(node)]
+        self.columns = [c for c in dict.fromkeys(columns) if c not in _PRICES.values()]
+
+    def evaluate(self, df):
+        """
+        回傳:
+        dict: {規則名稱: 布林 Series (或面板)}。
+        """
+        df = with_indicators(df, self.columns)
+        memo = {}
+        return {name: _evaluate(node, df, memo) for name, node in self.rules.items()}
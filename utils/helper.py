@@ -1,14 +1,12 @@
 import sqlite3
 from statsmodels.tsa.stattools import pacf
 import numpy as np
+from .db import get_pool
 
 
-def query_data(query: str):
+def query_data(query: str, params=(), db_name="mystock.db"):
     try:
-        conn = sqlite3.connect("mystock.db")
-        cursor = conn.cursor()
-        cursor.execute(query)
-        return cursor.fetchall()
+        return get_pool(db_name).execute(query, params)
     except sqlite3.Error as e:
         print("message: ", e)
         return None
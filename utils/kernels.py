@@ -0,0 +1,150 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+import numpy as np
+import pandas as pd
+from .rolling import rolling_max_value, rolling_min_value
+
+
+# 指標運算核心，utils.formula、utils.pipeline 與 backtesting/helper.py 共用。
+# 以輸入陣列內容的雜湊加上參數做記憶化，同一份價格資料、同樣參數只算一次，
+# 例如 Backtest.optimize 掃描 n1/n2 時 KDJ 不會每組參數重算。
+# 回傳的陣列為唯讀，避免呼叫端修改到快取內容。
+
+MAX_ENTRIES = 512
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+memo_stats = {"hits": 0, "misses": 0}
+
+
+def _fingerprint(values):
+    values = np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+    digest = hashlib.blake2b(values.view(np.uint8), digest_size=16).digest()
+    return values.shape, digest
+
+
+def _freeze(result):
+    if isinstance(result, tuple):
+        return tuple(_freeze(r) for r in result)
+    result = np.asarray(result, dtype=np.float64)
+    result.setflags(write=False)
+    return result
+
+
+def _key(value):
+    # 陣列 (不論以位置或關鍵字傳入) 以內容雜湊代替，其他參數直接放進 key
+    if isinstance(value, (np.ndarray, pd.Series, list)):
+        return _fingerprint(value)
+    return value
+
+
+def memoize(func):
+    """以 (函式, 陣列內容雜湊, 其他參數) 為 key 的 LRU 記憶化"""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (
+            (func.__name__,)
+            + tuple(_key(a) for a in args)
+            + tuple((name, _key(value)) for name, value in sorted(kwargs.items()))
+        )
+
+        with _memo_lock:
+            if key in _memo:
+                _memo.move_to_end(key)
+                memo_stats["hits"] += 1
+                return _memo[key]
+            memo_stats["misses"] += 1
+
+        result = _freeze(func(*args, **kwargs))
+        with _memo_lock:
+            _memo[key] = result
+            while len(_memo) > MAX_ENTRIES:
+                _memo.popitem(last=False)
+        return result
+
+    return wrapper
+
+
+def clear_memo():
+    with _memo_lock:
+        _memo.clear()
+        memo_stats["hits"] = 0
+        memo_stats["misses"] = 0
+
+
+def _series(values):
+    return pd.Series(np.asarray(values, dtype=np.float64))
+
+
+@memoize
+def sma(values, n):
+    return _series(values).rolling(window=n).mean().to_numpy()
+
+
+@memoize
+def rolling_std(values, n):
+    return _series(values).rolling(window=n).std().to_numpy()
+
+
+@memoize
+def ema(values, n):
+    return _series(values).ewm(span=n, adjust=False).mean().to_numpy()
+
+
+@memoize
+def ewm(values, com):
+    return _series(values).ewm(com=com, adjust=False).mean().to_numpy()
+
+
+@memoize
+def lowest(values, n):
+    return rolling_min_value(np.asarray(values, dtype=np.float64), n)
+
+
+@memoize
+def highest(values, n):
+    return rolling_max_value(np.asarray(values, dtype=np.float64), n)
+
+
+@memoize
+def kdj(high, low, close, n=9):
+    """回傳 (k, d)"""
+    close = np.asarray(close, dtype=np.float64)
+    ln = lowest(low, n)
+    hn = highest(high, n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = ((close - ln) / (hn - ln)) * 100
+    k = ewm(rsv, 2)
+    d = ewm(k, 2)
+    return k, d
+
+
+@memoize
+def bollinger_bands(close, n=20):
+    """回傳 (Middle, Upper, Lower)"""
+    middle = sma(close, n)
+    std = rolling_std(close, n)
+    return middle, middle + (std * 2), middle - (std * 2)
+
+
+@memoize
+def rsi(close, period=14):
+    delta = _series(close).diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.ewm(com=period - 1, adjust=False).mean()
+    avg_loss = loss.ewm(com=period - 1, adjust=False).mean()
+    rs = avg_gain / avg_loss
+    return (100 - (100 / (1 + rs))).to_numpy()
+
+
+@memoize
+def vwap(high, low, close, volume):
+    high, low, close, volume = (
+        np.asarray(a, dtype=np.float64) for a in (high, low, close, volume)
+    )
+    typical_price = (high + low + close) / 3
+    return np.cumsum(typical_price * volume) / np.cumsum(volume)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+
+# 交易報酬的重抽樣分析。每條路徑為一列，整批以 (路徑數 × 交易數) 陣列一次計算，
+# 路徑數很多時分批處理以限制記憶體用量。
+_BATCH_ELEMENTS = 1 << 22
+
+
+def _resample(returns, n_paths, method, rng):
+    if method == "bootstrap":
+        return returns[rng.integers(0, len(returns), size=(n_paths, len(returns)))]
+    if method == "shuffle":
+        return rng.permuted(np.tile(returns, (n_paths, 1)), axis=1)
+    raise ValueError(f"Unknown resampling method: {method}")
+
+
+def _path_metrics(samples, cash):
+    equity = cash * np.cumprod(1 + samples, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), cash)
+    drawdown = (1 - equity / peak).max(axis=1)
+    return equity[:, -1], drawdown, (samples > 0).mean(axis=1)
+
+
+def simulate_trades(
+    trades,
+    n_paths=10_000,
+    method="bootstrap",
+    cash=100_000,
+    confidence=0.95,
+    seed=None,
+):
+    """
+    以重抽樣交易報酬評估回測結果的穩健程度。
+
+    參數:
+    trades (DataFrame 或 array): 回測結果的 '_trades' (使用 ReturnPct 欄位) 或每筆交易報酬率。
+    n_paths (int): 模擬的路徑數。
+    method (str): "bootstrap" 為取後放回抽樣；"shuffle" 只打亂交易順序，
+    最終權益與勝率不變，只影響回撤。
+    cash (float): 初始資金，每筆交易投入全部權益。
+    confidence (float): 信賴區間的信心水準。
+    seed (int): 亂數種子。
+
+    回傳:
+    DataFrame: 列為 "Equity Final [$]"、"Max. Drawdown [%]"、"Win Rate [%]"，
+    欄為 mean、lower、median、upper。attrs["paths"] 為每條路徑的三項數值。
+    """
+    if isinstance(trades, pd.DataFrame):
+        trades = trades["ReturnPct"]
+    returns = np.asarray(trades, dtype=np.float64)
+    returns = returns[~np.isnan(returns)]
+    if not len(returns):
+        raise ValueError("No closed trades to resample")
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, _BATCH_ELEMENTS // len(returns))
+    final = np.empty(n_paths)
+    drawdown = np.empty(n_paths)
+    win_rate = np.empty(n_paths)
+    for start in range(0, n_paths, batch):
+        end = min(start + batch, n_paths)
+        samples = _resample(returns, end - start, method, rng)
+        final[start:end], drawdown[start:end], win_rate[start:end] = _path_metrics(samples, cash)
+
+    paths = pd.DataFrame(
+        {
+            "Equity Final [$]": final,
+            "Max. Drawdown [%]": -drawdown * 100,
+            "Win Rate [%]": win_rate * 100,
+        }
+    )
+    tail = (1 - confidence) / 2
+    result = pd.DataFrame(
+        {
+            "mean": paths.mean(),
+            "lower": paths.quantile(tail),
+            "median": paths.median(),
+            "upper": paths.quantile(1 - tail),
+        }
+    )
+    result.attrs["paths"] = paths
+    return result
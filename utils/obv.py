@@ -0,0 +1,150 @@
+import json
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from .screener import align_panels
+
+
+def on_balance_volume(close, volume, start=0.0, prev_close=np.nan):
+    """
+    OBV: 收盤上漲加上成交量、下跌減去成交量、平盤不變，第一筆為 start。
+
+    參數:
+    start (float): 前一日的 OBV，接續計算時使用。
+    prev_close (float): 前一日收盤價，NaN 表示沒有前一日 (第一筆方向為 0)。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    diff = np.diff(close, prepend=prev_close)
+    direction = np.where(diff > 0, volume, np.where(diff < 0, -volume, 0.0))
+    return start + np.cumsum(direction)
+
+
+class ObvStore:
+    """
+    與欄式價格檔並存的每檔股票 OBV 檔 (<ticker>/obv.f8)，筆數與價格檔相同。
+
+    update 只計算價格檔中新增的筆數，接在上次的 OBV 之後；
+    價格檔被 compact 重寫 (修正舊日期、write 覆寫) 時整檔重算。
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _read_meta(self, ticker):
+        path = self.store.path(ticker, "obv.json")
+        if not os.path.exists(path):
+            return {"rows": 0, "last_day": None, "inode": None}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_meta(self, ticker, meta):
+        path = self.store.path(ticker, "obv.json")
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def update(self, ticker):
+        """
+        補算 OBV 到價格檔的最後一筆。
+
+        回傳:
+        dict: 價格檔的 memmap 欄位 (store.arrays) 加上 "OBV"。
+        """
+        arrays = self.store.arrays(ticker)
+        n = len(arrays["date"])
+        meta = self._read_meta(ticker)
+        path = self.store.path(ticker, "obv.f8")
+
+        # 價格檔被 compact / write 取代時識別碼改變，需整檔重算
+        inode = self.store.file_id(ticker) if n else None
+        done = meta["rows"]
+        if (
+            done > n
+            or inode != meta["inode"]
+            or (done and int(arrays["date"][done - 1]) != meta["last_day"])
+        ):
+            done = 0
+        if done < n:
+            if done:
+                previous = np.fromfile(path, dtype=np.float64, count=done)
+                obv = on_balance_volume(
+                    arrays["Close"][done:],
+                    arrays["Volume"][done:],
+                    start=previous[-1],
+                    prev_close=arrays["Close"][done - 1],
+                )
+            else:
+                obv = on_balance_volume(arrays["Close"], arrays["Volume"])
+            with open(path, "ab") as f:
+                f.truncate(done * 8)
+                f.write(obv.tobytes())
+            self._write_meta(
+                ticker, {"rows": n, "last_day": int(arrays["date"][n - 1]), "inode": inode}
+            )
+
+        arrays["OBV"] = (
+            np.memmap(path, dtype=np.float64, mode="r", shape=(n,)) if n else np.empty(0)
+        )
+        return arrays
+
+    def panels(self, tickers=None, bars=60):
+        """更新所有股票的 OBV，回傳最近 bars 個交易日的 Close 與 OBV 面板"""
+        tickers = self.store.tickers() if tickers is None else tickers
+        arrays = {}
+        for ticker in tickers:
+            columns = self.update(ticker)
+            if len(columns["date"]):
+                arrays[ticker] = {
+                    name: columns[name][-bars:] for name in ("date", "Close", "OBV")
+                }
+        return align_panels(arrays, ["Close", "OBV"], bars)
+
+
+def obv_divergence(close, obv, n=20):
+    """
+    價格與 OBV 的背離 (只看最後一個交易日)。
+
+    參數:
+    close, obv (DataFrame): (日期 × 股票) 面板，至少 n 列。
+    n (int): 判斷新高、新低的回看天數 (含當天)。
+
+    回傳:
+    DataFrame: 每檔股票一列，bearish 為收盤創 n 日新高但 OBV 未創新高，
+    bullish 為收盤創 n 日新低但 OBV 未創新低；只列出有背離的股票。
+    """
+    c = close.to_numpy(dtype=np.float64)[-n:]
+    o = obv.to_numpy(dtype=np.float64)[-n:]
+    # 最後一天沒有資料的股票不判斷
+    valid = ~np.isnan(c[-1]) & ~np.isnan(o[-1])
+    # 整段都沒有資料的股票 nanmax 會警告，結果為 NaN 不影響判斷
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        price_high = c[-1] >= np.nanmax(c, axis=0)
+        price_low = c[-1] <= np.nanmin(c, axis=0)
+        obv_high = o[-1] >= np.nanmax(o, axis=0)
+        obv_low = o[-1] <= np.nanmin(o, axis=0)
+
+    bearish = valid & price_high & ~obv_high
+    bullish = valid & price_low & ~obv_low
+    result = pd.DataFrame(
+        {
+            "Close": c[-1],
+            "OBV": o[-1],
+            "bearish": bearish,
+            "bullish": bullish,
+        },
+        index=close.columns,
+    )
+    result.index.name = "stock_id"
+    result = result[bearish | bullish]
+    result.attrs["date"] = close.index[-1] if len(close.index) else None
+    return result
+
+
+def scan_obv_divergence(store, tickers=None, n=20):
+    """更新 OBV 後掃描全部股票最後一個交易日的背離"""
+    panels = ObvStore(store).panels(tickers, bars=n)
+    return obv_divergence(panels["Close"], panels["OBV"], n)
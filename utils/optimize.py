@@ -0,0 +1,581 @@
+import math
+import os
+import signal
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import product
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from .backtest import indicator_warmup, vectorized_backtest
+from .pipeline import with_indicators
+from .results import ResultStore, bars_fingerprint
+from .strategy import (
+    BOLL_KD30,
+    BOLL_UP,
+    EMA_CROSSOVER,
+    EMA_VWAP_CROSSOVER,
+    KD_ABOVE,
+    SMA_CROSSOVER,
+)
+
+
+# 參數化的策略族，對應 backtesting/helper.py 的同名策略。
+# 每個函式依參數回傳 (買進策略, 賣出策略, 是否只在獲利時賣出)。
+def _sma_cross(n1=20, n2=60):
+    return SMA_CROSSOVER(n1, n2), SMA_CROSSOVER(n2, n1), True
+
+
+def _sma_kd(n1=5, n2=20, kd=75):
+    return SMA_CROSSOVER(n1, n2), KD_ABOVE(kd), True
+
+
+def _sma_bull(n1=5, n2=20):
+    return SMA_CROSSOVER(n1, n2), BOLL_UP(), True
+
+
+def _ema_kd(n1=9, n2=20, kd=75):
+    return EMA_CROSSOVER(n1, n2), KD_ABOVE(kd), True
+
+
+def _ema_vwap_kd(n1=9, n2=20):
+    # helper.py 中 KD 門檻固定為 75
+    return EMA_VWAP_CROSSOVER(n1, n2), KD_ABOVE(75), True
+
+
+def _boll_kd30():
+    return BOLL_KD30(), BOLL_UP(), False
+
+
+STRATEGY_FAMILIES = {
+    "SmaCross": _sma_cross,
+    "SMA_KD": _sma_kd,
+    "SMA_BULL": _sma_bull,
+    "EMA_KD": _ema_kd,
+    "EMA_VWAP_KD": _ema_vwap_kd,
+    "BOLL_KD30": _boll_kd30,
+}
+
+# backtest.ipynb 中使用的參數範圍
+DEFAULT_GRIDS = {
+    "SmaCross": {"n1": [5, 10, 20, 50], "n2": [10, 20, 50, 60, 100, 120]},
+    "SMA_KD": {"n1": [5, 10, 20, 50], "n2": [10, 20, 50, 60, 100, 120], "kd": [70, 75, 80, 85]},
+    "SMA_BULL": {"n1": [5, 10, 20, 50], "n2": [10, 20, 50, 60, 100, 120]},
+    "EMA_KD": {"n1": [5, 10, 20, 50], "n2": [10, 20, 50, 60, 100, 120], "kd": [70, 75, 80, 85]},
+    "EMA_VWAP_KD": {"n1": [5, 10, 20, 50], "n2": [10, 20, 50, 60, 100, 120]},
+    "BOLL_KD30": {},
+}
+
+# 結果表保留的統計欄位
+RESULT_COLUMNS = [
+    "Equity Final [$]",
+    "Return [%]",
+    "Buy & Hold Return [%]",
+    "Max. Drawdown [%]",
+    "# Trades",
+    "Win Rate [%]",
+    "SQN",
+]
+
+_PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# walk_forward 結果表的識別欄位
+_FOLD_COLUMNS = ["ticker", "strategy", "fold", "train_start", "test_start", "test_end"]
+
+
+def expand_grid(grid, constraint=None):
+    """{參數: 候選值} 展開成參數 dict 的 list，單一值視為只有一個候選"""
+    names = list(grid)
+    values = [v if isinstance(v, (list, tuple, range)) else [v] for v in grid.values()]
+    combos = [dict(zip(names, combo)) for combo in product(*values)]
+    if constraint is not None:
+        combos = [params for params in combos if constraint(params)]
+    return combos
+
+
+def evaluate(df, family, params, **kwargs):
+    """以一組參數回測一個策略族，回傳 vectorized_backtest 的統計結果"""
+    buy, sell, profit_only = STRATEGY_FAMILIES[family](**params)
+    df = with_indicators(df, buy.columns + sell.columns)
+    return vectorized_backtest(
+        df,
+        buy.get_condition(df),
+        sell.get_condition(df),
+        profit_only=profit_only,
+        warmup=indicator_warmup(df, buy.columns + sell.columns),
+        name=family,
+        **kwargs,
+    )
+
+
+class SharedPrices:
+    """
+    把多檔股票的 OHLCV 放進同一塊共享記憶體，
+    子程序只附掛這塊記憶體，不必為每個工作重新 pickle 價格資料。
+    """
+
+    def __init__(self, frames):
+        self.layout = {}
+        offset = 0
+        for ticker, df in frames.items():
+            self.layout[ticker] = (offset, len(df))
+            offset += len(df)
+        self.rows = offset
+
+        # 前段為日期 (int64 ns)，後段為五個價格欄位，各自連續存放
+        size = max(self.rows * 8 * (1 + len(_PRICE_COLUMNS)), 1)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        dates, columns = _views(self.shm, self.rows)
+        for ticker, df in frames.items():
+            start, rows = self.layout[ticker]
+            dates[start : start + rows] = pd.DatetimeIndex(df.index).as_unit("ns").asi8
+            for i, column in enumerate(_PRICE_COLUMNS):
+                columns[i, start : start + rows] = df[column].to_numpy(dtype=np.float64)
+
+    def spec(self):
+        return self.shm.name, self.rows, self.layout
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _views(shm, rows):
+    dates = np.ndarray((rows,), dtype=np.int64, buffer=shm.buf)
+    columns = np.ndarray(
+        (len(_PRICE_COLUMNS), rows), dtype=np.float64, buffer=shm.buf, offset=rows * 8
+    )
+    return dates, columns
+
+
+# 子程序內的共享記憶體與已建立的 DataFrame
+_worker = {}
+
+
+def _attach(spec):
+    # 中斷由主程序處理，子程序忽略 Ctrl-C
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    name, rows, layout = spec
+    shm = shared_memory.SharedMemory(name=name)
+    dates, columns = _views(shm, rows)
+    _worker.update(shm=shm, dates=dates, columns=columns, layout=layout, frames={})
+
+
+def _frame(ticker):
+    frames = _worker["frames"]
+    if ticker not in frames:
+        start, rows = _worker["layout"][ticker]
+        index = pd.DatetimeIndex(_worker["dates"][start : start + rows].view("datetime64[ns]"))
+        frames[ticker] = pd.DataFrame(
+            {c: _worker["columns"][i, start : start + rows] for i, c in enumerate(_PRICE_COLUMNS)},
+            index=index,
+            copy=False,
+        )
+    return frames[ticker]
+
+
+def _with_family_indicators(df, family, combos):
+    # 整批參數需要的指標先一次併入 df，之後每組參數不必再各自 join
+    columns = []
+    for params in combos:
+        buy, sell, _ = STRATEGY_FAMILIES[family](**params)
+        columns += buy.columns + sell.columns
+    return with_indicators(df, list(dict.fromkeys(columns)))
+
+
+def _evaluate_chunk(df, ticker, family, combos, keys, results_db=None):
+    # 結果快取以目前的 K 棒計算 fingerprint，資料有變動時自動重算
+    if results_db is not None:
+        store = ResultStore(results_db)
+        fingerprint = bars_fingerprint(df)
+        cached = store.get_many(ticker, family, combos, fingerprint)
+    else:
+        cached = [None] * len(combos)
+
+    missing = [params for params, stats in zip(combos, cached) if stats is None]
+    computed = []
+    if missing:
+        full = _with_family_indicators(df, family, missing)
+        computed = [evaluate(full, family, params) for params in missing]
+        if results_db is not None:
+            store.put_many(ticker, family, missing, fingerprint, computed)
+
+    computed = iter(computed)
+    rows = []
+    for params, stats in zip(combos, cached):
+        stats = next(computed) if stats is None else stats
+        rows.append({"ticker": ticker, "strategy": family, **params, **{k: stats[k] for k in keys}})
+    return rows
+
+
+def _run_task(function, ticker, family, combos, extra, options):
+    # 同一個子程序連續回測同一檔股票，指標由 utils.kernels 記憶化共用
+    return function(_frame(ticker), ticker, family, combos, *extra, **options)
+
+
+def _run_tasks(frames, tasks, function, options, workers, progress, cancel):
+    """
+    執行 (ticker, 策略族, 參數 list, *其他參數) 工作，workers 為 1 時在目前程序內依序執行，
+    否則價格放入共享記憶體後交給子程序池。
+
+    回傳:
+    tuple: (依工作順序排列的結果，未完成的為 None, 是否中途取消)
+    """
+    total = sum(len(task[2]) for task in tasks)
+    workers = workers or os.cpu_count()
+    # 依工作順序保存結果，排序時同分的先後與執行順序無關
+    results = [None] * len(tasks)
+    done = 0
+    cancelled = False
+
+    def report(count):
+        nonlocal done
+        done += count
+        if progress is not None:
+            progress(done, total)
+
+    if workers == 1:
+        for i, (ticker, family, combos, *extra) in enumerate(tasks):
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            results[i] = function(frames[ticker], ticker, family, combos, *extra, **options)
+            report(len(combos))
+        return results, cancelled
+
+    shared = SharedPrices(frames)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_attach, initargs=(shared.spec(),)
+        ) as executor:
+            pending = {
+                executor.submit(_run_task, function, ticker, family, combos, extra, options): i
+                for i, (ticker, family, combos, *extra) in enumerate(tasks)
+            }
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    # 保留取消前已在執行、之後完成的工作
+                    for future, i in pending.items():
+                        if not future.cancelled() and future.exception() is None:
+                            results[i] = future.result()
+                    break
+                finished, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = pending.pop(future)
+                    results[i] = future.result()
+                    report(len(tasks[i][2]))
+    finally:
+        shared.close()
+    return results, cancelled
+
+
+def _ranked(rows, maximize, keys):
+    result = pd.DataFrame(rows)
+    if result.empty:
+        return result
+    params = [c for c in result.columns if c not in keys and c not in ("ticker", "strategy")]
+    result = result[["ticker", "strategy"] + params + keys]
+    # 不同策略族的參數不同，缺少的參數為 NA，整數參數維持整數
+    result[params] = result[params].convert_dtypes()
+    result = result.sort_values(maximize, ascending=False, kind="stable").reset_index(drop=True)
+    result.insert(0, "rank", result.groupby("ticker").cumcount() + 1)
+    return result
+
+
+def optimize_grid(
+    frames,
+    grids=None,
+    maximize="Equity Final [$]",
+    constraint=None,
+    workers=None,
+    chunk_size=32,
+    progress=None,
+    cancel=None,
+    results_db=None,
+):
+    """
+    以多個子程序掃描 (股票 × 策略族 × 參數) 的所有組合。
+
+    參數:
+    frames (dict): {ticker: 以日期為索引的 OHLCV DataFrame}。
+    grids (dict): {策略族名稱: {參數: 候選值}}，預設為 DEFAULT_GRIDS。
+    maximize (str): 排序依據的統計欄位。
+    constraint (callable): 參數 dict 回傳 False 的組合略過，例如 lambda p: p["n1"] < p["n2"]。
+    workers (int): 子程序數，預設為 CPU 核心數；1 表示在目前程序內執行。
+    chunk_size (int): 每個工作包含的參數組合數。
+    progress (callable): progress(已完成組合數, 總組合數)，每完成一個工作呼叫一次。
+    cancel (threading.Event): 設定後不再送出新工作，回傳已完成的部分。
+    results_db (str): 回測結果快取的資料庫 (ResultStore)，已有的結果直接讀取不重算。
+
+    回傳:
+    DataFrame: 依 maximize 由高到低排序，rank 為該股票內的名次。
+    attrs["cancelled"] 表示是否中途取消。
+    """
+    grids = grids or DEFAULT_GRIDS
+    keys = list(dict.fromkeys(RESULT_COLUMNS + [maximize]))
+    tasks = []
+    for ticker in frames:
+        for family, grid in grids.items():
+            combos = expand_grid(grid, constraint)
+            for i in range(0, len(combos), chunk_size):
+                tasks.append((ticker, family, combos[i : i + chunk_size]))
+
+    results, cancelled = _run_tasks(
+        frames,
+        tasks,
+        _evaluate_chunk,
+        {"keys": keys, "results_db": results_db},
+        workers,
+        progress,
+        cancel,
+    )
+    result = _ranked([row for rows in results if rows for row in rows], maximize, keys)
+    result.attrs["cancelled"] = cancelled
+    return result
+
+
+def _score(value):
+    # NaN (例如沒有交易時的 SQN) 排在最後
+    return -np.inf if pd.isna(value) else value
+
+
+def _halving_rounds(count, eta):
+    """候選數每輪除以 eta，直到不超過 eta 個為止的淘汰輪數"""
+    rounds = 0
+    while count > eta:
+        count = math.ceil(count / eta)
+        rounds += 1
+    return rounds
+
+
+def successive_halving(
+    df,
+    family,
+    grid,
+    maximize="Equity Final [$]",
+    eta=3,
+    min_bars=250,
+    max_rounds=1,
+    constraint=None,
+    verify=False,
+):
+    """
+    逐輪淘汰的參數搜尋 (successive halving)。
+
+    第一輪以最近一小段歷史評估所有候選，保留前 1/eta 進入下一輪，
+    每輪的歷史長度放大 eta 倍，最後一輪以完整歷史評估。
+    指標先以完整歷史計算一次，各輪只截取尾段，短區間不會因指標暖身而失真。
+
+    vectorized_backtest 每次回測的成本幾乎與 K 棒數無關，第一輪又必須評估所有候選，
+    回測次數一定多於全格點 (預設一輪淘汰時約為 1 + 1/eta 倍)；
+    只有回測成本與 K 棒數成正比時才會比 optimize_grid 省時。
+
+    參數:
+    grid (dict 或 list): {參數: 候選值}，或已展開的參數 dict list。
+    eta (int): 每輪保留 1/eta 的候選。
+    min_bars (int): 第一輪最少使用的 K 棒數，太短的區間容易淘汰掉全期最佳的參數。
+    max_rounds (int): 最多淘汰幾輪，每多一輪就多一次回測與一次誤淘汰的機會。
+    verify (bool): 另外以完整歷史跑一次全格點，確認找到的最佳參數相同。
+
+    回傳:
+    DataFrame: 最後一輪候選的完整歷史結果，依 maximize 由高到低排序。
+    attrs: evaluations / grid_evaluations (實際與全格點的回測次數)、
+    bars / grid_bars (以 K 棒數加權的計算量)，verify 時另有 grid_best 與 same_best。
+    """
+    combos = grid if isinstance(grid, list) else expand_grid(grid, constraint)
+    keys = list(dict.fromkeys(RESULT_COLUMNS + [maximize]))
+    full = _with_family_indicators(df, family, combos)
+    n = len(full)
+    rounds = min(_halving_rounds(len(combos), eta), max_rounds)
+
+    survivors = combos
+    evaluations = 0
+    bars = 0
+    for r in range(rounds + 1):
+        length = n if r == rounds else min(n, max(min_bars, n // eta ** (rounds - r)))
+        window = full.iloc[n - length :]
+        results = [evaluate(window, family, params) for params in survivors]
+        evaluations += len(survivors)
+        bars += len(survivors) * length
+        if r == rounds:
+            break
+        order = np.argsort([-_score(stats[maximize]) for stats in results], kind="stable")
+        survivors = [survivors[i] for i in order[: math.ceil(len(survivors) / eta)]]
+
+    rows = [
+        {"strategy": family, **params, **{k: stats[k] for k in keys}}
+        for params, stats in zip(survivors, results)
+    ]
+    result = pd.DataFrame(rows, columns=["strategy"] + list(combos[0] if combos else []) + keys)
+    result = result.sort_values(maximize, ascending=False, kind="stable").reset_index(drop=True)
+    result.attrs.update(
+        evaluations=evaluations,
+        grid_evaluations=len(combos),
+        bars=bars,
+        grid_bars=len(combos) * n,
+    )
+
+    if verify and combos:
+        scores = [_score(evaluate(full, family, params)[maximize]) for params in combos]
+        grid_best = combos[int(np.argmax(scores))]
+        best = {name: result.iloc[0][name] for name in grid_best}
+        result.attrs.update(grid_best=grid_best, same_best=best == grid_best)
+    return result
+
+
+def _halving_task(df, ticker, family, combos, maximize, eta, min_bars, max_rounds, verify):
+    result = successive_halving(
+        df,
+        family,
+        combos,
+        maximize=maximize,
+        eta=eta,
+        min_bars=min_bars,
+        max_rounds=max_rounds,
+        verify=verify,
+    )
+    result.insert(0, "ticker", ticker)
+    return result.to_dict("records"), result.attrs
+
+
+def optimize_halving(
+    frames,
+    grids=None,
+    maximize="Equity Final [$]",
+    constraint=None,
+    eta=3,
+    min_bars=250,
+    max_rounds=1,
+    verify=False,
+    workers=None,
+    progress=None,
+    cancel=None,
+):
+    """
+    與 optimize_grid 相同的輸入與輸出，改以 successive_halving 搜尋，
+    每個 (股票, 策略族) 為一個工作。
+
+    參數:
+    verify (bool): 每個工作另跑一次全格點，確認最佳參數與全格點相同 (計算量較大)。
+
+    回傳:
+    DataFrame: 各股票、策略族最後一輪候選的結果。attrs 另有
+    evaluations / grid_evaluations / bars / grid_bars 的總和；verify 時另有
+    verified (比對的工作數) 與 same_best (最佳參數與全格點相同的工作數)。
+    """
+    grids = grids or DEFAULT_GRIDS
+    keys = list(dict.fromkeys(RESULT_COLUMNS + [maximize]))
+    tasks = [
+        (ticker, family, expand_grid(grid, constraint))
+        for ticker in frames
+        for family, grid in grids.items()
+    ]
+    options = {
+        "maximize": maximize,
+        "eta": eta,
+        "min_bars": min_bars,
+        "max_rounds": max_rounds,
+        "verify": verify,
+    }
+    results, cancelled = _run_tasks(
+        frames, tasks, _halving_task, options, workers, progress, cancel
+    )
+
+    finished = [r for r in results if r is not None]
+    result = _ranked([row for rows, _ in finished for row in rows], maximize, keys)
+    result.attrs["cancelled"] = cancelled
+    for name in ("evaluations", "grid_evaluations", "bars", "grid_bars"):
+        result.attrs[name] = sum(attrs[name] for _, attrs in finished)
+    if verify:
+        checked = [attrs for _, attrs in finished if "same_best" in attrs]
+        result.attrs["verified"] = len(checked)
+        result.attrs["same_best"] = sum(attrs["same_best"] for attrs in checked)
+    return result
+
+
+def walk_forward_folds(n, train_bars=240, test_bars=60, step=None):
+    """
+    滾動切分 n 根 K 棒，回傳 (訓練起點, 測試起點, 測試終點) 位置的 list。
+    每個測試區間緊接在訓練區間之後，step 預設為 test_bars (測試區間不重疊)。
+    """
+    step = step or test_bars
+    return [
+        (start, start + train_bars, start + train_bars + test_bars)
+        for start in range(0, n - train_bars - test_bars + 1, step)
+    ]
+
+
+def _fold_task(df, ticker, family, combos, fold, number, maximize, keys):
+    # 指標以完整歷史計算後再截取各區間，重疊的 fold 由 utils.kernels 記憶化共用，
+    # 測試區間開頭的指標也不會因暖身而變成 NaN
+    full = _with_family_indicators(df, family, combos)
+    train_start, test_start, test_end = fold
+    train = full.iloc[train_start:test_start]
+    test = full.iloc[test_start:test_end]
+
+    scores = [_score(evaluate(train, family, params)[maximize]) for params in combos]
+    best = combos[int(np.argmax(scores))]
+    stats = evaluate(test, family, best)
+    return {
+        "ticker": ticker,
+        "strategy": family,
+        "fold": number,
+        "train_start": train.index[0],
+        "test_start": test.index[0],
+        "test_end": test.index[-1],
+        **best,
+        f"train {maximize}": max(scores),
+        **{k: stats[k] for k in keys},
+    }
+
+
+def walk_forward(
+    frames,
+    grids=None,
+    maximize="Equity Final [$]",
+    constraint=None,
+    train_bars=240,
+    test_bars=60,
+    step=None,
+    workers=None,
+    progress=None,
+    cancel=None,
+):
+    """
+    Walk-forward 最佳化: 每個 fold 在訓練區間以全格點找出 maximize 最高的參數，
+    再以該參數回測緊接在後的測試區間。每個 (股票, 策略族, fold) 為一個工作，
+    各 fold 平行執行。
+
+    參數:
+    train_bars, test_bars (int): 訓練與測試區間的 K 棒數，預設約一年與一季。
+    step (int): 相鄰 fold 的間隔 K 棒數，預設為 test_bars。
+    其餘參數同 optimize_grid。
+
+    回傳:
+    DataFrame: 每個 fold 一列，含區間日期、最佳參數、訓練區間的 maximize，
+    以及測試區間的統計數字。attrs["cancelled"] 表示是否中途取消。
+    """
+    grids = grids or DEFAULT_GRIDS
+    keys = list(dict.fromkeys(RESULT_COLUMNS + [maximize]))
+    tasks = []
+    for ticker, df in frames.items():
+        for family, grid in grids.items():
+            combos = expand_grid(grid, constraint)
+            if not combos:
+                continue
+            folds = walk_forward_folds(len(df), train_bars, test_bars, step)
+            for number, fold in enumerate(folds):
+                tasks.append((ticker, family, combos, fold, number))
+
+    results, cancelled = _run_tasks(
+        frames, tasks, _fold_task, {"maximize": maximize, "keys": keys}, workers, progress, cancel
+    )
+    result = pd.DataFrame([row for row in results if row is not None])
+    if not result.empty:
+        params = [c for c in result.columns if c not in keys and c not in _FOLD_COLUMNS]
+        params.remove(f"train {maximize}")
+        result = result[_FOLD_COLUMNS + params + [f"train {maximize}"] + keys]
+        result[params] = result[params].convert_dtypes()
+    result.attrs["cancelled"] = cancelled
+    return result
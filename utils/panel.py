@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from .rolling import rolling_max_value, rolling_min_value
+
+
+# 多檔股票一次計算的指標。輸入為 (日期 × 股票) 的 2D 陣列或 DataFrame，
+# 沿日期方向 (axis=0) 計算，輸出同樣是面板。缺值 (未上市、停牌) 以 NaN 表示，
+# 視窗內有 NaN 時結果為 NaN，與 pandas rolling 預設 min_periods 相同。
+
+
+def _values(x):
+    if isinstance(x, pd.DataFrame):
+        return x.to_numpy(dtype=np.float64)
+    return np.asarray(x, dtype=np.float64)
+
+
+def _wrap(result, like):
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(result, index=like.index, columns=like.columns)
+    return result
+
+
+def _rolling(values, n):
+    # pandas 的 rolling 逐欄以加入/移出的累加計算 (含 Kahan 補償、連續相同值歸零)，
+    # 結果與單一股票路徑 (utils.kernels) 完全相同
+    return pd.DataFrame(values.reshape(values.shape[0], -1)).rolling(window=n)
+
+
+def to_panel(df, field, index="date", columns="stock_id"):
+    """將長格式資料 (date, stock_id, 欄位) 轉成 (日期 × 股票) 面板"""
+    return df.pivot_table(index=index, columns=columns, values=field).sort_index()
+
+
+def panel_rolling_mean(x, n):
+    values = _values(x)
+    result = _rolling(values, n).mean().to_numpy().reshape(values.shape)
+    return _wrap(result, x)
+
+
+def panel_rolling_std(x, n, ddof=1):
+    values = _values(x)
+    result = _rolling(values, n).std(ddof=ddof).to_numpy().reshape(values.shape)
+    return _wrap(result, x)
+
+
+def panel_rolling_max(x, n):
+    return rolling_max_value(x, n)
+
+
+def panel_rolling_min(x, n):
+    return rolling_min_value(x, n)
+
+
+def panel_ewm(x, com=None, span=None):
+    """等同每一欄做 ewm(com=com 或 span=span, adjust=False).mean()"""
+    values = _values(x)
+    frame = pd.DataFrame(values.reshape(values.shape[0], -1))
+    result = frame.ewm(com=com, span=span, adjust=False).mean().to_numpy().reshape(values.shape)
+    return _wrap(result, x)
+
+
+def panel_crossover(fast, slow):
+    """快線由下往上穿越慢線的位置"""
+    f = _values(fast)
+    s = _values(slow)
+    result = np.zeros(f.shape, dtype=bool)
+    with np.errstate(invalid="ignore"):
+        result[1:] = (f[1:] > s[1:]) & (f[:-1] <= s[:-1])
+    return _wrap(result, fast)
+
+
+def panel_kdj(high, low, close, n=9):
+    """回傳 (k, d) 面板"""
+    h, l, c = _values(high), _values(low), _values(close)
+    ln = panel_rolling_min(l, n)
+    hn = panel_rolling_max(h, n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = ((c - ln) / (hn - ln)) * 100
+    k = panel_ewm(rsv, com=2)
+    d = panel_ewm(k, com=2)
+    return _wrap(k, close), _wrap(d, close)
+
+
+def panel_bollinger_bands(close, n=20):
+    """回傳 (Middle, Upper, Lower) 面板"""
+    c = _values(close)
+    middle = panel_rolling_mean(c, n)
+    std = panel_rolling_std(c, n)
+    upper = middle + (std * 2)
+    lower = middle - (std * 2)
+    return _wrap(middle, close), _wrap(upper, close), _wrap(lower, close)
+
+
+def panel_rsi(close, period=14):
+    c = _values(close)
+    delta = np.full(c.shape, np.nan)
+    delta[1:] = c[1:] - c[:-1]
+    with np.errstate(invalid="ignore"):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = -np.where(delta < 0, delta, 0.0)
+    avg_gain = panel_ewm(gain, com=period - 1)
+    avg_loss = panel_ewm(loss, com=period - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+    return _wrap(rsi, close)
+
+
+def panel_sma_crossover(close, n1=5, n2=20):
+    c = _values(close)
+    return _wrap(panel_crossover(panel_rolling_mean(c, n1), panel_rolling_mean(c, n2)), close)
+
+
+def panel_ema_crossover(close, n1=9, n2=20):
+    c = _values(close)
+    return _wrap(panel_crossover(panel_ewm(c, span=n1), panel_ewm(c, span=n2)), close)
+
+
+def panel_indicators(high, low, close):
+    """
+    一次算出 app.py 使用的全部指標。
+
+    回傳:
+    dict: {"k", "d", "Middle", "Upper", "Lower", "rsi"}，皆為面板。
+    """
+    k, d = panel_kdj(high, low, close)
+    middle, upper, lower = panel_bollinger_bands(close)
+    return {
+        "k": k,
+        "d": d,
+        "Middle": middle,
+        "Upper": upper,
+        "Lower": lower,
+        "rsi": panel_rsi(close),
+    }
@@ -0,0 +1,183 @@
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from . import kernels
+
+
+# 指標欄位命名: <種類>_<週期>，例如 sma_20、ema_9、k_9；沒有週期的累積指標
+# 只用種類名稱，例如 vwap。
+# 常用欄位另有別名，與 app.py 及 utils.formula 的輸出欄位相同。
+ALIASES = {
+    "k": "k_9",
+    "d": "d_9",
+    "Middle": "sma_20",
+    "Upper": "upper_20",
+    "Lower": "lower_20",
+    "rsi": "rsi_14",
+}
+
+_NAME = re.compile(r"^([a-z]+)(?:_(\d+))?$")
+
+# 不需要週期的指標
+_CUMULATIVE = ("vwap",)
+
+
+def _dependencies(kind, n):
+    """各指標依賴的其他指標欄位"""
+    if kind == "rsv":
+        return [f"ln_{n}", f"hn_{n}"]
+    if kind == "k":
+        return [f"rsv_{n}"]
+    if kind == "d":
+        return [f"k_{n}"]
+    if kind in ("upper", "lower"):
+        return [f"sma_{n}", f"std_{n}"]
+    return []
+
+
+class KernelOps:
+    """單一股票 (1D) 的滾動運算，使用 utils.kernels 的記憶化 kernel"""
+
+    def mean(self, name, x, n):
+        return kernels.sma(x, n)
+
+    def std(self, name, x, n):
+        return kernels.rolling_std(x, n)
+
+    def ema(self, name, x, n):
+        return kernels.ema(x, n)
+
+    def ewm(self, name, x, com):
+        return kernels.ewm(x, com)
+
+    def lowest(self, name, x, n):
+        return kernels.lowest(x, n)
+
+    def highest(self, name, x, n):
+        return kernels.highest(x, n)
+
+    def rsi(self, name, x, n):
+        return kernels.rsi(x, n)
+
+    def vwap(self, name, high, low, close, volume):
+        return kernels.vwap(high, low, close, volume)
+
+    def divide(self, a, b):
+        return a / b
+
+
+@lru_cache(maxsize=None)
+def parse_indicator(name):
+    """欄位名稱 (可用別名) 拆成 (種類, 週期)，沒有週期的累積指標週期為 0"""
+    match = _NAME.match(ALIASES.get(name, name))
+    if not match:
+        raise ValueError(f"Could not parse indicator name: {name}")
+    kind, n = match.groups()
+    if n is None and kind not in _CUMULATIVE:
+        raise ValueError(f"Could not parse indicator name: {name}")
+    return kind, int(n or 0)
+
+
+def compute_indicator(name, prices, get, ops):
+    """
+    計算一個指標欄位。指標之間的組合 (RSV、K、D、布林通道) 只定義在這裡，
+    滾動運算交給 ops: KernelOps (單一股票)、utils.screener 的面板版本、
+    utils.alerts 的逐筆版本。ops 的方法收到欄位名稱，逐筆版本以此保存各自的狀態。
+
+    參數:
+    prices: 以 "High"、"Low"、"Close"、"Volume" 取得價格的 DataFrame、面板 dict 或單根 K 棒 dict。
+    get (callable): 取得已計算的依賴指標 (resolve_order 保證先算好)。
+    """
+    kind, n = parse_indicator(name)
+    close = prices["Close"]
+    if kind == "sma":
+        return ops.mean(name, close, n)
+    if kind == "std":
+        return ops.std(name, close, n)
+    if kind == "ema":
+        return ops.ema(name, close, n)
+    if kind == "ln":
+        return ops.lowest(name, prices["Low"], n)
+    if kind == "hn":
+        return ops.highest(name, prices["High"], n)
+    if kind == "rsv":
+        ln, hn = get(f"ln_{n}"), get(f"hn_{n}")
+        return ops.divide(close - ln, hn - ln) * 100
+    if kind in ("k", "d"):
+        source = get(f"rsv_{n}") if kind == "k" else get(f"k_{n}")
+        return ops.ewm(name, source, 2)
+    if kind == "upper":
+        return get(f"sma_{n}") + (get(f"std_{n}") * 2)
+    if kind == "lower":
+        return get(f"sma_{n}") - (get(f"std_{n}") * 2)
+    if kind == "rsi":
+        return ops.rsi(name, close, n)
+    if kind == "vwap":
+        return ops.vwap(name, prices["High"], prices["Low"], close, prices["Volume"])
+    raise NotImplementedError(f"Unknown indicator: {name}")
+
+
+def resolve_order(columns):
+    """
+    展開依賴並去除重複，回傳依計算順序排列的標準欄位名稱。
+    多個策略共用的 sma_20、ln_9 等中間結果只會出現一次。
+    """
+    order = []
+    seen = set()
+
+    def visit(name):
+        canonical = ALIASES.get(name, name)
+        if canonical in seen:
+            return
+        kind, n = parse_indicator(canonical)
+        for dep in _dependencies(kind, n):
+            visit(dep)
+        seen.add(canonical)
+        order.append(canonical)
+
+    for name in columns:
+        visit(name)
+    return order
+
+
+def compute_indicators(df, columns):
+    """
+    計算指定的指標欄位，每個不同的移動平均、EWM、滾動極值只算一次，
+    結果寫入同一個預先配置的 DataFrame。
+
+    參數:
+    df (DataFrame): 含 High、Low、Close 欄位的股價資料。
+    columns (list): 指標欄位名稱 (可用別名，例如 "k"、"Upper")。
+
+    回傳:
+    DataFrame: 與 df 相同索引，包含所有要求的欄位及其中間結果。
+    """
+    order = resolve_order(columns)
+    aliases = [name for name in dict.fromkeys(columns) if name in ALIASES]
+    names = order + aliases
+
+    block = np.empty((len(df), len(names)))
+    result = pd.DataFrame(block, index=df.index, columns=names, copy=False)
+    position = {name: i for i, name in enumerate(names)}
+
+    def get(name):
+        return result[name]
+
+    ops = KernelOps()
+    for name in order:
+        block[:, position[name]] = np.asarray(
+            compute_indicator(name, df, get, ops), dtype=np.float64
+        )
+    for name in aliases:
+        block[:, position[name]] = block[:, position[ALIASES[name]]]
+    return result
+
+
+def with_indicators(df, columns):
+    """df 已有全部欄位時直接回傳，否則補算缺少的欄位 (不修改原本的 df)"""
+    missing = [name for name in columns if name not in df]
+    if not missing:
+        return df
+    indicators = compute_indicators(df, missing)
+    return df.join(indicators[[name for name in indicators.columns if name not in df]])
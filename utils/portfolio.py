@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+from .backtest import indicator_warmup
+from .helper import query_data
+from .strategy import get_trade_condition, strategy_columns
+
+
+# 多檔股票共用一個資金池的組合回測。撮合規則與 vectorized_backtest 相同:
+# 訊號出現在第 i 根 K 棒收盤，於第 i+1 根開盤價成交，手續費於進場與出場各收一次。
+# 同一根 K 棒先處理賣出，釋出的資金可再用於同一根 K 棒的買進。
+
+
+def watch_list_strategies(db_name="mystock.db"):
+    """watch_list 每檔股票的 (buy_strategy, sell_strategy)"""
+    rows = query_data(
+        "SELECT stock_code, buy_strategy, sell_strategy FROM watch_list;", db_name=db_name
+    )
+    return {
+        stock_code: (buy_strategy or "", sell_strategy or "")
+        for stock_code, buy_strategy, sell_strategy in rows or []
+    }
+
+
+def signal_panels(frames, strategies):
+    """
+    計算每檔股票的買賣訊號並對齊成 (日期 × 股票) 面板。
+
+    參數:
+    frames (dict): {ticker: 以日期為索引的 OHLCV DataFrame}。
+    strategies (dict): {ticker: (buy_strategy, sell_strategy)}，沒有的股票略過。
+
+    回傳:
+    dict: {"Open", "Close", "buy", "sell"} 四個面板，欄位順序同 frames。
+    暖身期內及當天沒有股價的訊號為 False。
+    """
+    tickers = [ticker for ticker in frames if ticker in strategies]
+    if not tickers:
+        raise ValueError("No ticker has both price data and a strategy")
+    index = pd.DatetimeIndex(sorted(set().union(*(frames[t].index for t in tickers))))
+    shape = (len(index), len(tickers))
+    panels = {
+        "Open": np.full(shape, np.nan),
+        "Close": np.full(shape, np.nan),
+        "buy": np.zeros(shape, dtype=bool),
+        "sell": np.zeros(shape, dtype=bool),
+    }
+    for j, ticker in enumerate(tickers):
+        df = frames[ticker]
+        buy_strategy, sell_strategy = strategies[ticker]
+        rows = index.get_indexer(df.index)
+        buy, sell = get_trade_condition(df, buy_strategy, sell_strategy)
+        warmup = indicator_warmup(df, strategy_columns(buy_strategy, sell_strategy))
+        buy = np.asarray(pd.Series(buy).fillna(False), dtype=bool)
+        sell = np.asarray(pd.Series(sell).fillna(False), dtype=bool)
+        buy[: warmup + 1] = False
+        sell[: warmup + 1] = False
+        panels["Open"][rows, j] = df["Open"].to_numpy(dtype=np.float64)
+        panels["Close"][rows, j] = df["Close"].to_numpy(dtype=np.float64)
+        panels["buy"][rows, j] = buy
+        panels["sell"][rows, j] = sell
+    return {
+        name: pd.DataFrame(values, index=index, columns=tickers)
+        for name, values in panels.items()
+    }
+
+
+def portfolio_backtest(
+    frames,
+    strategies,
+    cash=1_000_000,
+    commission=0.001425,
+    max_positions=10,
+    position_size=None,
+    profit_only=False,
+):
+    """
+    所有股票在同一個時間迴圈內回測，共用一個資金池。
+    迴圈只沿日期前進，每一步以陣列運算同時處理所有股票。
+
+    參數:
+    frames (dict): {ticker: 以日期為索引的 OHLCV DataFrame}。
+    strategies (dict): {ticker: (buy_strategy, sell_strategy)}，例如 watch_list_strategies()。
+    cash (float): 初始資金。
+    commission (float): 單邊手續費率，預設 0.1425%。
+    max_positions (int): 同時持有的股票數上限。
+    position_size (float): 每筆新部位占當時總權益的比例，預設為 1 / max_positions。
+    profit_only (bool): 只在收盤價高於進場價時才賣出。
+
+    回傳:
+    Series: 統計數字，另含 '_equity_curve' (Equity、Cash、DrawdownPct、Positions)、
+    '_trades' (每筆交易，未平倉的 ExitBar 為 NA) 與 '_positions' (每日持股面板)。
+    """
+    panels = signal_panels(frames, strategies)
+    index = panels["Close"].index
+    tickers = list(panels["Close"].columns)
+    open_ = panels["Open"].to_numpy()
+    close = panels["Close"].to_numpy()
+    buy = panels["buy"].to_numpy()
+    sell = panels["sell"].to_numpy()
+    # 停牌日以前一日收盤價估算市值
+    mark = panels["Close"].ffill().fillna(0).to_numpy()
+    position_size = position_size or 1 / max_positions
+    n, m = close.shape
+
+    size = np.zeros(m)
+    entry_price = np.zeros(m)
+    entry_bar = np.full(m, -1)
+    # 每檔股票最近一個交易日的訊號，留到該股票下一根有開盤價的 K 棒才執行，
+    # 停牌或資料較稀疏的股票與 vectorized_backtest 的結果相同
+    pending_buy = np.zeros(m, dtype=bool)
+    pending_sell = np.zeros(m, dtype=bool)
+    signal_close = np.full(m, np.nan)
+    equity = np.empty(n)
+    cash_curve = np.empty(n)
+    positions = np.zeros((n, m))
+    records = []
+    balance = float(cash)
+
+    for i in range(n):
+        if i > 0:
+            traded = ~np.isnan(close[i - 1])
+            pending_buy = np.where(traded, buy[i - 1], pending_buy)
+            pending_sell = np.where(traded, sell[i - 1], pending_sell)
+            signal_close = np.where(traded, close[i - 1], signal_close)
+            tradable = ~np.isnan(open_[i])
+            held = size > 0
+
+            # 最近一個交易日出現賣出訊號 (且沒有買進訊號) 的持股，以本根開盤價出場
+            exits = held & tradable & pending_sell & ~pending_buy
+            if profit_only:
+                exits &= signal_close > entry_price
+            for j in np.flatnonzero(exits):
+                price = open_[i, j]
+                balance += size[j] * price * (1 - commission)
+                records.append(
+                    (tickers[j], size[j], entry_bar[j], i, entry_price[j], price)
+                )
+                size[j] = 0
+
+            # 依股票順序填滿剩餘的持股名額
+            slots = max_positions - np.count_nonzero(size)
+            entries = np.flatnonzero((size == 0) & tradable & pending_buy)[: max(slots, 0)]
+            if len(entries):
+                total = balance + size @ mark[i - 1]
+                for j in entries:
+                    price = open_[i, j]
+                    budget = min(total * position_size, balance)
+                    shares = budget // (price * (1 + commission))
+                    if shares <= 0:
+                        continue
+                    balance -= shares * price * (1 + commission)
+                    size[j] = shares
+                    entry_price[j] = price
+                    entry_bar[j] = i
+
+            # 已在本根開盤處理過的訊號不再保留
+            pending_buy &= ~tradable
+            pending_sell &= ~tradable
+
+        positions[i] = size
+        cash_curve[i] = balance
+        equity[i] = balance + size @ mark[i]
+
+    for j in np.flatnonzero(size):
+        records.append((tickers[j], size[j], entry_bar[j], np.nan, entry_price[j], np.nan))
+
+    return _portfolio_stats(index, tickers, equity, cash_curve, positions, records, commission)
+
+
+def _portfolio_stats(index, tickers, equity, cash_curve, positions, records, commission):
+    trades = pd.DataFrame(
+        records, columns=["Ticker", "Size", "EntryBar", "ExitBar", "EntryPrice", "ExitPrice"]
+    )
+    trades["ExitBar"] = trades["ExitBar"].astype("Int64")
+    commissions = trades["Size"] * (trades["EntryPrice"] + trades["ExitPrice"]) * commission
+    trades["PnL"] = trades["Size"] * (trades["ExitPrice"] - trades["EntryPrice"]) - commissions
+    trades["ReturnPct"] = trades["PnL"] / (trades["Size"] * trades["EntryPrice"])
+    # 最後一個位置為 NaT，未平倉交易的 ExitBar 以 -1 取得
+    times = index.append(pd.DatetimeIndex([pd.NaT]))
+    trades["EntryTime"] = times[trades["EntryBar"].to_numpy(dtype=int)]
+    trades["ExitTime"] = times[trades["ExitBar"].fillna(-1).to_numpy(dtype=int)]
+    trades = trades.sort_values(["EntryBar", "Ticker"], kind="stable").reset_index(drop=True)
+
+    closed = trades.dropna(subset=["ExitPrice"])
+    pl = closed["PnL"]
+    count = np.count_nonzero(positions, axis=1)
+    dd = 1 - equity / np.maximum.accumulate(equity)
+
+    s = {}
+    s["Start"] = index[0]
+    s["End"] = index[-1]
+    s["Duration"] = s["End"] - s["Start"]
+    s["Exposure Time [%]"] = (count > 0).mean() * 100
+    s["Equity Final [$]"] = equity[-1]
+    s["Equity Peak [$]"] = equity.max()
+    s["Return [%]"] = (equity[-1] - equity[0]) / equity[0] * 100
+    s["Max. Drawdown [%]"] = -np.nan_to_num(dd.max()) * 100
+    s["Avg. Positions"] = count.mean()
+    s["# Trades"] = len(closed)
+    s["Open Positions"] = len(trades) - len(closed)
+    s["Win Rate [%]"] = (pl > 0).mean() * 100 if len(closed) else np.nan
+    s["Best Trade [%]"] = closed["ReturnPct"].max() * 100
+    s["Worst Trade [%]"] = closed["ReturnPct"].min() * 100
+    s["SQN"] = np.sqrt(len(closed)) * pl.mean() / (pl.std() or np.nan)
+    s["_equity_curve"] = pd.DataFrame(
+        {"Equity": equity, "Cash": cash_curve, "DrawdownPct": dd, "Positions": count},
+        index=index,
+    )
+    s["_trades"] = trades
+    s["_positions"] = pd.DataFrame(positions, index=index, columns=tickers)
+    return pd.Series(s, dtype=object)
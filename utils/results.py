@@ -0,0 +1,229 @@
+import hashlib
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from .db import get_pool
+
+
+_FINGERPRINT_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# backtest_trades 的欄位，與 vectorized_backtest 的 '_trades' 相同 (Duration 讀取時重算)
+_TRADE_COLUMNS = [
+    "Size",
+    "EntryBar",
+    "ExitBar",
+    "EntryPrice",
+    "ExitPrice",
+    "PnL",
+    "Commission",
+    "ReturnPct",
+    "EntryTime",
+    "ExitTime",
+]
+
+
+def bars_fingerprint(df):
+    """日期與 OHLCV 內容的雜湊，任何一根 K 棒新增或修正都會改變"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.DatetimeIndex(df.index).as_unit("ns").asi8.tobytes())
+    for column in _FINGERPRINT_COLUMNS:
+        values = np.ascontiguousarray(df[column].to_numpy(dtype=np.float64))
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _params_key(params):
+    # 參數依名稱排序，numpy 數值轉成 Python 型別，相同參數得到相同字串
+    return json.dumps(
+        {name: value.item() if isinstance(value, np.generic) else value
+         for name, value in sorted(params.items())}
+    )
+
+
+def _encode(value):
+    # 統計數字存成 JSON，不依賴 pandas 的 pickle 格式
+    if isinstance(value, pd.Timestamp):
+        return {"timestamp": value.isoformat()}
+    if isinstance(value, pd.Timedelta):
+        return {"timedelta": int(value.value)}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and "timestamp" in value:
+        return pd.Timestamp(value["timestamp"])
+    if isinstance(value, dict) and "timedelta" in value:
+        return pd.Timedelta(value["timedelta"])
+    return value
+
+
+def _trades_frame(rows):
+    trades = pd.DataFrame(rows, columns=_TRADE_COLUMNS)
+    trades["EntryTime"] = pd.to_datetime(trades["EntryTime"])
+    trades["ExitTime"] = pd.to_datetime(trades["ExitTime"])
+    trades["Duration"] = trades["ExitTime"] - trades["EntryTime"]
+    return trades
+
+
+class ResultStore:
+    """
+    回測結果的本地快取，存成 mystock.db 的 backtest_results 與 backtest_trades 資料表。
+
+    以 (股票, 策略, 參數) 為 key，並記錄回測當時 K 棒的 fingerprint；
+    讀取時 fingerprint 不同 (有新的 K 棒或資料被修正) 視為沒有快取，
+    重新回測後覆蓋舊結果。統計數字存成 JSON，'_trades' 每筆交易一列，
+    不保存 '_equity_curve'。
+    """
+
+    def __init__(self, db_name="mystock.db"):
+        self.db_name = db_name
+        self.pool = get_pool(db_name)
+        self.stats = {"hits": 0, "misses": 0}
+        self._create_table()
+
+    def _create_table(self):
+        with self.pool.connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS backtest_results (
+                    ticker TEXT,
+                    strategy TEXT,
+                    params TEXT,
+                    fingerprint TEXT,
+                    stats TEXT,
+                    updated_at TEXT,
+                    PRIMARY KEY (ticker, strategy, params)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS backtest_trades (
+                    ticker TEXT,
+                    strategy TEXT,
+                    params TEXT,
+                    trade INTEGER,
+                    Size INTEGER,
+                    EntryBar INTEGER,
+                    ExitBar INTEGER,
+                    EntryPrice REAL,
+                    ExitPrice REAL,
+                    PnL REAL,
+                    Commission REAL,
+                    ReturnPct REAL,
+                    EntryTime TEXT,
+                    ExitTime TEXT,
+                    PRIMARY KEY (ticker, strategy, params, trade)
+                )
+                """
+            )
+
+    def get_many(self, ticker, strategy, params_list, fingerprint):
+        """
+        一次查詢多組參數。
+
+        回傳:
+        list: 與 params_list 對齊，沒有快取或 fingerprint 不同的為 None。
+        """
+        keys = [_params_key(params) for params in params_list]
+        found = {}
+        trades = {}
+        with self.pool.connection() as conn:
+            # 分批查詢，避免超過 SQLite 參數個數上限
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                placeholders = ", ".join("?" * len(batch))
+                rows = conn.execute(
+                    "SELECT params, stats FROM backtest_results "
+                    "WHERE ticker = ? AND strategy = ? AND fingerprint = ? "
+                    f"AND params IN ({placeholders})",
+                    (ticker, strategy, fingerprint, *batch),
+                ).fetchall()
+                found.update(rows)
+                rows = conn.execute(
+                    f"SELECT params, {', '.join(_TRADE_COLUMNS)} FROM backtest_trades "
+                    f"WHERE ticker = ? AND strategy = ? AND params IN ({placeholders}) "
+                    "ORDER BY params, trade",
+                    (ticker, strategy, *batch),
+                ).fetchall()
+                for key, *trade in rows:
+                    trades.setdefault(key, []).append(trade)
+
+        results = []
+        for key in keys:
+            if key not in found:
+                self.stats["misses"] += 1
+                results.append(None)
+                continue
+            self.stats["hits"] += 1
+            stats = {name: _decode(value) for name, value in json.loads(found[key]).items()}
+            stats["_trades"] = _trades_frame(trades.get(key, []))
+            results.append(pd.Series(stats, dtype=object))
+        return results
+
+    def get(self, ticker, strategy, params, fingerprint):
+        return self.get_many(ticker, strategy, [params], fingerprint)[0]
+
+    def put_many(self, ticker, strategy, params_list, fingerprint, results):
+        """保存多組參數的回測結果，同一組參數的舊結果會被覆蓋"""
+        now = datetime.now().isoformat()
+        rows = []
+        trade_rows = []
+        for params, stats in zip(params_list, results):
+            key = _params_key(params)
+            summary = stats.drop(["_trades", "_equity_curve"], errors="ignore")
+            summary = {name: _encode(value) for name, value in summary.items()}
+            rows.append((ticker, strategy, key, fingerprint, json.dumps(summary), now))
+
+            trades = stats.get("_trades", pd.DataFrame(columns=_TRADE_COLUMNS))
+            for i, trade in enumerate(trades[_TRADE_COLUMNS].itertuples(index=False)):
+                values = [_encode(value) for value in trade]
+                values[-2:] = [str(pd.Timestamp(value)) for value in trade[-2:]]
+                trade_rows.append((ticker, strategy, key, i, *values))
+
+        with self.pool.connection() as conn:
+            conn.executemany(
+                "DELETE FROM backtest_trades WHERE ticker = ? AND strategy = ? AND params = ?",
+                [row[:3] for row in rows],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO backtest_results "
+                "(ticker, strategy, params, fingerprint, stats, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.executemany(
+                f"INSERT INTO backtest_trades (ticker, strategy, params, trade, "
+                f"{', '.join(_TRADE_COLUMNS)}) VALUES ({', '.join('?' * 14)})",
+                trade_rows,
+            )
+
+    def put(self, ticker, strategy, params, fingerprint, stats):
+        self.put_many(ticker, strategy, [params], fingerprint, [stats])
+
+    def get_or_run(self, ticker, strategy, params, df, run):
+        """
+        有快取時直接回傳，否則呼叫 run() 回測並保存。
+
+        參數:
+        df (DataFrame): 回測使用的 OHLCV 資料，用來計算 fingerprint。
+        run (callable): 不帶參數，回傳 vectorized_backtest 的統計結果。
+        """
+        fingerprint = bars_fingerprint(df)
+        stats = self.get(ticker, strategy, params, fingerprint)
+        if stats is None:
+            stats = run()
+            self.put(ticker, strategy, params, fingerprint, stats)
+        return stats
+
+    def invalidate(self, ticker=None):
+        """刪除快取結果，未指定股票時全部刪除"""
+        with self.pool.connection() as conn:
+            for table in ("backtest_results", "backtest_trades"):
+                if ticker is None:
+                    conn.execute(f"DELETE FROM {table}")
+                else:
+                    conn.execute(f"DELETE FROM {table} WHERE ticker = ?", (ticker,))
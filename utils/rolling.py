@@ -0,0 +1,190 @@
+import math
+from collections import deque
+import numpy as np
+import pandas as pd
+
+
+# 滾動極值 kernel: 同時回傳視窗內的極值與其所在位置。
+# 批次計算只需極值時用 pandas rolling，需要位置時用 van Herk / Gil-Werman 分塊，
+# 兩者都與視窗長度無關；逐筆更新用單調佇列 (RollingExtremum)。
+# 輸入可為 1D (單一股票) 或 2D (日期 × 股票) 面板，沿 axis=0 計算。
+
+
+def _unwrap(x):
+    if isinstance(x, (pd.Series, pd.DataFrame)):
+        return x.to_numpy(dtype=np.float64)
+    return np.asarray(x, dtype=np.float64)
+
+
+def _wrap(result, like):
+    if isinstance(like, pd.Series):
+        return pd.Series(result, index=like.index, name=like.name)
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(result, index=like.index, columns=like.columns)
+    return result
+
+
+def _count_valid(nan, n):
+    """每個視窗內的非 NaN 筆數"""
+    valid = np.cumsum(~nan, axis=0)
+    count = valid.copy()
+    count[n:] -= valid[:-n]
+    return count
+
+
+def _rolling_value(x, n, min_periods, is_max):
+    """只算極值: pandas 的 rolling max / min (單調佇列，O(t))"""
+    values = _unwrap(x)
+    if min_periods is None:
+        min_periods = n
+    if values.shape[0] == 0:
+        return values.copy()
+    frame = pd.DataFrame(values.reshape(values.shape[0], -1))
+    rolling = frame.rolling(n, min_periods=max(min_periods, 1))
+    result = rolling.max() if is_max else rolling.min()
+    return result.to_numpy().reshape(values.shape)
+
+
+def _rolling_extremum(x, n, min_periods, is_max):
+    """
+    極值與其位置，以 van Herk / Gil-Werman 分塊計算，O(t) 與 n 無關:
+    資料切成長度 n 的區塊，每個視窗恰好跨兩塊，極值為前一塊的後綴極值
+    與後一塊的前綴極值中較大者。相同極值取最近出現的位置。
+    """
+    values = _unwrap(x)
+    if min_periods is None:
+        min_periods = n
+    t = values.shape[0]
+    tail_shape = values.shape[1:]
+    if t == 0:
+        return values.copy(), np.full(values.shape, -1, dtype=np.intp)
+
+    nan = np.isnan(values)
+    # 最小值取負號後以最大值計算，NaN 不會成為極值
+    signed = values if is_max else -values
+    signed = np.where(nan, -np.inf, signed)
+
+    # 前面補 n - 1 筆使第 r 列的視窗為補齊後的 [r, r + n - 1]，尾端補到 n 的倍數
+    total = -(-(t + n - 1) // n) * n
+    padded = np.full((total,) + tail_shape, -np.inf)
+    padded[n - 1 : n - 1 + t] = signed
+    position = np.broadcast_to(
+        np.arange(total).reshape((total,) + (1,) * len(tail_shape)), padded.shape
+    )
+    blocks = padded.reshape((total // n, n) + tail_shape)
+    block_position = position.reshape(blocks.shape)
+
+    # 前綴極值: 位置為最後一個等於目前極值的列
+    prefix = np.maximum.accumulate(blocks, axis=1)
+    prefix_at = np.maximum.accumulate(np.where(blocks == prefix, block_position, -1), axis=1)
+
+    # 後綴極值: 由區塊尾端往前，位置為極值第一次 (由後往前) 出現的列，即最近的一列
+    backward = blocks[:, ::-1]
+    suffix = np.maximum.accumulate(backward, axis=1)
+    previous = np.concatenate(
+        [np.full(suffix[:, :1].shape, -np.inf), suffix[:, :-1]], axis=1
+    )
+    suffix_at = np.minimum.accumulate(
+        np.where(backward > previous, block_position[:, ::-1], total), axis=1
+    )
+    prefix, prefix_at = prefix.reshape(padded.shape), prefix_at.reshape(padded.shape)
+    suffix = suffix[:, ::-1].reshape(padded.shape)
+    suffix_at = suffix_at[:, ::-1].reshape(padded.shape)
+
+    # 第 r 列: 後綴取補齊後的第 r 列，前綴取第 r + n - 1 列；相同時前綴的位置較近
+    later = prefix[n - 1 : n - 1 + t] >= suffix[:t]
+    index = np.where(later, prefix_at[n - 1 : n - 1 + t], suffix_at[:t]) - (n - 1)
+
+    invalid = _count_valid(nan, n) < max(min_periods, 1)
+    index[invalid] = -1
+    value = np.take_along_axis(values, np.clip(index, 0, None), axis=0)
+    value[invalid] = np.nan
+    return value, index
+
+
+def rolling_max(x, n, min_periods=None):
+    """
+    滾動最大值，等同 rolling(window=n, min_periods=min_periods).max()。
+
+    回傳:
+    tuple: (最大值, 最大值所在的列位置，無效時為 -1)
+    """
+    value, index = _rolling_extremum(x, n, min_periods, True)
+    return _wrap(value, x), _wrap(index, x)
+
+
+def rolling_min(x, n, min_periods=None):
+    """
+    滾動最小值，等同 rolling(window=n, min_periods=min_periods).min()。
+
+    回傳:
+    tuple: (最小值, 最小值所在的列位置，無效時為 -1)
+    """
+    value, index = _rolling_extremum(x, n, min_periods, False)
+    return _wrap(value, x), _wrap(index, x)
+
+
+def rolling_max_value(x, n, min_periods=None):
+    """只需要最大值時使用，不計算位置"""
+    return _wrap(_rolling_value(x, n, min_periods, True), x)
+
+
+def rolling_min_value(x, n, min_periods=None):
+    """只需要最小值時使用，不計算位置"""
+    return _wrap(_rolling_value(x, n, min_periods, False), x)
+
+
+def is_breakout(x, n):
+    """是否為 n 日新高 (等於近 n 日含當日的最高值)"""
+    return _wrap(_unwrap(x) == _rolling_value(x, n, 1, True), x)
+
+
+def is_breakdown(x, n):
+    """是否為 n 日新低"""
+    return _wrap(_unwrap(x) == _rolling_value(x, n, 1, False), x)
+
+
+def days_since_extremum(x, n, mode="max"):
+    """距離近 n 日最高 (或最低) 點的天數"""
+    _, index = _rolling_extremum(x, n, 1, mode == "max")
+    rows = np.arange(len(index)).reshape((len(index),) + (1,) * (index.ndim - 1))
+    return _wrap(np.where(index >= 0, rows - index, -1), x)
+
+
+class RollingExtremum:
+    """
+    以單調佇列維護的滾動最大/最小值，等同 Series.rolling(n).max() / .min()。
+    update 回傳目前的極值，index 為極值所在的序號。
+    """
+
+    def __init__(self, n, mode="max", min_periods=None):
+        self.n = n
+        self.min_periods = n if min_periods is None else min_periods
+        self.is_max = mode == "max"
+        self.candidates = deque()  # (序號, 值)，值單調遞減 (max) 或遞增 (min)
+        self.valid = deque()  # 視窗內非 NaN 的序號
+        self.i = -1
+        self.index = -1
+
+    def update(self, value):
+        self.i += 1
+        start = self.i - self.n + 1
+        if value == value:
+            if self.is_max:
+                while self.candidates and self.candidates[-1][1] <= value:
+                    self.candidates.pop()
+            else:
+                while self.candidates and self.candidates[-1][1] >= value:
+                    self.candidates.pop()
+            self.candidates.append((self.i, value))
+            self.valid.append(self.i)
+        while self.candidates and self.candidates[0][0] < start:
+            self.candidates.popleft()
+        while self.valid and self.valid[0] < start:
+            self.valid.popleft()
+
+        if len(self.valid) < max(self.min_periods, 1):
+            self.index = -1
+            return math.nan
+        self.index, value = self.candidates[0]
+        return value
@@ -0,0 +1,227 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from .colstore import PRICE_COLUMNS, dates_to_days, days_to_dates
+from .panel import (
+    panel_ewm,
+    panel_rolling_max,
+    panel_rolling_mean,
+    panel_rolling_min,
+    panel_rolling_std,
+    panel_rsi,
+)
+from .pipeline import ALIASES, compute_indicator, resolve_order
+from .strategy import buy_strategy_group, sell_strategy_group
+
+
+# 全市場選股: 所有股票的 (日期 × 股票) 面板一次計算指標，
+# 再讓 utils.strategy 的策略直接在面板上求條件，每個策略只需一次陣列運算。
+
+
+class PanelFrame:
+    """
+    以欄位名稱取得 (日期 × 股票) 面板的容器。
+
+    介面與 DataFrame 取欄位相同 (df["Close"]、"k" in df)，
+    策略的 get_condition 可不經修改直接套用，回傳布林面板。
+    """
+
+    def __init__(self, panels):
+        self.panels = dict(panels)
+
+    def __contains__(self, name):
+        return name in self.panels
+
+    def __getitem__(self, name):
+        return self.panels[name]
+
+    @property
+    def index(self):
+        return self.panels["Close"].index
+
+    @property
+    def columns(self):
+        return self.panels["Close"].columns
+
+
+class _PanelOps:
+    """compute_indicator 的面板 (日期 × 股票) 版本"""
+
+    def mean(self, name, x, n):
+        return panel_rolling_mean(x, n)
+
+    def std(self, name, x, n):
+        return panel_rolling_std(x, n)
+
+    def ema(self, name, x, n):
+        return panel_ewm(x, span=n)
+
+    def ewm(self, name, x, com):
+        return panel_ewm(x, com=com)
+
+    def lowest(self, name, x, n):
+        return panel_rolling_min(x, n)
+
+    def highest(self, name, x, n):
+        return panel_rolling_max(x, n)
+
+    def rsi(self, name, x, n):
+        return panel_rsi(x, n)
+
+    def vwap(self, name, high, low, close, volume):
+        return np.cumsum((high + low + close) / 3 * volume, axis=0) / np.cumsum(volume, axis=0)
+
+    def divide(self, a, b):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return a / b
+
+
+def panel_frame(panels, columns):
+    """
+    依 utils.pipeline 的欄位命名計算面板指標，共用的中間結果只算一次。
+
+    參數:
+    panels (dict): {"Open", "High", "Low", "Close", "Volume"} 的 (日期 × 股票) DataFrame。
+    columns (list): 指標欄位名稱，例如 ["k", "d", "sma_20", "Upper"]。
+
+    回傳:
+    PanelFrame: 含價格及所有指標面板。
+    """
+    close = panels["Close"]
+    values = {name: panel.to_numpy(dtype=np.float64) for name, panel in panels.items()}
+    ops = _PanelOps()
+    for name in resolve_order(columns):
+        values[name] = np.asarray(
+            compute_indicator(name, values, values.get, ops), dtype=np.float64
+        )
+    for name in dict.fromkeys(columns):
+        if name in ALIASES:
+            values[name] = values[ALIASES[name]]
+    return PanelFrame(
+        {
+            name: pd.DataFrame(array, index=close.index, columns=close.columns)
+            for name, array in values.items()
+        }
+    )
+
+
+def align_panels(arrays, names, bars):
+    """
+    將每檔股票的欄位陣列依日期對齊成面板。
+
+    參數:
+    arrays (dict): {ticker: {"date": int64 天數, 欄位: 陣列, ...}}。
+    names (list): 要對齊的欄位名稱。
+    bars (int): 保留所有股票中最近的 bars 個交易日。
+
+    回傳:
+    dict: {欄位: (日期 × 股票) DataFrame}，當天沒有資料的為 NaN。
+    """
+    days = np.unique(np.concatenate([a["date"] for a in arrays.values()] or [[]]))[-bars:]
+    days = days.astype(np.int64)
+    shape = (len(days), len(arrays))
+    result = {name: np.full(shape, np.nan) for name in names}
+    for j, columns in enumerate(arrays.values()):
+        rows = np.searchsorted(days, columns["date"])
+        inside = (rows < len(days)) & (days[np.minimum(rows, len(days) - 1)] == columns["date"])
+        for name in names:
+            result[name][rows[inside], j] = columns[name][inside]
+
+    index = pd.DatetimeIndex(days_to_dates(days), name="date")
+    return {
+        name: pd.DataFrame(values, index=index, columns=list(arrays))
+        for name, values in result.items()
+    }
+
+
+def store_panels(store, tickers=None, bars=250):
+    """
+    從欄式價格檔讀取每檔股票最後 bars 個交易日，對齊成面板。
+
+    回傳:
+    dict: {"Open", "High", "Low", "Close", "Volume"} 的 (日期 × 股票) DataFrame，
+    日期為所有股票中最近的 bars 個交易日，當天沒有資料的為 NaN。
+    """
+    tickers = store.tickers() if tickers is None else tickers
+    arrays = {}
+    for ticker in tickers:
+        columns = store.arrays(ticker)
+        if len(columns["date"]):
+            arrays[ticker] = {name: values[-bars:] for name, values in columns.items()}
+    return align_panels(arrays, PRICE_COLUMNS, bars)
+
+
+def screen(panels, date=None):
+    """
+    在全部股票上評估所有 BuyStrategy 與 SellStrategy。
+
+    參數:
+    panels (dict): store_panels 的結果。
+    date: 要篩選的日期，預設為最後一個交易日。
+
+    回傳:
+    DataFrame: 當天觸發訊號的 (stock_id, side, strategy)，另附收盤價與 K、D、RSI。
+    """
+    groups = {"Buy": buy_strategy_group, "Sell": sell_strategy_group}
+    columns = [c for group in groups.values() for s in group.values() for c in s.columns]
+    frame = panel_frame(panels, columns + ["k", "d", "rsi"])
+    row = -1 if date is None else frame.index.get_loc(pd.Timestamp(date))
+
+    records = []
+    for side, group in groups.items():
+        for name, strategy in group.items():
+            fired = np.asarray(strategy.get_condition(frame).iloc[row], dtype=bool)
+            for ticker in frame.columns[fired]:
+                records.append((ticker, side, name))
+
+    result = pd.DataFrame(records, columns=["stock_id", "side", "strategy"])
+    for name in ("Close", "k", "d", "rsi"):
+        result[name] = frame[name].iloc[row].reindex(result["stock_id"]).to_numpy()
+    result.attrs["date"] = frame.index[row]
+    return result.sort_values(["side", "strategy", "stock_id"], kind="stable").reset_index(drop=True)
+
+
+def sync_market(
+    api, store, start_date, end_date, workers=4, rate_limiter=None, stale_days=30
+):
+    """
+    以全市場日資料 (每個交易日一次請求) 更新欄式價格檔，
+    取代逐檔股票的請求。從落後最多的股票的最後日期之後開始抓，
+    每檔股票只附加比自己最後一筆還新的資料。
+
+    參數:
+    api: FinMind DataLoader (需支援不指定 stock_id 的 taiwan_stock_daily)。
+    store (ColumnStore): 要更新的欄式價格檔。
+    stale_days (int): 最後日期比最新的股票落後超過這麼多天的視為停牌或下市，
+    不用來決定起始日，避免每次都重抓一大段。
+
+    回傳:
+    int: 新增的資料筆數。
+    """
+    last = {ticker: store.last_day(ticker) for ticker in store.tickers()}
+    last = {ticker: day for ticker, day in last.items() if day is not None}
+    start = datetime.strptime(start_date, "%Y-%m-%d").date()
+    if last:
+        newest = max(last.values())
+        active = [day for day in last.values() if newest - day <= stale_days]
+        start = max(start, days_to_dates(min(active)).item() + timedelta(days=1))
+    dates = pd.bdate_range(start, end_date).strftime("%Y-%m-%d")
+
+    def fetch(date):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        return api.taiwan_stock_daily(stock_id="", start_date=date, end_date=date)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        frames = [df for df in executor.map(fetch, dates) if not df.empty]
+    if not frames:
+        return 0
+
+    df = pd.concat(frames, ignore_index=True)
+    days = dates_to_days(df["date"])
+    added = 0
+    for ticker, rows in df.groupby("stock_id").indices.items():
+        rows = rows[days[rows] > last.get(ticker, -1)]
+        added += store.append(ticker, df.iloc[rows])
+    return added
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
 import pandas as pd
 from enum import Enum
 from backtesting.lib import crossover
+from .expr import RulePlan
+from .pipeline import with_indicators
 
 
 class BuyStrategy(Enum):
@@ -34,51 +37,89 @@ class SellStrategy(Enum):
 
 # 抽象基底類別
 class BaseStrategy(ABC):
+    # 策略需要的指標欄位，由 utils.pipeline 統一計算
+    columns = []
+
     @abstractmethod
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
         pass
 
 
 class BOLL_KD30(BaseStrategy):
+    columns = ["Lower", "k", "d"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return (df["Close"] <= df["Lower"]) & (df["k"] < 30) & (df["d"] < 30)
 
 
 class BOLL_UP(BaseStrategy):
+    columns = ["Upper"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return df["Close"] >= df["Upper"]
 
 class KD20(BaseStrategy):
+    columns = ["k", "d"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return (df["k"] < 20) & (df["d"] < 20)
 
 class KD70(BaseStrategy):
+    columns = ["k", "d"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return (df["k"] > 70) & (df["d"] > 70)
 
 
 class KD75(BaseStrategy):
+    columns = ["k", "d"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return (df["k"] > 75) & (df["d"] > 75)
 
 
 class KD80(BaseStrategy):
+    columns = ["k", "d"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return (df["k"] > 80) & (df["d"] > 80)
     
 class KD85(BaseStrategy):
+    columns = ["k", "d"]
+
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
         return (df["k"] > 85) & (df["d"] > 85)
 
 
+class KD_ABOVE(BaseStrategy):
+    """K、D 皆高於門檻，門檻可調 (參數最佳化用)"""
+
+    def __init__(self, kd: float = 75):
+        self.kd = kd
+        self.columns = ["k", "d"]
+
+    def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
+        return (df["k"] > self.kd) & (df["d"] > self.kd)
+
+
 class SMA_CROSSOVER(BaseStrategy):
     def __init__(self, n1: int = 5, n2: int = 20):
         self.n1 = n1
         self.n2 = n2
+        self.columns = [f"sma_{n1}", f"sma_{n2}"]
 
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
-        sma_n1 = df["Close"].rolling(window=self.n1).mean()
-        sma_n2 = df["Close"].rolling(window=self.n2).mean()
+        df = with_indicators(df, self.columns)
+        sma_n1 = df[f"sma_{self.n1}"]
+        sma_n2 = df[f"sma_{self.n2}"]
 
         condition = (sma_n1 > sma_n2) & (sma_n1.shift(1) <= sma_n2.shift(1))
         return condition.fillna(False)
@@ -88,10 +129,12 @@ class EMA_CROSSOVER(BaseStrategy):
     def __init__(self, n1: int = 9, n2: int = 20):
         self.n1 = n1
         self.n2 = n2
+        self.columns = [f"ema_{n1}", f"ema_{n2}"]
 
     def get_condition(self, df: pd.DataFrame) -> pd.Series:
-        ema_fast = df["Close"].ewm(span=self.n1, adjust=False).mean()
-        ema_slow = df["Close"].ewm(span=self.n2, adjust=False).mean()
+        df = with_indicators(df, self.columns)
+        ema_fast = df[f"ema_{self.n1}"]
+        ema_slow = df[f"ema_{self.n2}"]
 
         ema_fast_prev = ema_fast.shift(1)
         ema_slow_prev = ema_slow.shift(1)
@@ -99,6 +142,30 @@ class EMA_CROSSOVER(BaseStrategy):
         return (ema_fast > ema_slow) & (ema_fast_prev <= ema_slow_prev)
 
 
+class EMA_VWAP_CROSSOVER(BaseStrategy):
+    """EMA 黃金交叉且收盤價高於 VWAP (backtesting/helper.py 的 EMA_VWAP_KD 買進條件)"""
+
+    def __init__(self, n1: int = 9, n2: int = 20):
+        self.crossover = EMA_CROSSOVER(n1, n2)
+        self.columns = self.crossover.columns + ["vwap"]
+
+    def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        df = with_indicators(df, self.columns)
+        return self.crossover.get_condition(df) & (df["Close"] > df["vwap"])
+
+
+class ExpressionStrategy(BaseStrategy):
+    """以 utils.expr 運算式定義的策略，例如 close <= boll_lower(20, 2) & kd_k(9) < 30"""
+
+    def __init__(self, rule: str):
+        self.rule = rule
+        self.plan = RulePlan({rule: rule})
+        self.columns = self.plan.columns
+
+    def get_condition(self, df: pd.DataFrame) -> pd.Series:
+        return self.plan.evaluate(df)[self.rule]
+
+
 def create_strategy(buy_strategy_enum: BuyStrategy):
     name = buy_strategy_enum.name
     parts = name.split("_")
@@ -139,14 +206,73 @@ sell_strategy_group = {
 }
 
 
+# 最近用過的運算式策略，同一條規則只解析一次
+@lru_cache(maxsize=256)
+def _expression_strategy(rule: str) -> BaseStrategy:
+    return ExpressionStrategy(rule)
+
+
+def lookup_strategy(group: dict, name: str) -> BaseStrategy:
+    """
+    依名稱取得策略，不在 group 中的名稱視為 utils.expr 運算式。
+    既不是策略名稱、也無法解析成運算式時拋出 KeyError。
+    """
+    if name in group:
+        return group[name]
+    try:
+        return _expression_strategy(name)
+    except ValueError as e:
+        raise KeyError(f"Unknown strategy {name!r}: {e}") from None
+
+
 def get_trade_condition(df: pd.DataFrame, buy_strategy: str, sell_strategy: str):
     if buy_strategy == "":
         buy_condition = pd.Series([False] * len(df), index=df.index)
     else:
-        buy_condition =  buy_strategy_group.get(buy_strategy).get_condition(df)
+        buy_condition = lookup_strategy(buy_strategy_group, buy_strategy).get_condition(df)
 
     if sell_strategy == "":
         sell_condition = pd.Series([False] * len(df), index=df.index)
     else:
-        sell_condition = sell_strategy_group.get(sell_strategy).get_condition(df)
+        sell_condition = lookup_strategy(sell_strategy_group, sell_strategy).get_condition(df)
     return buy_condition, sell_condition
+
+
+def strategy_columns(buy_strategy: str, sell_strategy: str):
+    """買賣策略需要的指標欄位"""
+    columns = []
+    if buy_strategy != "":
+        columns += lookup_strategy(buy_strategy_group, buy_strategy).columns
+    if sell_strategy != "":
+        columns += lookup_strategy(sell_strategy_group, sell_strategy).columns
+    return columns
+
+
+def evaluate_rules(df: pd.DataFrame, rules: dict) -> pd.DataFrame:
+    """
+    一次評估多條運算式規則，所有規則的指標及共同的子運算式只計算一次。
+
+    參數:
+    rules (dict): {名稱: 運算式}。
+
+    回傳:
+    DataFrame: 每條規則一欄布林值。
+    """
+    return pd.DataFrame(RulePlan(rules).evaluate(df), index=df.index)
+
+
+def evaluate_all_strategies(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    一次評估所有 BuyStrategy 與 SellStrategy，
+    所有策略需要的指標先合併去重後只計算一次。
+
+    回傳:
+    DataFrame: 每個策略一欄布林值，欄位名稱為策略的 value。
+    """
+    strategies = {**buy_strategy_group, **sell_strategy_group}
+    columns = [c for strategy in strategies.values() for c in strategy.columns]
+    df = with_indicators(df, list(dict.fromkeys(columns)))
+    return pd.DataFrame(
+        {name: strategy.get_condition(df) for name, strategy in strategies.items()},
+        index=df.index,
+    )
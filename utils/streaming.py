@@ -0,0 +1,301 @@
+import math
+from collections import deque
+from .rolling import RollingExtremum
+
+
+# 逐筆更新的指標，每來一根新 K 棒只需 O(1) 計算。
+# 運算順序與 pandas 的 rolling / ewm 實作相同，結果與 utils.formula 的批次函式一致。
+
+NAN = float("nan")
+
+
+def _divide(a, b):
+    """與 numpy 相同的除法: 除以 0 得到 inf 或 nan，而不是拋出例外"""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class StreamingEWM:
+    """等同 Series.ewm(com=com, adjust=adjust).mean() 的逐筆版本"""
+
+    def __init__(self, com=None, span=None, adjust=False):
+        if span is not None:
+            com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.adjust = adjust
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+        self.started = False
+
+    def update(self, value):
+        is_observation = value == value
+        self.nobs += is_observation
+
+        if not self.started:
+            self.started = True
+            self.weighted = value
+            self.old_wt = 1.0
+        elif self.weighted == self.weighted:
+            new_wt = 1.0 if self.adjust else self.alpha
+            self.old_wt *= 1.0 - self.alpha
+            if is_observation:
+                if self.weighted != value:
+                    self.weighted = self.old_wt * self.weighted + new_wt * value
+                    self.weighted /= self.old_wt + new_wt
+                if self.adjust:
+                    self.old_wt += new_wt
+                else:
+                    self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = value
+
+        return self.weighted if self.nobs >= 1 else NAN
+
+
+class RollingMean:
+    """等同 Series.rolling(n).mean() 的逐筆版本 (Kahan 補償加總)"""
+
+    def __init__(self, n):
+        self.n = n
+        self.window = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = NAN
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        y = value - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        if value == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = value
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        y = -value - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct -= 1
+
+    def update(self, value):
+        if not self.window:
+            self.prev_value = value
+            self.num_consecutive_same_value = 0
+        if len(self.window) == self.n:
+            self._remove(self.window.popleft())
+        self.window.append(value)
+        self._add(value)
+
+        if self.nobs < self.n:
+            return NAN
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+
+class RollingStd:
+    """等同 Series.rolling(n).std() (ddof=1) 的逐筆版本"""
+
+    def __init__(self, n, ddof=1):
+        self.n = n
+        self.ddof = ddof
+        self.window = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = NAN
+
+    def _add(self, value):
+        if value != value:
+            return
+        if value == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = value
+
+        self.nobs += 1
+        prev_mean = self.mean_x - self.compensation
+        y = value - self.compensation
+        t = y - self.mean_x
+        self.compensation = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (value - prev_mean) * (value - self.mean_x)
+
+    def _remove(self, value):
+        if value != value:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.compensation
+            y = value - self.compensation
+            t = y - self.mean_x
+            self.compensation = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (value - prev_mean) * (value - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, value):
+        if len(self.window) == self.n:
+            self._remove(self.window.popleft())
+        self.window.append(value)
+        self._add(value)
+
+        if self.nobs < self.n or self.nobs <= self.ddof:
+            return NAN
+        if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+            return 0.0
+        var = self.ssqdm_x / (self.nobs - self.ddof)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class StreamingKDJ:
+    """等同 calculate_kdj 的逐筆版本，update 回傳 (k, d)"""
+
+    def __init__(self, n=9):
+        self.ln = RollingExtremum(n, "min")
+        self.hn = RollingExtremum(n, "max")
+        self.k = StreamingEWM(com=2)
+        self.d = StreamingEWM(com=2)
+
+    def update(self, high, low, close):
+        ln = self.ln.update(low)
+        hn = self.hn.update(high)
+        rsv = _divide(close - ln, hn - ln) * 100
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return k, d
+
+
+class StreamingBollinger:
+    """等同 calculate_bollinger_bands 的逐筆版本，update 回傳 (Middle, Upper, Lower)"""
+
+    def __init__(self, n=20):
+        self.mean = RollingMean(n)
+        self.std = RollingStd(n)
+
+    def update(self, close):
+        middle = self.mean.update(close)
+        std = self.std.update(close)
+        return middle, middle + (std * 2), middle - (std * 2)
+
+
+class StreamingRSI:
+    """等同 calculate_rsi 的逐筆版本"""
+
+    def __init__(self, period=14):
+        self.avg_gain = StreamingEWM(com=period - 1)
+        self.avg_loss = StreamingEWM(com=period - 1)
+        self.prev_close = NAN
+
+    def update(self, close):
+        delta = close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+        rs = _divide(avg_gain, avg_loss)
+        return 100 - _divide(100, 1 + rs)
+
+
+class StreamingVWAP:
+    """等同 kernels.vwap (自第一筆起的累積 VWAP) 的逐筆版本"""
+
+    def __init__(self):
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def update(self, high, low, close, volume):
+        self.price_volume += (high + low + close) / 3 * volume
+        self.volume += volume
+        return _divide(self.price_volume, self.volume)
+
+
+class StreamingCrossover:
+    """
+    SMA_CROSSOVER / EMA_CROSSOVER 的逐筆版本，
+    update 回傳這根 K 棒是否出現快線向上穿越慢線。
+    """
+
+    def __init__(self, kind="SMA", n1=5, n2=20):
+        if kind == "SMA":
+            self.fast, self.slow = RollingMean(n1), RollingMean(n2)
+        elif kind == "EMA":
+            self.fast, self.slow = StreamingEWM(span=n1), StreamingEWM(span=n2)
+        else:
+            raise NotImplementedError(f"Unknown crossover type: {kind}")
+        self.prev_fast = NAN
+        self.prev_slow = NAN
+
+    def update(self, close):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        signal = (fast > slow) and (self.prev_fast <= self.prev_slow)
+        self.prev_fast, self.prev_slow = fast, slow
+        return signal
+
+
+class IndicatorState:
+    """
+    一檔股票 app.py 所需指標 (k, d, Middle, Upper, Lower, rsi) 的逐筆狀態。
+    可用 warm_up 以歷史資料初始化，之後每根新 K 棒呼叫 update 一次。
+    """
+
+    def __init__(self, kdj_n=9, boll_n=20, rsi_period=14):
+        self.kdj = StreamingKDJ(kdj_n)
+        self.boll = StreamingBollinger(boll_n)
+        self.rsi = StreamingRSI(rsi_period)
+        self.last_date = None
+
+    def update(self, date, high, low, close):
+        k, d = self.kdj.update(high, low, close)
+        middle, upper, lower = self.boll.update(close)
+        rsi = self.rsi.update(close)
+        self.last_date = date
+        return {
+            "date": date,
+            "k": k,
+            "d": d,
+            "Middle": middle,
+            "Upper": upper,
+            "Lower": lower,
+            "rsi": rsi,
+        }
+
+    def warm_up(self, df):
+        """以 date/High/Low/Close 欄位的歷史資料依序更新，回傳最後一筆指標"""
+        row = None
+        for date, high, low, close in zip(df["date"], df["High"], df["Low"], df["Close"]):
+            row = self.update(date, float(high), float(low), float(close))
+        return row